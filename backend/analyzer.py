@@ -0,0 +1,333 @@
+# analyzer.py - Analiză offline pe exporturi /export (agora_theta_*.json / .ndjson)
+"""
+Statistici agregate peste multe conversații exportate.
+
+Usage:
+    python analyzer.py exports/ --workers 8 --out report.json
+    python analyzer.py a.json b.ndjson.gz --rescan
+
+Fiecare fișier e analizat într-un proces separat; rezultatul per fișier e
+păstrat în cache după hash-ul conținutului, deci o nouă rulare procesează
+doar fișierele noi sau modificate. Hash-ul e recalculat (tot în procesele
+worker) doar când dimensiunea sau mtime-ul fișierului s-au schimbat.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterator, Optional
+
+from context_builder import scan_hallucinations, hallucination_flags
+from round_stats import HALLUCINATION_FLAGS
+
+# Schimbă versiunea când se schimbă formatul statisticilor (invalidează cache-ul)
+ANALYZER_VERSION = 1
+DEFAULT_CACHE_PATH = "data/analyzer_cache.json"
+EXPORT_SUFFIXES = (".json", ".ndjson", ".json.gz", ".ndjson.gz", ".json.zst", ".ndjson.zst")
+
+
+# === CITIRE EXPORTURI ===
+
+def _open_export(path: str):
+    """Fișierul de export ca stream text, decomprimat după extensie."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        import zstandard
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_export_rounds(path: str) -> Iterator[Dict]:
+    """
+    Rundele unui export, în ordine.
+
+    NDJSON e citit linie cu linie (prima linie = metadate); JSON-ul clasic
+    e încărcat integral.
+    """
+    with _open_export(path) as f:
+        if ".ndjson" in os.path.basename(path):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "type" in record:
+                    yield record
+        else:
+            yield from json.load(f).get("rounds", [])
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 al conținutului (cheia de cache)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_export_files(paths: List[str]) -> List[str]:
+    """Fișierele de export din lista dată (directoarele sunt parcurse recursiv)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name) for name in names
+                    if name.startswith("agora_") and name.endswith(EXPORT_SUFFIXES)
+                )
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+# === STATISTICI ===
+
+def _new_counters() -> Dict:
+    return {
+        "rounds": 0,
+        "tokens": 0,
+        "errors": 0,
+        "timeouts": 0,
+        "theta_rounds": 0,
+        "hallucinations": 0,
+        "flags": {flag: 0 for flag in HALLUCINATION_FLAGS},
+        # Mențiunile care au declanșat flag-uri, pe flag și formă ("[model]", "a zis")
+        "mentions": {}
+    }
+
+
+def _count(counters: Dict, round_data: Dict, flags: Dict, matches: Optional[List[Dict]]):
+    counters["rounds"] += 1
+    counters["tokens"] += round_data.get("tokens", 0) or 0
+    if round_data.get("error"):
+        counters["errors"] += 1
+    if round_data.get("timeout"):
+        counters["timeouts"] += 1
+    if round_data.get("theta_enabled", False):
+        counters["theta_rounds"] += 1
+    if any(flags.values()):
+        counters["hallucinations"] += 1
+    for flag, value in flags.items():
+        if value:
+            counters["flags"][flag] = counters["flags"].get(flag, 0) + 1
+    # Exporturile vechi au doar flag-urile, fără potriviri
+    for match in matches or []:
+        by_form = counters["mentions"].setdefault(match["flag"], {})
+        by_form[match["form"]] = by_form.get(match["form"], 0) + 1
+
+
+def analyze_rounds(rounds: Iterator[Dict], rescan: bool = False) -> Dict:
+    """
+    Statistici pentru o conversație.
+
+    Ordinea zarului e reconstruită din rundele LLM care urmează fiecărei
+    runde user; poziția unui model = indexul lui în acea ordine.
+
+    Args:
+        rounds: Rundele conversației, în ordine
+        rescan: Recalculează flag-urile cu detectorul curent în loc să le
+                folosească pe cele salvate
+
+    Returns:
+        Dict cu contoare care pot fi adunate (merge_stats)
+    """
+    stats = {"files": 1, "user_rounds": 0, "llm_rounds": 0, "models": {}, "positions": {}}
+
+    turn: List[Dict] = []
+
+    def close_turn():
+        order = [r["model"] for r in turn]
+        for position, round_data in enumerate(turn):
+            model = round_data["model"]
+            if rescan and round_data.get("round_mode") == "blind":
+                # În runda blind niciun model nu a văzut răspunsurile celorlalte
+                blind_order = [model] + [m for m in order if m != model]
+                matches = scan_hallucinations(round_data.get("content", ""), model, blind_order, 0)
+                flags = hallucination_flags(matches)
+            elif rescan:
+                matches = scan_hallucinations(round_data.get("content", ""), model, order, position)
+                flags = hallucination_flags(matches)
+            else:
+                matches = round_data.get("hallucination_matches")
+                flags = round_data.get("hallucination_flags", {})
+
+            _count(stats["models"].setdefault(model, _new_counters()), round_data, flags, matches)
+            by_position = stats["positions"].setdefault(str(position), {})
+            _count(by_position.setdefault(model, _new_counters()), round_data, flags, matches)
+        turn.clear()
+
+    for round_data in rounds:
+        if round_data["type"] == "user":
+            close_turn()
+            stats["user_rounds"] += 1
+        elif round_data["type"] == "assistant":
+            stats["llm_rounds"] += 1
+            turn.append(round_data)
+    close_turn()
+
+    return stats
+
+
+def analyze_file(path: str, rescan: bool = False) -> Dict:
+    """Statisticile unui singur fișier de export (rulează în worker)."""
+    return analyze_rounds(iter_export_rounds(path), rescan)
+
+
+def merge_stats(total: Dict, part: Dict) -> Dict:
+    """Adună recursiv contoarele din part în total (modifică total)."""
+    for key, value in part.items():
+        if isinstance(value, dict):
+            merge_stats(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def _with_rates(counters: Dict) -> Dict:
+    rounds = counters["rounds"] or 1
+    return {
+        **counters,
+        "avg_tokens": round(counters["tokens"] / rounds, 2),
+        "error_rate": round(counters["errors"] / rounds, 4),
+        "hallucination_rate": round(counters["hallucinations"] / rounds, 4)
+    }
+
+
+def finalize_report(stats: Dict) -> Dict:
+    """Raportul final: contoarele plus medii și rate per model și per poziție."""
+    return {
+        "files": stats.get("files", 0),
+        "user_rounds": stats.get("user_rounds", 0),
+        "llm_rounds": stats.get("llm_rounds", 0),
+        "models": {m: _with_rates(c) for m, c in sorted(stats.get("models", {}).items())},
+        "positions": {
+            position: {m: _with_rates(c) for m, c in sorted(models.items())}
+            for position, models in sorted(stats.get("positions", {}).items(), key=lambda p: int(p[0]))
+        }
+    }
+
+
+# === CACHE + RULARE PARALELĂ ===
+
+def _load_cache(cache_path: Optional[str]) -> Dict:
+    """
+    {"results": {cheie: statistici}, "files": {cale: [size, mtime_ns, hash]}}
+
+    "files" evită recitirea fișierelor neschimbate doar pentru hash.
+    """
+    cache = {"results": {}, "files": {}}
+    if not cache_path or not os.path.exists(cache_path):
+        return cache
+    with open(cache_path, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    if "results" not in stored:
+        # Format vechi: doar rezultatele, fără indexul de fișiere
+        stored = {"results": stored}
+    cache.update(stored)
+    return cache
+
+
+def _save_cache(cache_path: Optional[str], cache: Dict):
+    if not cache_path:
+        return
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def analyze_corpus(paths: List[str], workers: Optional[int] = None, cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                   rescan: bool = False) -> Dict:
+    """
+    Analizează toate exporturile și întoarce raportul combinat.
+
+    Args:
+        paths: Fișiere și/sau directoare cu exporturi
+        workers: Procese paralele (implicit os.cpu_count())
+        cache_path: Fișier JSON cu rezultatele per fișier (None = fără cache)
+        rescan: Recalculează flag-urile de halucinație cu detectorul curent
+    """
+    files = find_export_files(paths)
+    cache = _load_cache(cache_path)
+    results, file_index = cache["results"], cache["files"]
+    variant = f"v{ANALYZER_VERSION}-{'rescan' if rescan else 'stored'}"
+
+    # Hash-ul din index e refolosit cât timp (size, mtime_ns) nu s-a schimbat
+    hashes = {}
+    signatures = {}
+    for path in files:
+        stat = os.stat(path)
+        signatures[path] = [stat.st_size, stat.st_mtime_ns]
+        indexed = file_index.get(os.path.abspath(path))
+        if indexed is not None and indexed[:2] == signatures[path]:
+            hashes[path] = indexed[2]
+    unhashed = [path for path in files if path not in hashes]
+
+    errors = {}
+    # Procesele worker pornesc doar la primul task (o rulare complet în cache nu le creează)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Fișierele noi sau modificate sunt citite pentru hash în paralel
+        for path, digest in zip(unhashed, pool.map(file_hash, unhashed)):
+            hashes[path] = digest
+            file_index[os.path.abspath(path)] = signatures[path] + [digest]
+
+        keys = {path: f"{variant}:{hashes[path]}" for path in files}
+        pending = [path for path in files if keys[path] not in results]
+        futures = {path: pool.submit(analyze_file, path, rescan) for path in pending}
+        for path, future in futures.items():
+            try:
+                results[keys[path]] = future.result()
+            except Exception as e:
+                errors[path] = str(e)
+    if unhashed or pending:
+        _save_cache(cache_path, cache)
+
+    total: Dict = {}
+    for path in files:
+        if keys[path] in results:
+            merge_stats(total, results[keys[path]])
+
+    report = finalize_report(total)
+    report["analyzed_files"] = len(pending) - len(errors)
+    report["cached_files"] = len(files) - len(pending)
+    report["failed_files"] = errors
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistici agregate peste exporturi Agora")
+    parser.add_argument("paths", nargs="+", help="Fișiere de export sau directoare")
+    parser.add_argument("--workers", type=int, default=None, help="Procese paralele (implicit: nr. CPU)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Fișierul de cache per fișier")
+    parser.add_argument("--no-cache", action="store_true", help="Nu citi/scrie cache-ul")
+    parser.add_argument("--rescan", action="store_true", help="Recalculează flag-urile de halucinație")
+    parser.add_argument("--out", default=None, help="Scrie raportul în fișier (implicit stdout)")
+    args = parser.parse_args()
+
+    report = analyze_corpus(
+        args.paths,
+        workers=args.workers,
+        cache_path=None if args.no_cache else args.cache,
+        rescan=args.rescan
+    )
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# batch_runner.py - Experimente fără UI: multe sesiuni independente în paralel
+"""
+Rulează un set de prompturi (JSONL) prin round_engine, fără server.
+
+Usage:
+    python batch_runner.py prompts.jsonl --out results.ndjson --repetitions 5 --concurrency 16
+    python batch_runner.py prompts.jsonl --out results.ndjson --orders permutations --theta
+    python batch_runner.py prompts.jsonl --out results.ndjson --orders claude,gpt,gemini,grok
+
+Format prompts.jsonl (o linie per prompt):
+    {"id": "p1", "content": "întrebare"}
+    {"id": "p2", "turns": ["primul mesaj", "al doilea mesaj"], "theta_enabled": true}
+
+Fiecare job (prompt x ordine x repetiție) rulează într-o sesiune proprie.
+Rundele unui job sunt scrise în NDJSON când jobul se termină, urmate de o
+linie "job_done". La repornire, jobii cu "job_done" sunt săriți, iar un bloc
+incomplet de la finalul fișierului (întrerupere în timpul scrierii) e tăiat.
+
+Opțiunile per prompt (theta_enabled, token_limit, round_mode,
+deadline_seconds) sunt verificate toate înainte de primul job, cu aceleași
+reguli ca /message (validator.validate_round_options).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import List, Dict, Optional, Set, Tuple
+
+import config
+import validator
+from llm_clients import init_http_pool, close_http_pool
+from providers import activate_providers
+from round_engine import run_round, ROUND_MODES
+from session_store import Session
+
+
+class FixedOrderRoller:
+    """Înlocuiește DiceRoller când ordinea e fixată de experiment."""
+
+    def __init__(self, order: List[str]):
+        self.order = order
+        self.last_order: Optional[List[str]] = None
+
+    def roll(self, available_models: List[str]) -> List[str]:
+        self.last_order = [m for m in self.order if m in available_models]
+        return self.last_order
+
+
+# === JOBURI ===
+
+def load_prompts(path: str) -> List[Dict]:
+    """Prompturile din JSONL; fiecare primește "turns" (lista mesajelor user)."""
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            prompt = json.loads(line)
+            turns = prompt.get("turns") or [prompt.get("content", "")]
+            if not all(isinstance(t, str) and t.strip() for t in turns):
+                raise ValueError(f"{path}:{line_number}: prompt fără conținut")
+            prompts.append({**prompt, "id": str(prompt.get("id", line_number)), "turns": turns})
+    return prompts
+
+
+def validate_prompts(prompts: List[Dict], defaults: Dict) -> List[Dict]:
+    """
+    Verifică opțiunile fiecărui prompt cu aceleași reguli ca /message, înainte
+    de primul job: un token_limit sau round_mode greșit nu mai oprește lotul
+    la jumătate. Fiecare prompt primește "round_options" (valorile finale).
+    """
+    errors = []
+    validated = []
+    for prompt in prompts:
+        options, error = validator.validate_round_options(prompt, defaults)
+        if error:
+            errors.append(f"prompt {prompt['id']}: {error}")
+        else:
+            validated.append({**prompt, "round_options": options})
+    if errors:
+        raise ValueError("Prompturi invalide:\n  " + "\n  ".join(errors))
+    return validated
+
+
+def order_variants(spec: str, models: List[str]) -> List[Tuple[str, Optional[List[str]]]]:
+    """
+    Variantele de ordine: (etichetă, ordine fixă sau None pentru zar).
+
+    spec:
+        "random"       - DiceRoller, ca în UI
+        "permutations" - toate ordinile posibile ale modelelor active
+        "a,b,c"        - o singură ordine fixă
+    """
+    if spec == "random":
+        return [("random", None)]
+    if spec == "permutations":
+        return [(">".join(p), list(p)) for p in itertools.permutations(models)]
+    order = [m.strip() for m in spec.split(",") if m.strip()]
+    unknown = [m for m in order if m not in models]
+    if unknown:
+        raise ValueError(f"Modele inactive sau necunoscute în ordine: {unknown}")
+    return [(">".join(order), order)]
+
+
+def build_jobs(prompts: List[Dict], variants: List[Tuple[str, Optional[List[str]]]],
+               repetitions: int) -> List[Dict]:
+    return [
+        {
+            "job_id": f"{prompt['id']}:{label}:{repetition}",
+            "prompt": prompt,
+            "order_label": label,
+            "order": order,
+            "repetition": repetition
+        }
+        for prompt in prompts
+        for label, order in variants
+        for repetition in range(repetitions)
+    ]
+
+
+# === REZUMARE ===
+
+def completed_jobs(path: str) -> Set[str]:
+    """
+    ID-urile jobilor terminați din output-ul existent.
+
+    Tot ce urmează după ultima linie "job_done" (bloc scris parțial) e tăiat,
+    ca jobul respectiv să fie rulat din nou fără duplicate.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    keep_bytes = 0
+    offset = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            offset += len(raw)
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if record.get("event") == "job_done":
+                done.add(record["job_id"])
+                keep_bytes = offset
+
+    if keep_bytes < offset:
+        print(f"[Batch] Tai {offset - keep_bytes} bytes incompleți de la finalul {path}")
+        with open(path, "r+b") as f:
+            f.truncate(keep_bytes)
+    return done
+
+
+# === RULARE ===
+
+async def run_job(job: Dict, models: List[str], options: Dict) -> List[Dict]:
+    """Rulează toate turele unui job într-o sesiune nouă; întoarce liniile NDJSON."""
+    prompt = job["prompt"]
+    session = Session(job["job_id"])
+    if job["order"] is not None:
+        session.dice_roller = FixedOrderRoller(job["order"])
+
+    # Validate de validate_prompts înainte de pornirea lotului
+    round_options = prompt["round_options"]
+
+    started = time.time()
+    for content in prompt["turns"]:
+        await run_round(
+            session, models, content, round_options["token_limit"], round_options["theta_enabled"],
+            use_cache=options["use_cache"],
+            deadline=round_options["deadline"],
+            round_mode=round_options["round_mode"]
+        )
+
+    meta = {
+        "job_id": job["job_id"],
+        "prompt_id": prompt["id"],
+        "order_spec": job["order_label"],
+        "repetition": job["repetition"]
+    }
+    records = [{**meta, "event": "round", **round_data} for round_data in session.rounds]
+    records.append({
+        **meta,
+        "event": "job_done",
+        "rounds": len(session.rounds),
+        "errors": sum(1 for r in session.rounds if r.get("error")),
+        "duration": round(time.time() - started, 3),
+        "timestamp": datetime.now().isoformat()
+    })
+    return records
+
+
+async def run_batch(jobs: List[Dict], models: List[str], out_path: str, concurrency: int,
+                    options: Dict) -> Dict:
+    """
+    Rulează jobii cu cel mult `concurrency` sesiuni simultane și adaugă
+    rezultatele în out_path pe măsură ce jobii se termină.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    progress = {"done": 0, "failed": 0}
+    started = time.time()
+
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(out_path, "a", encoding="utf-8") as out:
+        async def worker():
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    records = await run_job(job, models, options)
+                except Exception as e:
+                    # Jobul nu primește job_done: va fi reluat la următoarea rulare
+                    progress["failed"] += 1
+                    print(f"[Batch] {job['job_id']} eșuat: {e}")
+                    continue
+
+                # Un singur write per job: blocul e contiguu în fișier
+                out.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+                out.flush()
+                progress["done"] += 1
+                if progress["done"] % 10 == 0 or progress["done"] == len(jobs):
+                    print(f"[Batch] {progress['done']}/{len(jobs)} joburi ({progress['failed']} eșuate, "
+                          f"{time.time() - started:.0f}s)")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    return {**progress, "total": len(jobs), "duration": round(time.time() - started, 3)}
+
+
+async def main_async(args) -> Dict:
+    models = validator.validate_api_keys()
+    if args.models:
+        requested = [m.strip() for m in args.models.split(",") if m.strip()]
+        models = [m for m in requested if m in models]
+    models = activate_providers(models)
+    if not models:
+        raise SystemExit("Niciun model activ (verifică API keys în config.py / --models)")
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    defaults = {
+        "theta_enabled": args.theta,
+        "token_limit": args.token_limit,
+        "deadline": args.deadline,
+        "round_mode": args.round_mode
+    }
+    try:
+        prompts = validate_prompts(load_prompts(args.prompts), defaults)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    jobs = build_jobs(prompts, order_variants(args.orders, models), args.repetitions)
+    done = completed_jobs(args.out)
+    pending = [job for job in jobs if job["job_id"] not in done]
+    print(f"[Batch] {len(jobs)} joburi, {len(done)} deja terminate, {len(pending)} de rulat "
+          f"(modele: {', '.join(models)}, concurență: {args.concurrency})")
+
+    options = {"use_cache": args.use_cache}
+
+    await init_http_pool()
+    try:
+        return await run_batch(pending, models, args.out, args.concurrency, options)
+    finally:
+        await close_http_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rulează experimente Agora în lot, fără UI")
+    parser.add_argument("prompts", help="Fișier JSONL cu prompturi")
+    parser.add_argument("--out", required=True, help="Fișier NDJSON cu rezultatele (reluat dacă există)")
+    parser.add_argument("--repetitions", type=int, default=1, help="Rulări per prompt și ordine")
+    parser.add_argument("--orders", default="random",
+                        help='"random" (zar), "permutations" sau o ordine fixă "claude,gpt,..."')
+    parser.add_argument("--concurrency", type=int, default=8, help="Sesiuni rulate simultan")
+    parser.add_argument("--models", default=None, help="Subset de modele active, separate prin virgulă")
+    parser.add_argument("--theta", action="store_true", help="θ-Logos activ (implicit pentru toate prompturile)")
+    parser.add_argument("--token-limit", type=int, default=config.TOKEN_LIMIT_DEFAULT)
+    parser.add_argument("--round-mode", choices=ROUND_MODES, default=config.ROUND_MODE_DEFAULT)
+    parser.add_argument("--deadline", type=float, default=config.ROUND_DEADLINE_SECONDS,
+                        help="Termen per rundă în secunde")
+    parser.add_argument("--use-cache", action="store_true", default=None,
+                        help="Folosește cache-ul de răspunsuri (implicit RESPONSE_CACHE_ENABLED)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed pentru zar (ordine reproductibile)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main_async(args))
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
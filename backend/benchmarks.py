@@ -0,0 +1,336 @@
+# benchmarks.py - Microbenchmark-uri pentru căile care cresc cu lungimea sesiunii
+"""
+Măsoară timpul și memoria de vârf pentru funcțiile CPU din server, pe sesiuni
+sintetice de 10 până la 100k runde, și compară cu un baseline salvat.
+
+Usage:
+    python benchmarks.py                        # rulează și compară cu baseline-ul
+    python benchmarks.py --save-baseline        # rulează și salvează baseline-ul
+    python benchmarks.py --sizes 10,100,1000 --targets build_context,export_json
+    python benchmarks.py --out data/benchmarks/run.json
+
+Comparația e pe complexitate, nu pe timpi absoluți (care depind de mașină):
+pentru fiecare țintă se calculează panta log-log a timpului și a memoriei față
+de numărul de runde (0 = constant, 1 = liniar, 2 = pătratic). Rularea eșuează
+(exit 1) dacă o pantă crește peste baseline cu mai mult de --tolerance.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import config
+from context_builder import build_context_from_rounds, detect_hallucinations, make_context_ref
+from exporter import encode_stream, iter_export_json, iter_export_ndjson
+from round_stats import HALLUCINATION_FLAGS, compute_stats
+from session_store import Session
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Panta se calculează doar pe sesiunile mari: la cele mici domină overhead-ul fix
+SLOPE_MIN_ROUNDS = 1_000
+SLOPE_TOLERANCE = 0.5
+
+# Sub aceste valori măsurătorile sunt zgomot (rezoluția ceasului, alocări mărunte)
+TIME_FLOOR_SECONDS = 1e-6
+MEMORY_FLOOR_BYTES = 64 * 1024
+
+_WORDS = ("structura", "sens", "relație", "model", "context", "limită", "tipar", "răspuns", "întrebare",
+          "argument", "consecință", "ipoteză", "θ", "→", "∃", "⊕", "∈", "≈", "the", "pattern", "boundary")
+
+
+# === SESIUNI SINTETICE ===
+
+def _text(rng: random.Random, min_chars: int, max_chars: int, models: List[str]) -> str:
+    """Text de lungime realistă, cu mențiuni ocazionale de modele ("[gpt]", "claude a zis")."""
+    target = rng.randint(min_chars, max_chars)
+    words = []
+    length = 0
+    while length < target:
+        roll = rng.random()
+        if roll < 0.01:
+            word = f"[{rng.choice(models)}]"
+        elif roll < 0.02:
+            word = f"{rng.choice(models)} a zis"
+        else:
+            word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def synthetic_session(n_rounds: int, seed: int = 0, models: Optional[List[str]] = None) -> Session:
+    """
+    O sesiune cu n_rounds runde: câte o rundă user urmată de câte un răspuns
+    per model, cu aceleași câmpuri ca round_engine.
+
+    Textele vin dintr-un set fix (refolosit), ca 100k runde să nu coste
+    memorie proporțională cu textul generat.
+    """
+    rng = random.Random(seed)
+    models = models or list(config.MODELS)
+    user_texts = [_text(rng, 200, 800, models) for _ in range(64)]
+    llm_texts = [_text(rng, 400, 2000, models) for _ in range(256)]
+
+    session = Session(f"bench-{n_rounds}")
+    order: List[str] = []
+    position = 0
+    while len(session.rounds) < n_rounds:
+        round_number = len(session.rounds) + 1
+        timestamp = datetime.now().isoformat()
+        if position == len(order):
+            order = rng.sample(models, len(models))
+            position = 0
+            session.append_round({
+                "round_number": round_number,
+                "type": "user",
+                "content": rng.choice(user_texts),
+                "round_mode": "sequential",
+                "theta_enabled": False,
+                "timestamp": timestamp
+            }, persist=False)
+            continue
+
+        model = order[position]
+        content = rng.choice(llm_texts)
+        session.append_round({
+            "round_number": round_number,
+            "type": "assistant",
+            "model": model,
+            "content": content,
+            "tokens": len(content) // 4,
+            "timeout": False,
+            "error": None,
+            "cached": False,
+            "skipped": False,
+            "input_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_write_tokens": 0,
+            "reasoning_tokens": 0,
+            "usage_source": "provider",
+            "cost_usd": 0.0,
+            "context_ref": make_context_ref(model, round_number - 1),
+            "hallucination_flags": {flag: rng.random() < 0.05 for flag in HALLUCINATION_FLAGS},
+            "round_mode": "sequential",
+            "theta_enabled": False,
+            "theta_mode": None,
+            "timestamp": timestamp
+        }, persist=False)
+        position += 1
+    return session
+
+
+# === ȚINTE ===
+# Fiecare țintă primește sesiunea și întoarce funcția măsurată (pregătirea nu e cronometrată)
+
+def _consume(chunks) -> int:
+    """Parcurge exportul ca StreamingResponse, fără să-l țină în memorie."""
+    return sum(len(chunk) for chunk in encode_stream(chunks))
+
+
+def _export_meta(session: Session) -> Dict:
+    return {"session_id": session.session_id, "total_rounds": len(session.rounds)}
+
+
+def _detect_all(session: Session) -> Callable[[], int]:
+    """detect_hallucinations pe fiecare răspuns din sesiune (ca analyzer --rescan)."""
+    models = list(config.MODELS)
+    calls = [(r["content"], r["model"], models.index(r["model"]))
+             for r in session.rounds if r["type"] == "assistant"]
+
+    def run():
+        return sum(any(detect_hallucinations(content, model, models, position).values())
+                   for content, model, position in calls)
+    return run
+
+
+def _window_turn(session: Session) -> Callable[[], None]:
+    """O tură nouă: runda user e adăugată, apoi fiecare model își primește contextul."""
+    models = list(config.MODELS)
+
+    def run():
+        session.append_round({
+            "round_number": len(session.rounds) + 1,
+            "type": "user",
+            "content": "benchmark",
+            "theta_enabled": False
+        }, persist=False)
+        for model in models:
+            session.context_store.window(model)
+    return run
+
+
+# context_window modifică sesiunea (adaugă runde), deci rulează ultima
+TARGETS: Dict[str, Callable[[Session], Callable[[], object]]] = {
+    "build_context": lambda s: lambda: build_context_from_rounds(s.rounds, "claude"),
+    "detect_hallucinations": _detect_all,
+    "diagnostics": lambda s: s.stats.snapshot,
+    "diagnostics_verify": lambda s: lambda: compute_stats(s.rounds),
+    "export_json": lambda s: lambda: _consume(iter_export_json(_export_meta(s), s.rounds)),
+    "export_ndjson": lambda s: lambda: _consume(iter_export_ndjson(_export_meta(s), s.rounds)),
+    "context_window": _window_turn
+}
+
+
+# === MĂSURARE ===
+
+def measure_time(fn: Callable[[], object], repeat: int = 3) -> float:
+    """Cel mai bun timp per apel (secunde), din `repeat` serii de cel puțin 0.2s."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def measure_peak_memory(fn: Callable[[], object]) -> int:
+    """Memoria de vârf alocată în timpul unui apel (bytes)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def loglog_slope(points: List[Dict], key: str, floor: float) -> Optional[float]:
+    """Panta regresiei log(valoare) ~ log(runde), pe sesiunile de cel puțin SLOPE_MIN_ROUNDS."""
+    selected = [p for p in points if p["rounds"] >= SLOPE_MIN_ROUNDS]
+    if len(selected) < 2:
+        selected = points
+    if len(selected) < 2:
+        return None
+    xs = [math.log(p["rounds"]) for p in selected]
+    ys = [math.log(max(p[key], floor)) for p in selected]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if not variance:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance, 3)
+
+
+def run_benchmarks(sizes: List[int], targets: List[str], repeat: int = 3, seed: int = 0) -> Dict:
+    results = {name: [] for name in targets}
+    for n_rounds in sizes:
+        session = synthetic_session(n_rounds, seed)
+        print(f"[Bench] {n_rounds} runde")
+        for name in targets:
+            fn = TARGETS[name](session)
+            seconds = measure_time(fn, repeat)
+            peak = measure_peak_memory(fn)
+            results[name].append({"rounds": n_rounds, "seconds": seconds, "peak_bytes": peak})
+            print(f"   {name:<22}{seconds * 1000:>12.3f} ms{peak / 1024:>12.1f} KiB")
+
+    return {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "targets": {
+            name: {
+                "points": points,
+                "time_slope": loglog_slope(points, "seconds", TIME_FLOOR_SECONDS),
+                "memory_slope": loglog_slope(points, "peak_bytes", MEMORY_FLOOR_BYTES)
+            }
+            for name, points in results.items()
+        }
+    }
+
+
+# === COMPARAȚIE CU BASELINE ===
+
+def compare(current: Dict, baseline: Dict, tolerance: float = SLOPE_TOLERANCE) -> List[str]:
+    """
+    Regresiile de complexitate față de baseline: pantele de timp sau memorie
+    mai mari cu peste `tolerance`. Țintele lipsă din baseline sunt ignorate.
+    """
+    regressions = []
+    print(f"\n{'target':<22}{'time slope':>20}{'memory slope':>20}{'time vs baseline':>20}")
+    for name, result in current["targets"].items():
+        base = baseline.get("targets", {}).get(name)
+        if base is None:
+            print(f"{name:<22}{'(nou)':>20}")
+            continue
+
+        cells = []
+        for key in ("time_slope", "memory_slope"):
+            if result[key] is None or base[key] is None:
+                cells.append("-")
+                continue
+            # O pantă negativă e zgomot în jurul lui "constant"
+            now, before = max(result[key], 0.0), max(base[key], 0.0)
+            worse = now > before + tolerance
+            cells.append(f"{before:.2f} → {now:.2f}{' !' if worse else ''}")
+            if worse:
+                regressions.append(f"{name}: {key} {before:.2f} → {now:.2f}")
+
+        # Raportul timpilor la cea mai mare sesiune comună (informativ, depinde de mașină)
+        base_points = {p["rounds"]: p["seconds"] for p in base["points"]}
+        common = [p for p in result["points"] if p["rounds"] in base_points]
+        ratio = f"{common[-1]['seconds'] / base_points[common[-1]['rounds']]:.2f}x" if common else "-"
+        print(f"{name:<22}{cells[0]:>20}{cells[1]:>20}{ratio:>20}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark-uri Agora (timp + memorie vs lungimea sesiunii)")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES),
+                        help="Numerele de runde ale sesiunilor sintetice, separate prin virgulă")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Țintele rulate, separate prin virgulă")
+    parser.add_argument("--repeat", type=int, default=3, help="Serii de măsurare per țintă (se păstrează minimul)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fișierul baseline (JSON)")
+    parser.add_argument("--save-baseline", action="store_true", help="Salvează rezultatele ca baseline")
+    parser.add_argument("--tolerance", type=float, default=SLOPE_TOLERANCE,
+                        help="Creșterea maximă acceptată a pantei log-log")
+    parser.add_argument("--out", default=None, help="Scrie și rezultatele rulării în fișier")
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s.strip())
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        raise SystemExit(f"Ținte necunoscute: {unknown} (disponibile: {', '.join(TARGETS)})")
+    # context_window modifică sesiunea: rulează după celelalte ținte
+    targets.sort(key=lambda t: t == "context_window")
+
+    current = run_benchmarks(sizes, targets, args.repeat, args.seed)
+
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"[Bench] Baseline salvat în {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"[Bench] Niciun baseline în {args.baseline} (rulează cu --save-baseline)")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print("\n[Bench] Regresii de complexitate:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1)
+    print("\n[Bench] Nicio regresie de complexitate față de baseline")
+
+
+if __name__ == "__main__":
+    main()
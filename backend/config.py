@@ -1,4 +1,6 @@
 # config.py - API Keys și Settings Centralizate
+import os
+
 #claude=
 #openai=
 # === API KEYS ===
@@ -12,31 +14,141 @@ GROK_API_KEY = "put your Grok API key here"
 # === MODEL CONFIGURATIONS ===
 MODELS = {
     "claude": {
+        "provider": "anthropic",  # vezi providers.py
         "api_model_name": "claude-opus-4-5-20251101",
         "temperature": 0.8,
         #"top_p": 0.90,
-        "timeout": 30
+        "timeout": 30,
+        "context_budget_tokens": 100000,  # tokeni estimați trimiși per tură (None = fără limită)
+        "base_url": None                  # endpoint alternativ (ex. mock local); None = API-ul oficial
     },
     "gpt": {
+        "provider": "openai",
         "api_model_name": "gpt-5.1",
         "temperature": 0.8,
         #"top_p": 0.90,
-        "timeout": 30
+        "timeout": 30,
+        "context_budget_tokens": 100000,  # tokeni estimați trimiși per tură (None = fără limită)
+        "base_url": None                  # endpoint alternativ (ex. mock local); None = API-ul oficial
     },
     "gemini": {
+        "provider": "gemini",
         "api_model_name": "gemini-2.0-flash-exp",
         "temperature": 0.8,
         #"top_p": 0.90,
-        "timeout": 30
+        "timeout": 30,
+        "context_budget_tokens": 100000,  # tokeni estimați trimiși per tură (None = fără limită)
+        "base_url": None                  # endpoint alternativ (ex. mock local); None = API-ul oficial
     },
     "grok": {
+        "provider": "openai_compatible",
         "api_model_name": "grok-4-1-fast-reasoning",
         "temperature": 0.8,
         #"top_p": 0.90,
-        "timeout": 30
-    }
+        "timeout": 30,
+        "context_budget_tokens": 100000,  # tokeni estimați trimiși per tură (None = fără limită)
+        "base_url": None                  # endpoint alternativ (ex. mock local); None = API-ul oficial
+    },
+    # Endpoint local OpenAI-compatible (Ollama, vLLM, llama.cpp, LM Studio), fără cheie:
+    # "llama": {
+    #     "provider": "openai_compatible",
+    #     "api_model_name": "llama3.1:8b",
+    #     "base_url": "http://localhost:11434/v1",
+    #     "api_key": None,
+    #     "temperature": 0.8,
+    #     "timeout": 60,
+    #     "context_budget_tokens": 8000
+    # },
+    # Plugin: "provider": "modul:funcție" (vezi providers.py); "enabled": False dezactivează o intrare
+}
+
+# === MOCK PROVIDERS (teste locale și load test, vezi mock_providers.py) ===
+# Când e setat, toate modelele sunt trimise la serverul mock în locul API-urilor reale
+MOCK_PROVIDERS_URL = os.environ.get("AGORA_MOCK_PROVIDERS_URL") or None
+
+if MOCK_PROVIDERS_URL:
+    _mock = MOCK_PROVIDERS_URL.rstrip("/")
+    MODELS["claude"]["base_url"] = _mock            # SDK-ul adaugă /v1/messages
+    MODELS["gpt"]["base_url"] = f"{_mock}/v1"       # OpenAI SDK: /chat/completions
+    MODELS["gemini"]["base_url"] = _mock            # REST: /v1beta/models/...
+    MODELS["grok"]["base_url"] = f"{_mock}/v1"
+
+# === HTTP CONNECTION POOL (Grok și alți provideri apelați direct prin HTTP) ===
+HTTP_POOL_MAX_CONNECTIONS = 100     # conexiuni simultane maxime
+HTTP_POOL_MAX_KEEPALIVE = 20        # conexiuni păstrate deschise între request-uri
+HTTP_POOL_KEEPALIVE_EXPIRY = 60     # secunde până se închide o conexiune inactivă
+HTTP2_ENABLED = True                # necesită pachetul h2 (httpx[http2]); altfel HTTP/1.1
+
+# === SESIUNI (conversații paralele în memorie) ===
+SESSION_MAX_COUNT = 100             # sesiuni păstrate simultan (LRU)
+SESSION_TTL_SECONDS = 6 * 3600      # sesiunile inactive mai mult de atât sunt șterse
+SESSION_MAX_MEMORY_MB = 512         # memorie totală estimată pentru toate sesiunile
+
+# === JURNAL RUNDE (persistență + recuperare la restart) ===
+ROUND_LOG_ENABLED = True
+ROUND_LOG_PATH = "data/agora_rounds.jsonl"  # relativ la directorul de pornire
+ROUND_LOG_FLUSH_INTERVAL = 0.05     # secunde: fereastra de group commit (un fsync per lot)
+ROUND_LOG_RETRY_DELAY = 0.5         # secunde: primul backoff după o scriere eșuată (se dublează)
+ROUND_LOG_RETRY_MAX_DELAY = 30.0    # backoff maxim între reîncercări
+ROUND_LOG_CLOSE_RETRIES = 3         # la shutdown: încercări după care evenimentele nescrise sunt abandonate
+ROUND_LOG_COMPACT_ON_START = True   # la pornire, jurnalul e rescris doar cu sesiunile încă valide
+
+# === EXPORT ===
+EXPORT_DIR = "data/exports"         # folosit doar pentru /export?save=true
+
+# === MOD RUNDĂ ===
+ROUND_MODE_DEFAULT = "sequential"   # "sequential" (Solution B) sau "blind" (toate modelele în paralel);
+                                    # "round_mode" în /message îl suprascrie
+
+# === TERMEN PER RUNDĂ ===
+ROUND_DEADLINE_SECONDS = None       # termen total al unei runde (None = doar timeout-ul fiecărui model);
+                                    # "deadline_seconds" în /message îl suprascrie
+
+# === SCHEDULER PER PROVIDER (limite comune tuturor sesiunilor) ===
+# max_concurrency = apeluri simultane, rpm/tpm = request-uri/tokeni pe minut (None = fără limită)
+PROVIDER_LIMITS = {
+    "claude": {"max_concurrency": 8, "rpm": 50, "tpm": 80000},
+    "gpt": {"max_concurrency": 8, "rpm": 500, "tpm": 200000},
+    "gemini": {"max_concurrency": 8, "rpm": 100, "tpm": 1000000},
+    "grok": {"max_concurrency": 8, "rpm": 60, "tpm": 100000},
+    "default": {"max_concurrency": 4, "rpm": None, "tpm": None}
+}
+RETRY_MAX_RETRIES = 3               # reîncercări pentru 429/5xx/erori de conexiune
+RETRY_BASE_DELAY = 1.0              # secunde; backoff exponențial cu jitter
+RETRY_MAX_DELAY = 30.0              # plafonul backoff-ului
+RETRY_AFTER_MAX = 60.0              # Retry-After mai lung de atât e plafonat
+RETRY_ON_TIMEOUT = False            # timeout-ul clientului nu e reîncercat: o încercare durează deja
+                                    # MODELS[...]["timeout"], reîncercările ar bloca runda de câteva ori atât
+
+# === COSTURI (USD per milion de tokeni; vezi cost_ledger.py) ===
+# cache_read / cache_write = tokenii de prompt citiți / scriși în cache-ul providerului;
+# modelele fără intrare au costul None (tokenii sunt totuși contabilizați)
+MODEL_PRICING = {
+    "claude": {"input": 5.00, "output": 25.00, "cache_read": 0.50, "cache_write": 6.25},
+    "gpt": {"input": 1.25, "output": 10.00, "cache_read": 0.125, "cache_write": 1.25},
+    "gemini": {"input": 0.10, "output": 0.40, "cache_read": 0.025, "cache_write": 0.10},
+    "grok": {"input": 0.20, "output": 0.50, "cache_read": 0.05, "cache_write": 0.20}
 }
 
+# === METRICI (/metrics, format Prometheus) ===
+EVENT_LOOP_LAG_INTERVAL = 0.5       # secunde între eșantioanele de lag ale event loop-ului (None = oprit)
+
+# === PROMPT CACHING LA PROVIDER (prefixul stabil: prompt θ-Logos + istoric) ===
+PROMPT_CACHE_ENABLED = True         # Claude: breakpoint-uri cache_control; ceilalți cache-uiesc automat
+
+# === CONTEXT WINDOW (bugetul per model e în MODELS[...]["context_budget_tokens"]) ===
+CONTEXT_PINNED_ROUNDS = (1,)        # runde păstrate mereu în context (1 = primul mesaj user)
+CONTEXT_TRIM_TARGET = 0.75          # la depășire, fereastra scade la 75% din buget (se mută rar)
+CONTEXT_SUMMARY_ENABLED = False     # rundele tăiate sunt înlocuite de un rezumat extractiv local
+CONTEXT_SUMMARY_MAX_TOKENS = 1000   # bugetul rezumatului (cele mai recente runde tăiate)
+CONTEXT_SUMMARY_LINE_CHARS = 200    # caractere păstrate din fiecare rundă rezumată
+
+# === CACHE RĂSPUNSURI LLM (rerulări identice fără apel la provider) ===
+RESPONSE_CACHE_ENABLED = False      # implicit pentru request-uri; "use_cache" în /message suprascrie
+RESPONSE_CACHE_MEMORY_ENTRIES = 1024  # răspunsuri păstrate în memorie (LRU)
+RESPONSE_CACHE_DIR = "data/response_cache"  # None = doar memorie
+RESPONSE_CACHE_DISK_MAX_MB = 256    # peste limită, cele mai vechi accesate sunt șterse
+
 # === TOKEN LIMITS ===
 TOKEN_LIMIT_DEFAULT = 300
 TOKEN_LIMIT_MIN = 50
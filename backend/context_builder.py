@@ -1,6 +1,17 @@
 # context_builder.py
 
-from typing import List, Dict
+import re
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+import config
+from token_estimator import estimate_tokens, estimate_message_tokens
+
+
+def in_context(round_data: Dict) -> bool:
+    """Rundele care apar în context: user și LLM, fără cele sărite (deadline)."""
+    return round_data["type"] in ("user", "assistant") and not round_data.get("skipped")
+
 
 def build_context_from_rounds(rounds: List[Dict], current_model: str) -> List[Dict]:
     """
@@ -30,6 +41,9 @@ def build_context_from_rounds(rounds: List[Dict], current_model: str) -> List[Di
     context = []
     
     for round_data in rounds:
+        if not in_context(round_data):
+            continue
+        
         if round_data["type"] == "user":
             # Human messages rămân "user"
             context.append({
@@ -59,45 +73,400 @@ def build_context_from_rounds(rounds: List[Dict], current_model: str) -> List[Di
     return context
 
 
-def detect_hallucinations(content: str, model_name: str, order: List[str], position: int) -> Dict:
+def make_context_ref(model_name: str, last_round: int, first_round: int = 1,
+                     pinned_rounds: Optional[List[int]] = None,
+                     summary_rounds: Optional[Tuple[int, int]] = None) -> Dict:
+    """
+    Referință compactă la contextul trimis unui model.
+    
+    În loc să stocăm o copie a conversației în fiecare rundă (memorie O(n²)),
+    păstrăm doar perspectiva (modelul) și intervalul de runde văzut. Când
+    bugetul de context a tăiat istoricul, referința notează și rundele fixate
+    (pinned) și intervalul rezumat.
+    """
+    ref = {"model": model_name, "first_round": first_round, "last_round": last_round}
+    if pinned_rounds:
+        ref["pinned_rounds"] = list(pinned_rounds)
+    if summary_rounds:
+        ref["summary_rounds"] = list(summary_rounds)
+    return ref
+
+
+def resolve_context_ref(rounds: List[Dict], context_ref: Dict) -> List[Dict]:
+    """
+    Reconstruiește context_sent dintr-o referință make_context_ref.
+    
+    Args:
+        rounds: Toate rundele sesiunii (round_number = index + 1)
+        context_ref: {"model", "first_round", "last_round"} plus, opțional,
+                     "pinned_rounds" și "summary_rounds"
+        
+    Returns:
+        Context în format API, identic cu cel trimis modelului
+    """
+    model_name = context_ref["model"]
+    pinned = context_ref.get("pinned_rounds", [])
+    
+    context = build_context_from_rounds([rounds[n - 1] for n in pinned], model_name)
+    if context_ref.get("summary_rounds"):
+        first, last = context_ref["summary_rounds"]
+        context.append(build_summary_message(rounds, first, last, pinned))
+    
+    visible = rounds[context_ref["first_round"] - 1:context_ref["last_round"]]
+    return context + build_context_from_rounds(visible, model_name)
+
+
+# === REZUMAT (rundele scoase din fereastra de context) ===
+
+def _summary_line(round_data: Dict) -> str:
+    """O linie per rundă: vorbitorul și începutul răspunsului."""
+    speaker = "USER" if round_data["type"] == "user" else round_data["model"].upper()
+    limit = config.CONTEXT_SUMMARY_LINE_CHARS
+    text = " ".join(round_data["content"][:limit * 2].split())
+    if len(text) > limit:
+        text = text[:limit].rstrip() + "…"
+    return f"- {speaker}: {text}"
+
+
+def build_summary_message(rounds: List[Dict], first_round: int, last_round: int,
+                          pinned_rounds: Optional[List[int]] = None) -> Dict:
+    """
+    Rezumat extractiv (local, determinist) al rundelor first_round..last_round.
+    
+    Rundele fixate sunt trimise separat, deci nu apar în rezumat. Fiind
+    determinist, rezumatul se poate reconstrui exact din context_ref.
+    """
+    pinned = set(pinned_rounds or [])
+    lines = [
+        _summary_line(rounds[n - 1]) for n in range(first_round, last_round + 1)
+        if n not in pinned and in_context(rounds[n - 1])
+    ]
+    return {
+        "role": "user",
+        "content": f"Summary of earlier conversation (rounds {first_round}-{last_round}):\n" + "\n".join(lines)
+    }
+
+
+def _round_message_tokens(round_data: Dict) -> int:
+    """Tokenii estimați ai mesajului unei runde (forma "Previous response from ..." pentru LLM)."""
+    if not in_context(round_data):
+        return 0
+    if round_data["type"] == "user":
+        return estimate_message_tokens({"content": round_data["content"]})
+    if round_data["type"] == "assistant":
+        return estimate_message_tokens({
+            "content": f"Previous response from {round_data['model'].upper()}:\n{round_data['content']}"
+        })
+    return 0
+
+
+class ContextBudgetError(ValueError):
+    """Mesajul user curent singur depășește bugetul de context al modelului."""
+    
+    def __init__(self, model_name: str, tokens: int, budget: int):
+        super().__init__(f"{model_name}: mesajul curent are ~{tokens} tokeni, bugetul de context e {budget}")
+        self.model_name = model_name
+        self.tokens = tokens
+        self.budget = budget
+
+
+class ContextStore:
+    """
+    Contextul API al fiecărui model, menținut incremental.
+    
+    Echivalent cu build_context_from_rounds(rounds, model), dar fiecare rundă nouă
+    e formatată o singură dată și adăugată la contextele existente, în loc să
+    reparcurgem toată conversația pentru fiecare model la fiecare tură.
+    
+    window() aplică bugetul de tokeni al modelului (MODELS[...]["context_budget_tokens"]):
+    rundele fixate, un rezumat opțional al rundelor tăiate, apoi cele mai noi
+    runde care încap. Începutul ferestrei avansează doar când bugetul e depășit,
+    și atunci cu o marjă (CONTEXT_TRIM_TARGET), deci costul per tură nu crește
+    odată cu sesiunea. Cea mai nouă rundă user (întrebarea curentă) rămâne
+    mereu în fereastră; dacă ea singură nu încape, window() ridică
+    ContextBudgetError.
+    
+    Mesajele (dict-uri) sunt partajate între contexte: nu le modifica pe loc.
+    """
+    
+    def __init__(self, rounds: Optional[List[Dict]] = None):
+        # Lista de runde e partajată cu apelantul; append() o extinde
+        self.rounds: List[Dict] = rounds if rounds is not None else []
+        self._contexts: Dict[str, List[Dict]] = {}
+        # Per rundă: tokenii estimați și indexul mesajului ei în contexte
+        self._tokens: List[int] = []
+        self._message_index: List[int] = []
+        self._message_count = 0
+        # Indexul celei mai noi runde user (-1 dacă nu există)
+        self._last_user = -1
+        # model -> [index primă rundă în fereastră, tokeni din fereastră]
+        self._windows: Dict[str, List[int]] = {}
+        # model -> ((prima, ultima rundă rezumată), mesaj rezumat)
+        self._summaries: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        # Starea per model trebuie să existe înainte de indexarea rundelor existente
+        for round_data in self.rounds:
+            self._index_round(round_data)
+    
+    def _index_round(self, round_data: Dict):
+        tokens = _round_message_tokens(round_data)
+        self._tokens.append(tokens)
+        self._message_index.append(self._message_count)
+        if in_context(round_data):
+            self._message_count += 1
+            if round_data["type"] == "user":
+                self._last_user = len(self._tokens) - 1
+        for window in self._windows.values():
+            window[1] += tokens
+    
+    def append(self, round_data: Dict):
+        """Adaugă o rundă și actualizează contextul fiecărui model cunoscut."""
+        self.rounds.append(round_data)
+        self._index_round(round_data)
+        
+        if not in_context(round_data):
+            return
+        
+        if round_data["type"] == "user":
+            message = {"role": "user", "content": round_data["content"]}
+            for context in self._contexts.values():
+                context.append(message)
+        
+        elif round_data["type"] == "assistant":
+            model_name = round_data["model"]
+            content = round_data["content"]
+            # Aceleași identity boundaries ca build_context_from_rounds
+            own = {"role": "assistant", "content": content}
+            other = {"role": "user", "content": f"Previous response from {model_name.upper()}:\n{content}"}
+            for current_model, context in self._contexts.items():
+                context.append(own if current_model == model_name else other)
+    
+    def _context(self, current_model: str) -> List[Dict]:
+        context = self._contexts.get(current_model)
+        if context is None:
+            context = build_context_from_rounds(self.rounds, current_model)
+            self._contexts[current_model] = context
+        return context
+    
+    def get(self, current_model: str) -> List[Dict]:
+        """
+        Contextul complet pentru current_model, identic cu build_context_from_rounds.
+        
+        Prima cerere pentru un model construiește contextul o dată; după aceea
+        e doar menținut. Returnează o copie a listei (nu a mesajelor), ca
+        rundele viitoare să nu modifice contextul deja trimis.
+        """
+        return list(self._context(current_model))
+    
+    def window(self, current_model: str) -> Tuple[List[Dict], Dict]:
+        """
+        Contextul de trimis lui current_model, în bugetul lui de tokeni.
+        
+        Returns:
+            (context, context_ref) - context_ref îl reconstruiește exact
+        
+        Raises:
+            ContextBudgetError: runda user curentă singură depășește bugetul
+        """
+        context = self._context(current_model)
+        total_rounds = len(self.rounds)
+        budget = config.MODELS.get(current_model, {}).get("context_budget_tokens")
+        
+        window = self._windows.get(current_model)
+        if window is None:
+            window = self._windows[current_model] = [0, sum(self._tokens)]
+        
+        if budget:
+            if self._last_user >= 0 and self._tokens[self._last_user] > budget:
+                raise ContextBudgetError(current_model, self._tokens[self._last_user], budget)
+            self._trim(current_model, window, budget)
+        start = window[0]
+        
+        if start == 0:
+            return list(context), make_context_ref(current_model, total_rounds)
+        
+        pinned = [n for n in self._pinned_rounds() if n <= start]
+        messages = [context[self._message_index[n - 1]] for n in pinned
+                    if in_context(self.rounds[n - 1])]
+        
+        summary_rounds = None
+        if config.CONTEXT_SUMMARY_ENABLED:
+            summary_rounds, summary_message = self._summary(current_model, start, pinned)
+            if summary_message is not None:
+                messages.append(summary_message)
+        
+        messages.extend(context[self._message_offset(start):])
+        ref = make_context_ref(current_model, total_rounds, start + 1, pinned, summary_rounds)
+        return messages, ref
+    
+    def _pinned_rounds(self) -> List[int]:
+        return [n for n in config.CONTEXT_PINNED_ROUNDS if 1 <= n <= len(self.rounds)]
+    
+    def _message_offset(self, round_index: int) -> int:
+        if round_index >= len(self.rounds):
+            return self._message_count
+        return self._message_index[round_index]
+    
+    def _trim(self, current_model: str, window: List[int], budget: int):
+        """
+        Avansează începutul ferestrei până când rundele rămase încap în buget,
+        dar niciodată dincolo de cea mai nouă rundă user.
+        """
+        reserved = sum(self._tokens[n - 1] for n in self._pinned_rounds())
+        if config.CONTEXT_SUMMARY_ENABLED:
+            reserved += config.CONTEXT_SUMMARY_MAX_TOKENS
+        
+        used = window[1] + (reserved if window[0] > 0 else 0)
+        if used <= budget:
+            return
+        
+        # Tăiem cu marjă, ca fereastra să nu se mute la fiecare tură
+        target = max(budget - reserved, 0) * config.CONTEXT_TRIM_TARGET
+        start, tokens = window
+        # Modelul trebuie să vadă întrebarea la care răspunde
+        limit = self._last_user if self._last_user >= 0 else len(self.rounds)
+        while start < limit and tokens > target:
+            tokens -= self._tokens[start]
+            start += 1
+        
+        # Contextul nu începe cu propriul răspuns (rol "assistant")
+        while start < limit and (
+            not in_context(self.rounds[start])
+            or self.rounds[start].get("model") == current_model
+        ):
+            tokens -= self._tokens[start]
+            start += 1
+        
+        window[0], window[1] = start, tokens
+    
+    def _summary(self, current_model: str, start: int,
+                 pinned: List[int]) -> Tuple[Optional[Tuple[int, int]], Optional[Dict]]:
+        """Rezumatul celor mai recente runde tăiate (recalculat doar când fereastra se mută)."""
+        cached = self._summaries.get(current_model)
+        if cached is not None and cached[0][1] == start:
+            return cached
+        
+        # Rundele 1..start sunt în afara ferestrei; rezumăm de la cea mai nouă
+        # înapoi, cât încape în CONTEXT_SUMMARY_MAX_TOKENS
+        pinned_set = set(pinned)
+        available = config.CONTEXT_SUMMARY_MAX_TOKENS
+        first = start + 1
+        summarized = 0
+        while first > 1:
+            n = first - 1
+            if n not in pinned_set:
+                cost = estimate_tokens(_summary_line(self.rounds[n - 1])) + 1
+                if cost > available:
+                    break
+                available -= cost
+                summarized += 1
+            first = n
+        
+        if not summarized:
+            return None, None
+        summary = ((first, start), build_summary_message(self.rounds, first, start, pinned))
+        self._summaries[current_model] = summary
+        return summary
+
+
+# Forma "<model> a zis": căutăm marcajul și verificăm ce model îl precede
+_SAID_MARKER = " a zis"
+
+
+@lru_cache(maxsize=64)
+def _bracket_pattern(models: Tuple[str, ...]) -> "re.Pattern":
+    """Un singur regex pentru "[model]", pentru tot setul de modele."""
+    names = "|".join(re.escape(m) for m in sorted(models, key=len, reverse=True))
+    return re.compile(rf"\[({names})\]")
+
+
+def _find_mentions(content_lower: str, models: Tuple[str, ...]) -> List[Tuple[str, str, int, int]]:
+    """
+    Toate mențiunile "[model]" și "model a zis", în ordinea pozițiilor.
+    
+    O parcurgere pentru fiecare formă, indiferent de numărul de modele;
+    găsește exact ce găseau testele `in` pe fiecare model în parte.
+    """
+    mentions = []
+    for match in _bracket_pattern(models).finditer(content_lower):
+        mentions.append((match.group(1), "[model]", match.start(), match.end()))
+    
+    index = content_lower.find(_SAID_MARKER)
+    while index != -1:
+        end = index + len(_SAID_MARKER)
+        for model in models:
+            if content_lower.endswith(model, 0, index):
+                mentions.append((model, "a zis", index - len(model), end))
+        index = content_lower.find(_SAID_MARKER, index + 1)
+    
+    mentions.sort(key=lambda m: m[2])
+    return mentions
+
+
+def scan_hallucinations(content: str, model_name: str, order: List[str], position: int,
+                        models: Optional[List[str]] = None) -> List[Dict]:
     """
-    Detectează halucinații - versiune simplificată.
+    Găsește toate mențiunile de modele care declanșează flag-uri de halucinație.
     
     Args:
         content: Conținutul răspunsului
         model_name: Numele modelului care a răspuns
         order: Ordinea LLM-urilor în rundă
         position: Poziția modelului în ordine
+        models: Setul de modele recunoscute (implicit config.MODELS + order)
         
     Returns:
-        Dict cu flags pentru diferite tipuri de halucinații
+        Listă de potriviri {"flag", "model", "form", "start", "end"}; pozițiile
+        sunt în content.lower(). O mențiune poate declanșa mai multe flag-uri.
     """
+    if models is None:
+        models = list(config.MODELS) + [m for m in order if m not in config.MODELS]
+    model_name = model_name.lower()
+    known = tuple(sorted(set(m.lower() for m in models) | {model_name}))
+    future_models = {m.lower() for m in order[position + 1:]}
+    
+    matches = []
+    for mentioned, form, start, end in _find_mentions(content.lower(), known):
+        span = {"model": mentioned, "form": form, "start": start, "end": end}
+        
+        # Inventează răspunsuri viitoare (modele care nu au răspuns încă)
+        if mentioned in future_models:
+            matches.append({"flag": "invents_future_responses", **span})
+        # Auto-citare (se referă la sine în persoana a treia)
+        if mentioned == model_name and form == "[model]":
+            matches.append({"flag": "self_citation", **span})
+        # Citează alte modele
+        if mentioned != model_name:
+            matches.append({"flag": "quotes_others", **span})
+    
+    return matches
+
+
+def hallucination_flags(matches: List[Dict]) -> Dict:
+    """Flag-urile de halucinație din potrivirile scan_hallucinations."""
     flags = {
         "invents_future_responses": False,
         "self_citation": False,
         "consecutive_responses": False,
         "quotes_others": False
     }
-    
-    content_lower = content.lower()
-    
-    # Inventează răspunsuri viitoare (modele care nu au răspuns încă)
-    future_models = order[position + 1:] if position < len(order) - 1 else []
-    for future_model in future_models:
-        if f"[{future_model}]" in content_lower or f"{future_model} a zis" in content_lower:
-            flags["invents_future_responses"] = True
-            break
-    
-    # Auto-citare (se referă la sine în persoana a treia)
-    if f"[{model_name}]" in content_lower:
-        flags["self_citation"] = True
-    
-    # Citează alte modele
-    all_models = ["claude", "gpt", "gemini", "grok"]
-    other_models = [m for m in all_models if m != model_name]
-    for other in other_models:
-        if f"[{other}]" in content_lower or f"{other} a zis" in content_lower:
-            flags["quotes_others"] = True
-            break
-    
+    for match in matches:
+        flags[match["flag"]] = True
     return flags
+
+
+def detect_hallucinations(content: str, model_name: str, order: List[str], position: int,
+                          models: Optional[List[str]] = None) -> Dict:
+    """
+    Detectează halucinații - doar flag-urile din scan_hallucinations.
+    
+    Args:
+        content: Conținutul răspunsului
+        model_name: Numele modelului care a răspuns
+        order: Ordinea LLM-urilor în rundă
+        position: Poziția modelului în ordine
+        models: Setul de modele recunoscute (implicit config.MODELS + order)
+        
+    Returns:
+        Dict cu flags pentru diferite tipuri de halucinații
+    """
+    return hallucination_flags(scan_hallucinations(content, model_name, order, position, models))
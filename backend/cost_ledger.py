@@ -0,0 +1,85 @@
+# cost_ledger.py - Usage unificat per apel (input/output/cache/raționament) și costul lui
+"""
+Providerii raportează usage în formate diferite; llm_clients le aduce la
+aceleași câmpuri (vezi _record_usage):
+
+    input_tokens        tot promptul, inclusiv tokenii citiți/scriși în cache
+    output_tokens       răspunsul, inclusiv tokenii de raționament
+    cache_read_tokens   partea din input citită din cache-ul providerului
+    cache_write_tokens  partea din input scrisă în cache (Anthropic)
+    reasoning_tokens    partea din output folosită pentru raționament
+
+Când providerul nu raportează nimic (endpoint-uri locale, pluginuri), input
+și output sunt estimate local cu token_estimator, iar usage_source e
+"estimate". Costul folosește config.MODEL_PRICING.
+"""
+
+from typing import Dict, List, Optional
+
+import config
+from token_estimator import estimate_messages_tokens, estimate_tokens
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens", "reasoning_tokens")
+
+
+def usage_record(usage: Dict, messages: List[Dict], text: str, billed: bool) -> Dict:
+    """
+    Câmpurile de usage ale unei runde LLM.
+
+    Args:
+        usage: Dict-ul completat de llm_clients (gol dacă providerul n-a raportat)
+        messages: Contextul trimis modelului (pentru estimarea input-ului)
+        text: Răspunsul (pentru estimarea output-ului)
+        billed: False pentru rundele fără apel facturat (cache, sărite, erori)
+    """
+    if not billed:
+        return {**{field: 0 for field in USAGE_FIELDS}, "usage_source": None}
+    if "input_tokens" in usage:
+        record = {field: usage.get(field, 0) for field in USAGE_FIELDS}
+        source = "provider"
+        if "output_tokens" not in usage:
+            record["output_tokens"] = estimate_tokens(text)
+            source = "partial"
+        return {**record, "usage_source": source}
+    return {
+        **{field: 0 for field in USAGE_FIELDS},
+        "input_tokens": estimate_messages_tokens(messages),
+        "output_tokens": estimate_tokens(text),
+        "usage_source": "estimate"
+    }
+
+
+def usage_cost(model_name: str, record: Dict) -> Optional[float]:
+    """Costul în USD al unui apel (None dacă modelul n-are preț în config)."""
+    pricing = config.MODEL_PRICING.get(model_name)
+    if pricing is None:
+        return None
+    cache_read = record.get("cache_read_tokens", 0)
+    cache_write = record.get("cache_write_tokens", 0)
+    uncached = max(record.get("input_tokens", 0) - cache_read - cache_write, 0)
+    cost = (
+        uncached * pricing["input"]
+        + cache_read * pricing.get("cache_read", pricing["input"])
+        + cache_write * pricing.get("cache_write", pricing["input"])
+        + record.get("output_tokens", 0) * pricing["output"]
+    )
+    return round(cost / 1_000_000, 8)
+
+
+def new_ledger() -> Dict:
+    return {**{field: 0 for field in USAGE_FIELDS}, "calls": 0, "estimated_calls": 0, "cost_usd": 0.0}
+
+
+def add_to_ledger(ledger: Dict, round_data: Dict):
+    """Adaugă usage-ul unei runde LLM la agregat (sesiune sau model)."""
+    if not round_data.get("usage_source"):
+        return
+    ledger["calls"] += 1
+    if round_data["usage_source"] != "provider":
+        ledger["estimated_calls"] += 1
+    # Rundele păstrează output-ul în "tokens"
+    ledger["output_tokens"] += round_data.get("tokens", 0)
+    for field in USAGE_FIELDS:
+        if field != "output_tokens":
+            ledger[field] += round_data.get(field, 0)
+    ledger["cost_usd"] = round(ledger["cost_usd"] + (round_data.get("cost_usd") or 0.0), 8)
@@ -1,8 +1,16 @@
 # exporter.py - Export JSON pentru Diagnoză
 
 import json
+import zlib
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
+from context_builder import resolve_context_ref
+
+# Chunk-urile mici (câte o rundă) sunt grupate până la această mărime
+_STREAM_BUFFER_BYTES = 64 * 1024
+
+EXPORT_FORMATS = ("json", "ndjson")
+EXPORT_COMPRESSIONS = ("none", "gzip", "zstd")
 
 def export_conversation(rounds_data: List[Dict], filename: str = None) -> str:
     """
@@ -19,18 +27,128 @@ def export_conversation(rounds_data: List[Dict], filename: str = None) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"agora_conversation_{timestamp}.json"
     
-    export_data = {
+    meta = {
         "conversation_id": datetime.now().isoformat(),
         "export_timestamp": datetime.now().isoformat(),
-        "total_rounds": len(rounds_data),
-        "rounds": rounds_data
+        "total_rounds": len(rounds_data)
     }
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False, indent=2)
+    write_export(filename, iter_export_json(meta, rounds_data))
     
     return filename
 
+def _iter_rounds(rounds_data: List[Dict], total: int, expand_context: bool) -> Iterator[Dict]:
+    """Primele `total` runde; lista poate crește între timp (o rundă în curs)."""
+    for index in range(total):
+        round_data = rounds_data[index]
+        yield expand_round(round_data, rounds_data) if expand_context else round_data
+
+def iter_export_json(meta: Dict, rounds_data: List[Dict], expand_context: bool = False) -> Iterator[str]:
+    """
+    Exportul JSON ({...meta, "rounds": [...]}) serializat rundă cu rundă.
+    
+    Memoria folosită nu depinde de lungimea conversației: nu construim
+    documentul complet, doar câte o rundă odată.
+    """
+    total = meta.get("total_rounds", len(rounds_data))
+    header = json.dumps(meta, ensure_ascii=False)[:-1]
+    yield (header + ", " if meta else "{") + '"rounds": ['
+    
+    for index, round_data in enumerate(_iter_rounds(rounds_data, total, expand_context)):
+        yield ("," if index else "") + "\n" + json.dumps(round_data, ensure_ascii=False)
+    
+    yield "\n]}\n"
+
+def iter_export_ndjson(meta: Dict, rounds_data: List[Dict], expand_context: bool = False) -> Iterator[str]:
+    """Varianta NDJSON: prima linie = metadatele, apoi câte o rundă pe linie."""
+    total = meta.get("total_rounds", len(rounds_data))
+    yield json.dumps(meta, ensure_ascii=False) + "\n"
+    
+    for round_data in _iter_rounds(rounds_data, total, expand_context):
+        yield json.dumps(round_data, ensure_ascii=False) + "\n"
+
+def _zstd_compressor():
+    """Compresor zstd (pachet opțional zstandard)."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("Compresia zstd necesită pachetul zstandard (pip install zstandard)")
+    return zstandard.ZstdCompressor().compressobj()
+
+def check_compression(compression: str):
+    """ValueError dacă compresia e necunoscută sau pachetul ei lipsește."""
+    if compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Compresie necunoscută: {compression}")
+    if compression == "zstd":
+        _zstd_compressor()
+
+def encode_stream(chunks: Iterable[str], compression: str = "none") -> Iterator[bytes]:
+    """
+    Codifică (UTF-8) și opțional comprimă un flux de chunk-uri text.
+    
+    Args:
+        chunks: Bucăți de text (ex. iter_export_json)
+        compression: "none", "gzip" sau "zstd"
+    """
+    check_compression(compression)
+    
+    compressor = None
+    if compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 → format gzip
+    elif compression == "zstd":
+        compressor = _zstd_compressor()
+    
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        buffer.append(data)
+        buffered += len(data)
+        if buffered < _STREAM_BUFFER_BYTES:
+            continue
+        
+        data = b"".join(buffer)
+        buffer, buffered = [], 0
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    
+    data = b"".join(buffer)
+    if compressor is not None:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+def write_export(path: str, chunks: Iterable[str], compression: str = "none") -> str:
+    """Scrie un export pe disc fără să-l țină întreg în memorie."""
+    with open(path, "wb") as f:
+        for data in encode_stream(chunks, compression):
+            f.write(data)
+    return path
+
+def export_filename(fmt: str = "json", compression: str = "none", timestamp_ms: Optional[int] = None) -> str:
+    """agora_theta_<ms>.json / .ndjson, cu .gz / .zst pentru compresie."""
+    if timestamp_ms is None:
+        timestamp_ms = int(datetime.now().timestamp() * 1000)
+    suffix = {"none": "", "gzip": ".gz", "zstd": ".zst"}[compression]
+    return f"agora_theta_{timestamp_ms}.{fmt}{suffix}"
+
+def expand_round(round_data: Dict, rounds_data: List[Dict]) -> Dict:
+    """
+    Rundă cu context_sent complet, reconstruit din context_ref.
+    
+    Rundele vechi (care au deja context_sent) sunt returnate neschimbate.
+    """
+    context_ref = round_data.get("context_ref")
+    if context_ref is None:
+        return round_data
+    
+    expanded = dict(round_data)
+    expanded["context_sent"] = resolve_context_ref(rounds_data, context_ref)
+    return expanded
+
+
 def generate_diagnostic_report(rounds_data: List[Dict]) -> Dict:
     """
     Generează raport diagnostic despre halucinații.
@@ -48,24 +166,31 @@ def generate_diagnostic_report(rounds_data: List[Dict]) -> Dict:
     
     by_model = {}
     
+    # Exporturile /export au rundele LLM direct în listă ("type": "assistant");
+    # formatul vechi le grupa sub "responses"
+    responses = []
     for round_data in rounds_data:
-        for response in round_data.get("responses", []):
-            total_responses += 1
-            model = response["model"]
-            
-            if model not in by_model:
-                by_model[model] = {
-                    "total_responses": 0,
-                    "hallucinations": {k: 0 for k in hallucination_counts.keys()}
-                }
-            
-            by_model[model]["total_responses"] += 1
-            
-            hallucinations = response.get("hallucination_flags", {})
-            for flag, value in hallucinations.items():
-                if value:
-                    hallucination_counts[flag] += 1
-                    by_model[model]["hallucinations"][flag] += 1
+        if round_data.get("type") == "assistant":
+            responses.append(round_data)
+        responses.extend(round_data.get("responses", []))
+    
+    for response in responses:
+        total_responses += 1
+        model = response["model"]
+        
+        if model not in by_model:
+            by_model[model] = {
+                "total_responses": 0,
+                "hallucinations": {k: 0 for k in hallucination_counts.keys()}
+            }
+        
+        by_model[model]["total_responses"] += 1
+        
+        hallucinations = response.get("hallucination_flags", {})
+        for flag, value in hallucinations.items():
+            if value:
+                hallucination_counts[flag] += 1
+                by_model[model]["hallucinations"][flag] += 1
     
     return {
         "total_responses": total_responses,
@@ -1,41 +1,129 @@
 # llm_clients.py - LLM API Calls with θ-Logos Integration
 
-from anthropic import Anthropic
-from openai import OpenAI
-import google.generativeai as genai
+import asyncio
+import json
+import time
 import httpx
-from typing import Tuple, List, Dict
+from typing import Any, Tuple, List, Dict, Optional, Callable
 import config
 from theta_prompts import get_theta_prompt
+from scheduler import get_scheduler, RetryableHTTPError, RETRYABLE_STATUS_CODES, parse_retry_after
+from token_estimator import estimate_messages_tokens
+from metrics import EMPTY_RESPONSES, SAFETY_BLOCKS, observe_provider_request
 
 # === INITIALIZE CLIENTS ===
+# Clienții (și SDK-urile lor) sunt creați leneș: la pornire doar pentru
+# modelele active (providers.activate_providers), altfel la primul apel.
+# Un deployment cu un singur model nu importă celelalte SDK-uri.
 _claude_client = None
 _openai_client = None
 _gemini_model = None
 
-if config.CLAUDE_API_KEY:
-    _claude_client = Anthropic(api_key=config.CLAUDE_API_KEY)
+# base_url din config (None = endpoint-ul oficial) permite rularea contra unui mock local.
+# max_retries=0: reîncercările sunt făcute de scheduler.py, nu și de SDK.
 
-if config.OPENAI_API_KEY:
-    _openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
 
-if config.GEMINI_API_KEY:
-    genai.configure(api_key=config.GEMINI_API_KEY)
-    _gemini_model = genai.GenerativeModel(config.MODELS["gemini"]["api_model_name"])
+def init_claude():
+    global _claude_client
+    if _claude_client is None and config.CLAUDE_API_KEY:
+        from anthropic import AsyncAnthropic
+        _claude_client = AsyncAnthropic(
+            api_key=config.CLAUDE_API_KEY,
+            base_url=config.MODELS["claude"].get("base_url"),
+            max_retries=0
+        )
+    return _claude_client
 
 
-def _inject_theta_prompt(messages: List[Dict], max_tokens: int) -> List[Dict]:
+def init_openai():
+    global _openai_client
+    if _openai_client is None and config.OPENAI_API_KEY:
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(
+            api_key=config.OPENAI_API_KEY,
+            base_url=config.MODELS["gpt"].get("base_url"),
+            max_retries=0
+        )
+    return _openai_client
+
+
+def init_gemini():
+    global _gemini_model
+    if _gemini_model is None and config.GEMINI_API_KEY:
+        import google.generativeai as genai
+        if config.MODELS["gemini"].get("base_url"):
+            genai.configure(
+                api_key=config.GEMINI_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": config.MODELS["gemini"]["base_url"]}
+            )
+        else:
+            genai.configure(api_key=config.GEMINI_API_KEY)
+        _gemini_model = genai.GenerativeModel(config.MODELS["gemini"]["api_model_name"])
+    return _gemini_model
+
+
+# Pool HTTP comun pentru providerii apelați direct (Grok): deschis la lifespan
+# startup, refolosește conexiunile TCP/TLS între runde
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 în httpx necesită pachetul opțional h2."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def init_http_pool() -> httpx.AsyncClient:
+    """Creează pool-ul HTTP persistent (apelat din lifespan la pornire)."""
+    global _http_client
+    if _http_client is not None:
+        return _http_client
+    
+    http2 = config.HTTP2_ENABLED and _http2_available()
+    if config.HTTP2_ENABLED and not http2:
+        print("[HTTP] Pachetul h2 lipsește, folosesc HTTP/1.1 (pip install httpx[http2])")
+    
+    _http_client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=config.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_POOL_KEEPALIVE_EXPIRY
+        )
+    )
+    return _http_client
+
+
+async def close_http_pool():
+    """Închide pool-ul HTTP (apelat din lifespan la oprire)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _theta_active(theta_enabled: Optional[bool]) -> bool:
+    """θ-Logos state for one call: explicit per-request value, else config default."""
+    return config.THETA_ENABLED if theta_enabled is None else theta_enabled
+
+
+def _inject_theta_prompt(messages: List[Dict], max_tokens: int, theta_enabled: Optional[bool] = None) -> List[Dict]:
     """
     Inject θ-Logos system prompt if enabled.
     
     Args:
         messages: Original conversation messages
         max_tokens: Token limit for this round
+        theta_enabled: Per-request θ-Logos state (None = config.THETA_ENABLED)
         
     Returns:
         Messages with θ-Logos system prompt prepended (if enabled)
     """
-    if not config.THETA_ENABLED:
+    if not _theta_active(theta_enabled):
         return messages
     
     theta_system_prompt = get_theta_prompt(
@@ -56,9 +144,269 @@ def _convert_to_gemini_format(messages: List[Dict]) -> str:
     return "\n".join(parts)
 
 
-def call_claude(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str]:
+# === PROMPT CACHING ===
+# Claude cere breakpoint-uri explicite; OpenAI, Grok și Gemini cache-uiesc
+# automat prefixul identic. Toți raportează tokenii citiți din cache în usage.
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _claude_cached_system(system_prompt: str) -> List[Dict]:
+    """Promptul θ-Logos ca bloc system cu breakpoint (identic la fiecare tură)."""
+    return [{"type": "text", "text": system_prompt, "cache_control": _CACHE_CONTROL}]
+
+
+def _claude_cached_messages(messages: List[Dict]) -> List[Dict]:
+    """
+    Breakpoint pe ultimul mesaj: tot istoricul de până aici e scris în cache și
+    devine prefixul citit din cache la tura următoare (API-ul caută singur
+    breakpoint-ul anterior, până la 20 de blocuri înapoi).
+    
+    Mesajele din ContextStore sunt partajate, deci ultimul e copiat, nu modificat.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    marked = {
+        "role": last["role"],
+        "content": [{"type": "text", "text": last["content"], "cache_control": _CACHE_CONTROL}]
+    }
+    return messages[:-1] + [marked]
+
+
+def _record_usage(usage: Optional[Dict], input_tokens: int, cache_read_tokens: int, cache_write_tokens: int,
+                  output_tokens: Optional[int] = None, reasoning_tokens: int = 0):
+    """
+    Completează dict-ul usage al apelantului (dacă a trimis unul) cu ce a
+    raportat providerul. input_tokens = tot promptul, inclusiv tokenii din
+    cache; output_tokens include tokenii de raționament.
+    """
+    if usage is not None:
+        usage["input_tokens"] = input_tokens or 0
+        usage["cache_read_tokens"] = cache_read_tokens or 0
+        usage["cache_write_tokens"] = cache_write_tokens or 0
+        if output_tokens is not None:
+            usage["output_tokens"] = output_tokens
+        usage["reasoning_tokens"] = reasoning_tokens or 0
+
+
+def _openai_cached_tokens(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens (obiect SDK sau dict JSON)."""
+    if isinstance(usage, dict):
+        return (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", 0) if details else 0
+
+
+def _openai_reasoning_tokens(usage) -> int:
+    """usage.completion_tokens_details.reasoning_tokens (modelele o-series, GPT-5, Grok reasoning)."""
+    if isinstance(usage, dict):
+        return (usage.get("completion_tokens_details") or {}).get("reasoning_tokens") or 0
+    details = getattr(usage, "completion_tokens_details", None)
+    return (getattr(details, "reasoning_tokens", 0) or 0) if details else 0
+
+
+def request_fingerprint(model_name: str, messages: List[Dict], max_tokens: int,
+                        theta_enabled: Optional[bool] = None) -> Dict:
+    """
+    Tot ce determină răspunsul unui apel: modelul API, parametrii de sampling,
+    promptul θ-Logos și mesajele. Două apeluri cu același fingerprint trimit
+    request-uri identice providerului (cheia cache-ului de răspunsuri).
+    """
+    model_config = config.MODELS[model_name]
+    theta_prompt = None
+    if _theta_active(theta_enabled):
+        theta_prompt = get_theta_prompt(mode=config.THETA_MODE, token_limit=max_tokens)
+    return {
+        "model": model_name,
+        "api_model_name": model_config.get("api_model_name", model_name),
+        "temperature": model_config.get("temperature"),
+        "max_tokens": max_tokens,
+        "theta_prompt": theta_prompt,
+        "messages": messages
+    }
+
+
+# === STREAMING ===
+# Cu on_delta setat, clienții folosesc API-ul de streaming al providerului și
+# trimit fiecare fragment de text prin callback. Răspunsul final are aceeași
+# formă ca varianta non-streaming, deci verificările defensive rămân aceleași.
+
+async def _claude_request(request: Dict, on_delta: Optional[Callable[[str], None]]):
+    """messages.create sau messages.stream, după on_delta."""
+    if on_delta is None:
+        return await _claude_client.messages.create(**request)
+    
+    async with _claude_client.messages.stream(**request) as stream:
+        async for text in stream.text_stream:
+            on_delta(text)
+        return await stream.get_final_message()
+
+
+async def _gpt_request(request: Dict, on_delta: Optional[Callable[[str], None]]):
+    """chat.completions.create sau stream-ul echivalent, după on_delta."""
+    if on_delta is None:
+        return await _openai_client.chat.completions.create(**request)
+    
+    async with _openai_client.beta.chat.completions.stream(
+        **request,
+        stream_options={"include_usage": True}
+    ) as stream:
+        async for event in stream:
+            if event.type == "content.delta" and event.delta:
+                on_delta(event.delta)
+        return await stream.get_final_completion()
+
+
+# Fără retry-ul implicit al SDK-ului (până la 600s pe 503): reîncercările
+# sunt făcute doar de scheduler, cu backoff și limitele providerului.
+# call_gemini adaugă "timeout" din config, ca la ceilalți provideri.
+_GEMINI_REQUEST_OPTIONS = {"retry": None}
+
+
+def _gemini_chunk_text(chunk) -> str:
+    """Textul unui chunk Gemini; chunk-urile blocate nu au parts."""
+    try:
+        return chunk.text or ""
+    except (ValueError, AttributeError):
+        return ""
+
+
+def _gemini_request(prompt: str, generation_config: Dict, request_options: Dict,
+                    on_delta: Optional[Callable[[str], None]], loop):
+    """Apel Gemini sincron (rulează în executor); fragmentele ajung în loop thread-safe."""
+    if on_delta is None:
+        return _gemini_model.generate_content(prompt, generation_config=generation_config,
+                                              request_options=request_options)
+    
+    resp = _gemini_model.generate_content(prompt, generation_config=generation_config, stream=True,
+                                          request_options=request_options)
+    for chunk in resp:
+        text = _gemini_chunk_text(chunk)
+        if text:
+            loop.call_soon_threadsafe(on_delta, text)
+    # După iterare, resp conține candidații agregați din toate chunk-urile
+    return resp
+
+
+async def _openai_compatible_request(url: str, headers: Dict, payload: Dict, timeout: float,
+                                     on_delta: Optional[Callable[[str], None]]) -> Tuple[int, Dict]:
+    """
+    POST /chat/completions prin pool-ul HTTP comun.
+    
+    Returns:
+        (status_code, data) - data are forma unui răspuns non-streaming și în
+        modul streaming (choices[0].message.content + usage)
+    
+    Raises:
+        RetryableHTTPError pentru 429/5xx (reîncercat de scheduler)
+    """
+    # Pool-ul e creat la startup; fallback leneș dacă modulul e folosit fără lifespan
+    client = _http_client or await init_http_pool()
+    
+    if on_delta is None:
+        resp = await client.post(url, headers=headers, json=payload, timeout=timeout)
+        if resp.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableHTTPError(resp.status_code, parse_retry_after(resp.headers))
+        return resp.status_code, resp.json() if resp.status_code == 200 else {}
+    
+    payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+    async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            if resp.status_code in RETRYABLE_STATUS_CODES:
+                raise RetryableHTTPError(resp.status_code, parse_retry_after(resp.headers))
+            return resp.status_code, {}
+        
+        parts = []
+        usage = {}
+        has_choices = False
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk_data = line[len("data:"):].strip()
+            if chunk_data == "[DONE]":
+                break
+            chunk = json.loads(chunk_data)
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            for choice in chunk.get("choices") or []:
+                has_choices = True
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+        
+        choices = [{"message": {"content": "".join(parts)}}] if has_choices else []
+        return 200, {"choices": choices, "usage": usage}
+
+
+async def _scheduled(provider: str, messages: List[Dict], max_tokens: int,
+                     on_delta: Optional[Callable[[str], None]],
+                     request: Callable[[Optional[Callable[[str], None]]], Any],
+                     usage: Optional[Dict] = None):
+    """
+    Rulează request(on_delta) prin schedulerul providerului (concurență, RPM/TPM,
+    retry cu backoff). După primul fragment trimis la UI nu se mai reîncearcă,
+    ca textul să nu apară de două ori.
+    
+    Fiecare încercare e cronometrată pentru /metrics și adăugată în
+    usage["attempts"] (momente time.monotonic(): scheduled, sent, first_byte,
+    last_byte); timpii încercării reușite ajung în usage (ttfb_seconds,
+    generation_seconds).
+    """
+    streamed = False
+    scheduled = time.monotonic()
+    attempts = usage.setdefault("attempts", []) if usage is not None else []
+    
+    async def attempt():
+        nonlocal streamed
+        record = {"scheduled": scheduled, "sent": time.monotonic(), "first_byte": None,
+                  "last_byte": None, "outcome": "ok"}
+        attempts.append(record)
+        
+        def tracked_delta(text: str):
+            nonlocal streamed
+            if record["first_byte"] is None:
+                record["first_byte"] = time.monotonic()
+            streamed = True
+            on_delta(text)
+        
+        try:
+            resp = await request(tracked_delta if on_delta is not None else None)
+        except asyncio.CancelledError:
+            # Termenul rundei a expirat în timpul request-ului
+            record.update(last_byte=time.monotonic(), outcome="cancelled")
+            raise
+        except Exception as e:
+            record.update(last_byte=time.monotonic(), outcome="error", error=type(e).__name__)
+            observe_provider_request(provider, record["last_byte"] - record["sent"], None, on_delta is not None, False)
+            raise
+        
+        record["last_byte"] = time.monotonic()
+        total = record["last_byte"] - record["sent"]
+        # Fără streaming, primul byte util vine odată cu răspunsul complet
+        if record["first_byte"] is None:
+            record["first_byte"] = record["last_byte"]
+        ttfb = record["first_byte"] - record["sent"]
+        observe_provider_request(provider, total, ttfb, on_delta is not None, True)
+        if usage is not None:
+            usage["ttfb_seconds"] = ttfb
+            usage["generation_seconds"] = total - ttfb if streamed else total
+        return resp
+    
+    return await get_scheduler(provider).run(
+        attempt,
+        estimate_messages_tokens(messages) + max_tokens,
+        retry_allowed=lambda: not streamed
+    )
+
+
+async def call_claude(messages: List[Dict], max_tokens: int, theta_enabled: Optional[bool] = None,
+                      on_delta: Optional[Callable[[str], None]] = None,
+                      usage: Optional[Dict] = None) -> Tuple[str, int, bool, str]:
     """Call Claude API with optional θ-Logos system prompt."""
-    if not _claude_client:
+    if not init_claude():
         return "[API key lipsă]", 0, False, "No API key"
     
     model_config = config.MODELS["claude"]
@@ -67,51 +415,59 @@ def call_claude(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
     system_prompt = None
     messages_filtered = messages
     
-    if config.THETA_ENABLED:
+    if _theta_active(theta_enabled):
         system_prompt = get_theta_prompt(mode=config.THETA_MODE, token_limit=max_tokens)
     
     # RETRY LOGIC: 2 attempts if content empty
     for attempt in range(2):
         try:
+            request = {
+                "model": model_config["api_model_name"],
+                "max_tokens": max_tokens,
+                "temperature": model_config["temperature"],
+                "messages": messages_filtered,
+                "timeout": model_config["timeout"]
+            }
             # Claude API uses system parameter, not system role in messages
             if system_prompt:
-                resp = _claude_client.messages.create(
-                    model=model_config["api_model_name"],
-                    max_tokens=max_tokens,
-                    temperature=model_config["temperature"],
-                    system=system_prompt,
-                    messages=messages_filtered,
-                    timeout=model_config["timeout"]
-                )
-            else:
-                resp = _claude_client.messages.create(
-                    model=model_config["api_model_name"],
-                    max_tokens=max_tokens,
-                    temperature=model_config["temperature"],
-                    messages=messages_filtered,
-                    timeout=model_config["timeout"]
-                )
+                request["system"] = system_prompt
+            
+            # Prefixul stabil (system + istoric) e marcat pentru cache-ul Anthropic
+            if config.PROMPT_CACHE_ENABLED:
+                request["messages"] = _claude_cached_messages(messages_filtered)
+                if system_prompt:
+                    request["system"] = _claude_cached_system(system_prompt)
+            
+            resp = await _scheduled(
+                "claude", messages_filtered, max_tokens, on_delta,
+                lambda delta: _claude_request(request, delta),
+                usage
+            )
             
             # DEFENSIVE CHECKS
             if not resp:
+                EMPTY_RESPONSES.inc(provider="claude")
                 if attempt == 0:
                     print(f"[Claude] Null response, retry {attempt + 1}/2")
                     continue
                 return "[răspuns null de la API]", 0, False, "Null response after retry"
             
             if not hasattr(resp, 'content') or not resp.content:
+                EMPTY_RESPONSES.inc(provider="claude")
                 if attempt == 0:
                     print(f"[Claude] Empty content attribute, retry {attempt + 1}/2")
                     continue
                 return "[răspuns fără content]", 0, False, "Empty content after retry"
             
             if len(resp.content) == 0:
+                EMPTY_RESPONSES.inc(provider="claude")
                 if attempt == 0:
                     print(f"[Claude] Empty content array, retry {attempt + 1}/2")
                     continue
                 return "[content array gol]", 0, False, "Empty content array after retry"
             
             if not hasattr(resp.content[0], 'text'):
+                EMPTY_RESPONSES.inc(provider="claude")
                 if attempt == 0:
                     print(f"[Claude] No text in content block, retry {attempt + 1}/2")
                     continue
@@ -120,6 +476,7 @@ def call_claude(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
             text = resp.content[0].text.strip()
             
             if not text:
+                EMPTY_RESPONSES.inc(provider="claude")
                 if attempt == 0:
                     print(f"[Claude] Empty text after strip, retry {attempt + 1}/2")
                     continue
@@ -129,6 +486,16 @@ def call_claude(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
             tokens = 0
             if hasattr(resp, 'usage') and resp.usage:
                 tokens = resp.usage.output_tokens if hasattr(resp.usage, 'output_tokens') else 0
+                # Anthropic raportează input_tokens fără tokenii citiți/scriși în cache
+                cache_read = getattr(resp.usage, 'cache_read_input_tokens', 0) or 0
+                cache_write = getattr(resp.usage, 'cache_creation_input_tokens', 0) or 0
+                _record_usage(
+                    usage,
+                    (getattr(resp.usage, 'input_tokens', 0) or 0) + cache_read + cache_write,
+                    cache_read,
+                    cache_write,
+                    tokens
+                )
             
             if attempt > 0:
                 print(f"[Claude] SUCCESS on retry {attempt + 1}")
@@ -143,53 +510,65 @@ def call_claude(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
     return "[eroare după retry]", 0, False, "Exhausted retries"
 
 
-def call_gpt(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str]:
+async def call_gpt(messages: List[Dict], max_tokens: int, theta_enabled: Optional[bool] = None,
+                      on_delta: Optional[Callable[[str], None]] = None,
+                      usage: Optional[Dict] = None) -> Tuple[str, int, bool, str]:
     """Call GPT API with optional θ-Logos system prompt."""
-    if not _openai_client:
+    if not init_openai():
         return "[API key lipsă]", 0, False, "No API key"
     
     # Inject θ-Logos prompt if enabled
-    messages = _inject_theta_prompt(messages, max_tokens)
+    messages = _inject_theta_prompt(messages, max_tokens, theta_enabled)
     
     model_config = config.MODELS["gpt"]
     
     # RETRY LOGIC
     for attempt in range(2):
         try:
-            resp = _openai_client.chat.completions.create(
-                model=model_config["api_model_name"],
-                messages=messages,
-                max_completion_tokens=max_tokens,
-                temperature=model_config["temperature"],
-                timeout=model_config["timeout"]
+            request = {
+                "model": model_config["api_model_name"],
+                "messages": messages,
+                "max_completion_tokens": max_tokens,
+                "temperature": model_config["temperature"],
+                "timeout": model_config["timeout"]
+            }
+            resp = await _scheduled(
+                "gpt", messages, max_tokens, on_delta,
+                lambda delta: _gpt_request(request, delta),
+                usage
             )
             
             # DEFENSIVE CHECKS
             if not resp:
+                EMPTY_RESPONSES.inc(provider="gpt")
                 if attempt == 0:
                     print(f"[GPT] Null response, retry {attempt + 1}/2")
                     continue
                 return "[răspuns null de la API]", 0, False, "Null response after retry"
             
             if not hasattr(resp, 'choices') or not resp.choices:
+                EMPTY_RESPONSES.inc(provider="gpt")
                 if attempt == 0:
                     print(f"[GPT] No choices, retry {attempt + 1}/2")
                     continue
                 return "[răspuns fără choices]", 0, False, "No choices after retry"
             
             if len(resp.choices) == 0:
+                EMPTY_RESPONSES.inc(provider="gpt")
                 if attempt == 0:
                     print(f"[GPT] Empty choices array, retry {attempt + 1}/2")
                     continue
                 return "[choices array gol]", 0, False, "Empty choices after retry"
             
             if not hasattr(resp.choices[0], 'message'):
+                EMPTY_RESPONSES.inc(provider="gpt")
                 if attempt == 0:
                     print(f"[GPT] No message, retry {attempt + 1}/2")
                     continue
                 return "[choice fără message]", 0, False, "No message after retry"
             
             if not hasattr(resp.choices[0].message, 'content'):
+                EMPTY_RESPONSES.inc(provider="gpt")
                 if attempt == 0:
                     print(f"[GPT] No content, retry {attempt + 1}/2")
                     continue
@@ -197,6 +576,7 @@ def call_gpt(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str
             
             text = resp.choices[0].message.content
             if not text or not text.strip():
+                EMPTY_RESPONSES.inc(provider="gpt")
                 if attempt == 0:
                     print(f"[GPT] Empty text, retry {attempt + 1}/2")
                     continue
@@ -208,6 +588,9 @@ def call_gpt(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str
             tokens = 0
             if hasattr(resp, 'usage') and resp.usage:
                 tokens = resp.usage.completion_tokens if hasattr(resp.usage, 'completion_tokens') else 0
+                # Cache automat OpenAI pentru prefixe identice (nu există tokeni de scriere)
+                _record_usage(usage, getattr(resp.usage, 'prompt_tokens', 0), _openai_cached_tokens(resp.usage), 0,
+                              tokens, _openai_reasoning_tokens(resp.usage))
             
             if attempt > 0:
                 print(f"[GPT] SUCCESS on retry {attempt + 1}")
@@ -222,37 +605,48 @@ def call_gpt(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str
     return "[eroare după retry]", 0, False, "Exhausted retries"
 
 
-def call_gemini(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str]:
+async def call_gemini(messages: List[Dict], max_tokens: int, theta_enabled: Optional[bool] = None,
+                      on_delta: Optional[Callable[[str], None]] = None,
+                      usage: Optional[Dict] = None) -> Tuple[str, int, bool, str]:
     """Call Gemini API with optional θ-Logos system prompt."""
-    if not _gemini_model:
+    if not init_gemini():
         return "[API key lipsă]", 0, False, "No API key"
     
     # Inject θ-Logos prompt if enabled
-    messages = _inject_theta_prompt(messages, max_tokens)
+    messages = _inject_theta_prompt(messages, max_tokens, theta_enabled)
     
     model_config = config.MODELS["gemini"]
+    # Un request blocat nu ține thread-ul și slotul scheduler-ului peste timeout-ul modelului
+    request_options = {**_GEMINI_REQUEST_OPTIONS, "timeout": model_config["timeout"]}
     
     # RETRY LOGIC
     for attempt in range(2):
         try:
             prompt = _convert_to_gemini_format(messages)
             
-            resp = _gemini_model.generate_content(
-                prompt,
-                generation_config={
-                    "max_output_tokens": max_tokens,
-                    "temperature": model_config["temperature"],
-                }
+            generation_config = {
+                "max_output_tokens": max_tokens,
+                "temperature": model_config["temperature"],
+            }
+            loop = asyncio.get_running_loop()
+            
+            # SDK-ul Gemini e sincron: rulează în executor ca să nu blocheze event loop-ul
+            resp = await _scheduled(
+                "gemini", messages, max_tokens, on_delta,
+                lambda delta: asyncio.to_thread(_gemini_request, prompt, generation_config, request_options, delta, loop),
+                usage
             )
             
             # DEFENSIVE CHECKS
             if not resp:
+                EMPTY_RESPONSES.inc(provider="gemini")
                 if attempt == 0:
                     print(f"[Gemini] Null response, retry {attempt + 1}/2")
                     continue
                 return "[răspuns null de la API]", 0, False, "Null response after retry"
             
             if not hasattr(resp, 'candidates') or not resp.candidates:
+                SAFETY_BLOCKS.inc(provider="gemini")
                 if attempt == 0:
                     print(f"[Gemini] No candidates, retry {attempt + 1}/2")
                     continue
@@ -261,18 +655,21 @@ def call_gemini(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
             candidate = resp.candidates[0]
             
             if not hasattr(candidate, 'content'):
+                EMPTY_RESPONSES.inc(provider="gemini")
                 if attempt == 0:
                     print(f"[Gemini] No content attribute, retry {attempt + 1}/2")
                     continue
                 return "[content lipsă]", 0, False, "No content after retry"
             
             if not hasattr(candidate.content, 'parts'):
+                EMPTY_RESPONSES.inc(provider="gemini")
                 if attempt == 0:
                     print(f"[Gemini] No parts attribute, retry {attempt + 1}/2")
                     continue
                 return "[parts attribute lipsă]", 0, False, "No parts attribute after retry"
             
             if not candidate.content.parts or len(candidate.content.parts) == 0:
+                EMPTY_RESPONSES.inc(provider="gemini")
                 if attempt == 0:
                     print(f"[Gemini] Empty parts list, retry {attempt + 1}/2")
                     continue
@@ -282,6 +679,7 @@ def call_gemini(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
             text = first_part.text if hasattr(first_part, 'text') and first_part.text else None
             
             if not text or not text.strip():
+                EMPTY_RESPONSES.inc(provider="gemini")
                 if attempt == 0:
                     print(f"[Gemini] Empty text, retry {attempt + 1}/2")
                     continue
@@ -290,7 +688,21 @@ def call_gemini(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
             text = text.strip()
             
             # SUCCESS
-            tokens = len(text.split())
+            tokens = 0
+            metadata = getattr(resp, 'usage_metadata', None)
+            if metadata:
+                # Tokenii de gândire (Gemini 2.5) sunt raportați separat, dar facturați ca output
+                thoughts = getattr(metadata, 'thoughts_token_count', 0) or 0
+                tokens = (getattr(metadata, 'candidates_token_count', 0) or 0) + thoughts
+                # Cache implicit Gemini 2.x: tokenii din prefix reluați raportați separat
+                _record_usage(
+                    usage,
+                    getattr(metadata, 'prompt_token_count', 0),
+                    getattr(metadata, 'cached_content_token_count', 0),
+                    0,
+                    tokens or None,  # lipsă în unele răspunsuri streaming: estimat în cost_ledger
+                    thoughts
+                )
             
             if attempt > 0:
                 print(f"[Gemini] SUCCESS on retry {attempt + 1}")
@@ -305,84 +717,128 @@ def call_gemini(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool,
     return "[eroare după retry]", 0, False, "Exhausted retries"
 
 
-def call_grok(messages: List[Dict], max_tokens: int) -> Tuple[str, int, bool, str]:
+async def call_grok(messages: List[Dict], max_tokens: int, theta_enabled: Optional[bool] = None,
+                      on_delta: Optional[Callable[[str], None]] = None,
+                      usage: Optional[Dict] = None) -> Tuple[str, int, bool, str]:
     """Call Grok API with optional θ-Logos system prompt."""
-    if not config.GROK_API_KEY:
+    if not config.GROK_API_KEY and not config.MODELS["grok"].get("base_url"):
         return "[API key lipsă]", 0, False, "No API key"
-    
+    return await call_openai_compatible("grok", messages, max_tokens, theta_enabled, on_delta, usage)
+
+
+def openai_compatible_api_key(model_name: str) -> Optional[str]:
+    """Cheia din MODELS[...]["api_key"]; Grok folosește implicit GROK_API_KEY."""
+    api_key = config.MODELS[model_name].get("api_key")
+    if api_key is None and model_name == "grok":
+        api_key = config.GROK_API_KEY
+    return api_key or None
+
+
+async def call_openai_compatible(model_name: str, messages: List[Dict], max_tokens: int,
+                                 theta_enabled: Optional[bool] = None,
+                                 on_delta: Optional[Callable[[str], None]] = None,
+                                 usage: Optional[Dict] = None) -> Tuple[str, int, bool, str]:
+    """
+    Orice endpoint /chat/completions (x.ai, vLLM, Ollama, llama.cpp, LM Studio),
+    prin pool-ul HTTP comun. Configurat în MODELS[model_name]: base_url,
+    api_model_name, opțional api_key, temperature și timeout.
+    """
     # Inject θ-Logos prompt if enabled
-    messages = _inject_theta_prompt(messages, max_tokens)
+    messages = _inject_theta_prompt(messages, max_tokens, theta_enabled)
     
-    model_config = config.MODELS["grok"]
+    model_config = config.MODELS[model_name]
+    api_key = openai_compatible_api_key(model_name)
+    label = model_name.capitalize()
     
     # RETRY LOGIC
     for attempt in range(2):
         try:
-            headers = {
-                "Authorization": f"Bearer {config.GROK_API_KEY}",
-                "Content-Type": "application/json"
-            }
+            headers = {"Content-Type": "application/json"}
+            # Endpoint-urile locale rulează de obicei fără cheie
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
             
             payload = {
-                "model": model_config["api_model_name"],
+                "model": model_config.get("api_model_name", model_name),
                 "messages": messages,
                 "max_tokens": max_tokens,
-                "temperature": model_config["temperature"],
+                "temperature": model_config.get("temperature", 0.8),
             }
             
-            with httpx.Client(timeout=model_config["timeout"]) as client:
-                resp = client.post(
-                    "https://api.x.ai/v1/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
+            base_url = model_config.get("base_url") or "https://api.x.ai/v1"
+            status_code, data = await _scheduled(
+                model_name, messages, max_tokens, on_delta,
+                lambda delta: _openai_compatible_request(
+                    f"{base_url.rstrip('/')}/chat/completions",
+                    headers,
+                    payload,
+                    model_config.get("timeout", 30),
+                    delta
+                ),
+                usage
+            )
+            
+            if status_code == 200:
+                # DEFENSIVE CHECKS
+                if not data.get("choices"):
+                    EMPTY_RESPONSES.inc(provider=model_name)
+                    if attempt == 0:
+                        print(f"[{label}] No choices, retry {attempt + 1}/2")
+                        continue
+                    return "[răspuns fără choices]", 0, False, "No choices after retry"
+                
+                if len(data["choices"]) == 0:
+                    EMPTY_RESPONSES.inc(provider=model_name)
+                    if attempt == 0:
+                        print(f"[{label}] Empty choices array, retry {attempt + 1}/2")
+                        continue
+                    return "[choices array gol]", 0, False, "Empty choices after retry"
+                
+                if not data["choices"][0].get("message"):
+                    EMPTY_RESPONSES.inc(provider=model_name)
+                    if attempt == 0:
+                        print(f"[{label}] No message, retry {attempt + 1}/2")
+                        continue
+                    return "[choice fără message]", 0, False, "No message after retry"
+                
+                if not data["choices"][0]["message"].get("content"):
+                    EMPTY_RESPONSES.inc(provider=model_name)
+                    if attempt == 0:
+                        print(f"[{label}] No content, retry {attempt + 1}/2")
+                        continue
+                    return "[message fără content]", 0, False, "No content after retry"
+                
+                text = data["choices"][0]["message"]["content"].strip()
+                
+                if not text:
+                    EMPTY_RESPONSES.inc(provider=model_name)
+                    if attempt == 0:
+                        print(f"[{label}] Empty text, retry {attempt + 1}/2")
+                        continue
+                    return "[text gol]", 0, False, "Empty text after retry"
+                
+                # SUCCESS
+                # Unele servere locale nu trimit usage deloc: rămâne estimarea din cost_ledger
+                reported = data.get("usage") or {}
+                tokens = reported.get("completion_tokens", 0)
+                if reported:
+                    # x.ai (și vLLM cu prefix caching) raportează tokenii cache-uiți ca OpenAI
+                    _record_usage(
+                        usage,
+                        reported.get("prompt_tokens", 0),
+                        _openai_cached_tokens(reported),
+                        0,
+                        tokens,
+                        _openai_reasoning_tokens(reported)
+                    )
+                
+                if attempt > 0:
+                    print(f"[{label}] SUCCESS on retry {attempt + 1}")
+                
+                return text, tokens, False, None
+            else:
+                return "[modelul a avut o eroare tehnică și nu a putut răspunde în această rundă]", 0, False, f"HTTP {status_code}"
                 
-                if resp.status_code == 200:
-                    data = resp.json()
-                    
-                    # DEFENSIVE CHECKS
-                    if not data.get("choices"):
-                        if attempt == 0:
-                            print(f"[Grok] No choices, retry {attempt + 1}/2")
-                            continue
-                        return "[răspuns fără choices]", 0, False, "No choices after retry"
-                    
-                    if len(data["choices"]) == 0:
-                        if attempt == 0:
-                            print(f"[Grok] Empty choices array, retry {attempt + 1}/2")
-                            continue
-                        return "[choices array gol]", 0, False, "Empty choices after retry"
-                    
-                    if not data["choices"][0].get("message"):
-                        if attempt == 0:
-                            print(f"[Grok] No message, retry {attempt + 1}/2")
-                            continue
-                        return "[choice fără message]", 0, False, "No message after retry"
-                    
-                    if not data["choices"][0]["message"].get("content"):
-                        if attempt == 0:
-                            print(f"[Grok] No content, retry {attempt + 1}/2")
-                            continue
-                        return "[message fără content]", 0, False, "No content after retry"
-                    
-                    text = data["choices"][0]["message"]["content"].strip()
-                    
-                    if not text:
-                        if attempt == 0:
-                            print(f"[Grok] Empty text, retry {attempt + 1}/2")
-                            continue
-                        return "[text gol]", 0, False, "Empty text after retry"
-                    
-                    # SUCCESS
-                    tokens = data.get("usage", {}).get("completion_tokens", 0)
-                    
-                    if attempt > 0:
-                        print(f"[Grok] SUCCESS on retry {attempt + 1}")
-                    
-                    return text, tokens, False, None
-                else:
-                    return "[modelul a avut o eroare tehnică și nu a putut răspunde în această rundă]", 0, False, f"HTTP {resp.status_code}"
-                    
         except httpx.TimeoutException as e:
             return "[modelul a avut o eroare tehnică și nu a putut răspunde în această rundă]", 0, True, str(e)
         except Exception as e:
@@ -0,0 +1,209 @@
+# loadtest.py - Load test pentru serverul Agora: multe sesiuni concurente prin HTTP
+"""
+Fiecare utilizator virtual lucrează în sesiunea lui: trimite --messages mesaje
+(/message sau /message/stream), cere /diagnostics după fiecare rundă, apoi
+/export și șterge sesiunea. La final se raportează throughput-ul și latențele
+p50/p95/p99 per endpoint.
+
+Usage (cu providerii mock, fără API keys reale):
+    python mock_providers.py --port 9100 --ttfb-ms 400 --tokens-per-sec 80
+    AGORA_MOCK_PROVIDERS_URL=http://127.0.0.1:9100 python main.py
+    python loadtest.py --url http://127.0.0.1:8000 --sessions 50 --messages 10 --out load.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+ENDPOINTS = ("message", "diagnostics", "export", "delete")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Percentila p (0-100) prin metoda nearest-rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class LoadStats:
+    """Latențele (secunde) și erorile colectate per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.error_samples: List[str] = []
+        self.rounds = 0
+
+    def add(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        self.latencies[endpoint].append(seconds)
+        if error:
+            self.errors[endpoint] += 1
+            if len(self.error_samples) < 20:
+                self.error_samples.append(f"{endpoint}: {error}")
+
+    def report(self, duration: float) -> Dict:
+        endpoints = {}
+        for name, values in self.latencies.items():
+            if not values:
+                continue
+            endpoints[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+                "per_second": round(len(values) / duration, 2) if duration else None
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "duration": round(duration, 3),
+            "requests": total,
+            "requests_per_second": round(total / duration, 2) if duration else None,
+            "rounds": self.rounds,
+            "rounds_per_second": round(self.rounds / duration, 2) if duration else None,
+            "errors": sum(self.errors.values()),
+            "endpoints": endpoints,
+            "error_samples": self.error_samples
+        }
+
+
+async def _timed(stats: LoadStats, endpoint: str, request) -> Optional[httpx.Response]:
+    """Rulează request-ul și îl înregistrează; erorile aplicației vin ca {"error": ...} cu 200."""
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError as e:
+        stats.add(endpoint, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+        return None
+    error = None
+    if response.status_code != 200:
+        error = f"HTTP {response.status_code}"
+    elif response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        if isinstance(body, dict) and body.get("error"):
+            error = str(body["error"])
+    stats.add(endpoint, time.perf_counter() - started, error)
+    return response
+
+
+async def _send_stream(client: httpx.AsyncClient, payload: Dict) -> httpx.Response:
+    """POST /message/stream citit până la round_end; o eroare SSE devine status 500."""
+    async with client.stream("POST", "/message/stream", json=payload) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif event == "error" and line.startswith("data: "):
+                return httpx.Response(500, text=line[len("data: "):])
+        return response
+
+
+async def virtual_user(client: httpx.AsyncClient, stats: LoadStats, index: int, options: Dict):
+    session_id = f"{options['prefix']}-{index}"
+    if options["ramp"]:
+        await asyncio.sleep(random.uniform(0, options["ramp"]))
+
+    for turn in range(options["messages"]):
+        payload = {
+            "session_id": session_id,
+            "content": f"Load test {index}.{turn}: {options['content']}",
+            "token_limit": options["token_limit"],
+            "theta_enabled": options["theta"],
+            "round_mode": options["round_mode"]
+        }
+        if options["stream"]:
+            response = await _timed(stats, "message", _send_stream(client, payload))
+        else:
+            response = await _timed(stats, "message", client.post("/message", json=payload))
+        if response is not None and response.status_code == 200:
+            stats.rounds += 1
+        if options["diagnostics"]:
+            await _timed(stats, "diagnostics", client.get("/diagnostics", params={"session_id": session_id}))
+
+    if options["export"]:
+        await _timed(stats, "export", client.get("/export", params={
+            "session_id": session_id,
+            "format": options["export"],
+            "expand_context": options["expand_context"]
+        }))
+    if not options["keep"]:
+        await _timed(stats, "delete", client.delete(f"/sessions/{session_id}"))
+
+
+async def run_load(url: str, sessions: int, options: Dict) -> Dict:
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    stats = LoadStats()
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=options["timeout"]) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, stats, i, options) for i in range(sessions)))
+        duration = time.perf_counter() - started
+    return {"url": url, "sessions": sessions, **stats.report(duration)}
+
+
+def print_report(report: Dict):
+    print(f"\n[Load] {report['sessions']} sesiuni, {report['rounds']} runde, {report['requests']} request-uri "
+          f"în {report['duration']:.1f}s ({report['requests_per_second']} req/s, "
+          f"{report['rounds_per_second']} runde/s, {report['errors']} erori)")
+    print(f"{'endpoint':<12}{'count':>7}{'err':>6}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, s in report["endpoints"].items():
+        print(f"{name:<12}{s['count']:>7}{s['errors']:>6}{s['mean_ms']:>9}{s['p50_ms']:>9}"
+              f"{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}")
+    for sample in report["error_samples"]:
+        print(f"   ! {sample}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test pentru serverul Agora")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=20, help="Utilizatori virtuali (sesiuni) simultani")
+    parser.add_argument("--messages", type=int, default=5, help="Mesaje trimise de fiecare sesiune")
+    parser.add_argument("--content", default="Care este relația dintre structură și sens?")
+    parser.add_argument("--token-limit", type=int, default=300)
+    parser.add_argument("--theta", action="store_true")
+    parser.add_argument("--round-mode", default="sequential")
+    parser.add_argument("--stream", action="store_true", help="Folosește /message/stream (SSE)")
+    parser.add_argument("--no-diagnostics", action="store_true", help="Fără /diagnostics după fiecare rundă")
+    parser.add_argument("--export", default="json", help='Formatul /export la final ("json", "ndjson" sau "none")')
+    parser.add_argument("--expand-context", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Nu șterge sesiunile la final")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Pornirea sesiunilor e eșalonată pe atâtea secunde")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout per request (secunde)")
+    parser.add_argument("--prefix", default="load", help="Prefixul ID-urilor de sesiune")
+    parser.add_argument("--out", default=None, help="Scrie raportul JSON în fișier")
+    args = parser.parse_args()
+
+    options = {
+        "messages": args.messages,
+        "content": args.content,
+        "token_limit": args.token_limit,
+        "theta": args.theta,
+        "round_mode": args.round_mode,
+        "stream": args.stream,
+        "diagnostics": not args.no_diagnostics,
+        "export": None if args.export == "none" else args.export,
+        "expand_context": args.expand_context,
+        "keep": args.keep,
+        "ramp": args.ramp,
+        "timeout": args.timeout,
+        "prefix": args.prefix
+    }
+    report = asyncio.run(run_load(args.url.rstrip("/"), args.sessions, options))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[Load] Raport scris în {args.out}")
+
+
+if __name__ == "__main__":
+    main()
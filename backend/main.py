@@ -1,230 +1,476 @@
 # main.py - SOLUTION B with θ-Logos Integration
 
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+from fastapi import FastAPI, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from contextlib import asynccontextmanager
 
 import config
 import validator
-from dice_roller import DiceRoller
-from context_builder import build_context_from_rounds, detect_hallucinations
-from llm_clients import call_claude, call_gpt, call_gemini, call_grok
-from exporter import export_conversation, generate_diagnostic_report
+from session_store import SessionStore, DEFAULT_SESSION_ID, is_valid_session_id
+from round_log import RoundLog
+from round_stats import verify_stats
+from llm_clients import init_http_pool, close_http_pool
+from providers import activate_providers
+from round_engine import run_round
+from response_cache import get_response_cache
+from scheduler import schedulers_info
+from metrics import render_metrics, monitor_event_loop
+from timeline import find_turn, turn_waterfall, turn_waterfalls, render_waterfalls
+from exporter import (
+    expand_round, iter_export_json, iter_export_ndjson, encode_stream, write_export,
+    export_filename, check_compression, EXPORT_FORMATS
+)
 
 # Global state
 ACTIVE_MODELS: List[str] = []
-dice_roller = DiceRoller()
-rounds: List[Dict] = []
+# Fiecare sesiune are propriile runde, context per model și zar
+sessions = SessionStore()
+round_log = None
+# Referințe la rundele pornite de /message/stream (asyncio ține task-urile doar slab)
+_stream_tasks = set()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler."""
-    global ACTIVE_MODELS
+    global ACTIVE_MODELS, round_log
     ACTIVE_MODELS = validator.validate_api_keys()
     validator.print_active_models(ACTIVE_MODELS)
+    # SDK-urile sunt importate doar pentru modelele active
+    ACTIVE_MODELS = activate_providers(ACTIVE_MODELS)
     
     if not ACTIVE_MODELS:
         print("⚠️  Server pornit dar FĂRĂ modele active!")
         print("   Adaugă API keys în config.py și restartează.")
     
+    if config.ROUND_LOG_ENABLED:
+        round_log = RoundLog(config.ROUND_LOG_PATH)
+        sessions.round_log = round_log
+        logged = RoundLog.replay(config.ROUND_LOG_PATH)
+        restored = sessions.restore(logged)
+        if restored:
+            print(f"♻️  {restored} sesiuni recuperate din {config.ROUND_LOG_PATH}")
+        if config.ROUND_LOG_COMPACT_ON_START and logged:
+            # Sesiunile șterse și istoricul dinaintea unui reset nu mai cresc jurnalul
+            compacted = await asyncio.to_thread(RoundLog.compact, logged, config.ROUND_LOG_PATH)
+            print(f"   Jurnal compactat: {compacted} evenimente")
+        await round_log.start()
+    
+    await init_http_pool()
+    
+    # Eșantionează întârzierea event loop-ului pentru /metrics
+    loop_monitor = None
+    if config.EVENT_LOOP_LAG_INTERVAL:
+        loop_monitor = asyncio.create_task(monitor_event_loop(config.EVENT_LOOP_LAG_INTERVAL))
+    
     yield
+    
+    if loop_monitor is not None:
+        loop_monitor.cancel()
+    await close_http_pool()
+    
+    if round_log is not None:
+        await round_log.close()
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    # Clienții din browser citesc ETag-ul pentru If-None-Match
+    expose_headers=["ETag"]
 )
 
+async def _get_session(session_id: str, create: bool = False):
+    """Sesiunea cerută sau None (ID invalid / sesiune inexistentă); cele evacuate sunt reîncărcate din jurnal."""
+    if not is_valid_session_id(session_id):
+        return None
+    return await sessions.load(session_id, create=create)
+
+def _etag(session) -> str:
+    """ETag-ul unei sesiuni: se schimbă doar la runde noi sau la reset."""
+    return f'"{session.cursor}"'
+
+def _not_modified(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _conditional(etag: str, if_none_match: Optional[str], build):
+    """
+    304 fără corp dacă clientul are deja versiunea curentă; altfel build()
+    serializat cu ETag. Polling-ul unei sesiuni neschimbate nu construiește
+    și nu serializează nimic.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _not_modified(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(build(), headers=headers)
+
 @app.get("/")
-def root():
+async def root(session_id: str = DEFAULT_SESSION_ID):
+    session = await _get_session(session_id)
     return {
         "status": "AGORA MVP 2025 - θ-Logos Integration Ready",
         "active_models": ACTIVE_MODELS,
-        "total_rounds": len(rounds),
+        "session_id": session_id,
+        "total_rounds": len(session.rounds) if session else 0,
+        "sessions": sessions.info(),
         "theta_enabled": config.THETA_ENABLED,
         "theta_mode": config.THETA_MODE,
         "timestamp": datetime.now().isoformat()
     }
 
-@app.post("/message")
-async def send_message(message: dict):
+async def _parse_message(message: dict):
     """
-    Send message to multi-LLM conversation.
+    Validează request-ul /message.
     
-    Request format:
-    {
-        "content": "user message",
-        "token_limit": 300,  # optional
-        "theta_enabled": false  # optional, toggles θ-Logos mode
-    }
+    Returns:
+        (session, round_args, None) - round_args sunt argumentele run_round
+        sau (None, None, eroare)
     """
-    global rounds
-    
     content = message.get("content", "").strip()
     if not content:
-        return {"error": "Mesaj gol"}
+        return None, None, "Mesaj gol"
     
     if not ACTIVE_MODELS:
-        return {"error": "Niciun model activ"}
-    
-    # Token limit
-    token_limit = message.get("token_limit", config.TOKEN_LIMIT_DEFAULT)
-    token_limit = max(config.TOKEN_LIMIT_MIN, min(config.TOKEN_LIMIT_MAX, token_limit))
+        return None, None, "Niciun model activ"
     
-    # θ-Logos toggle (from UI request)
-    theta_enabled = message.get("theta_enabled", False)
+    # Aceleași verificări ca pentru prompturile din batch_runner
+    # theta_enabled e transmis explicit clienților: config.THETA_ENABLED e
+    # global și ar fi suprascris de request-uri concurente.
+    options, error = validator.validate_round_options(message)
+    if error:
+        return None, None, error
     
-    # Temporarily set θ-Logos state for this request
-    original_theta_state = config.THETA_ENABLED
-    config.THETA_ENABLED = theta_enabled
+    session = await _get_session(message.get("session_id", DEFAULT_SESSION_ID), create=True)
+    if session is None:
+        return None, None, "Session ID invalid"
     
-    # Use θ token limit if in θ mode
-    if theta_enabled:
-        token_limit = config.THETA_TOKEN_LIMIT
-    
-    # === RUNDĂ USER ===
-    user_round = {
-        "round_number": len(rounds) + 1,
-        "type": "user",
+    return session, {
         "content": content,
-        "theta_enabled": theta_enabled,
-        "timestamp": datetime.now().isoformat()
+        **options,
+        # Cache de răspunsuri (None = config.RESPONSE_CACHE_ENABLED)
+        "use_cache": message.get("use_cache")
+    }, None
+
+@app.post("/message")
+async def send_message(message: dict):
+    """
+    Send message to multi-LLM conversation.
+    
+    Request format:
+    {
+        "content": "user message",
+        "token_limit": 300,  # optional
+        "theta_enabled": false,  # optional, toggles θ-Logos mode
+        "session_id": "default",  # optional, conversația în care se scrie
+        "use_cache": false,  # optional, servește request-urile identice din cache
+        "deadline_seconds": 60,  # optional, termen total pentru rundă (modelele rămase sunt sărite)
+        "round_mode": "sequential"  # optional, "blind" = toate modelele răspund în paralel
     }
-    rounds.append(user_round)
+    """
+    session, round_args, error = await _parse_message(message)
+    if error:
+        return {"error": error}
     
-    # === DICE ROLL pentru ordinea LLM-urilor ===
-    order = dice_roller.roll(ACTIVE_MODELS)
+    async with session.lock:
+        result = await run_round(session, ACTIVE_MODELS, **round_args)
+    sessions.enforce_limits()
+    return result
+
+def _sse(event: str, data: Dict) -> str:
+    """Formatează un eveniment Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/message/stream")
+async def send_message_stream(message: dict):
+    """
+    Ca /message, dar răspunde cu Server-Sent Events pe măsură ce runda avansează:
+    round_start, order, model_start, delta, model_done, round_end (sau error).
+    """
+    session, round_args, error = await _parse_message(message)
     
-    # === FIECARE LLM = O RUNDĂ SEPARATĂ ===
-    llm_responses = []
+    queue: asyncio.Queue = asyncio.Queue()
     
-    for position, model_name in enumerate(order):
-        # Context PERSONALIZAT pentru fiecare model
-        context_sent = build_context_from_rounds(rounds, model_name)
-        
-        # Apelează modelul
-        if model_name == "claude":
-            text, tokens, timeout, error = call_claude(context_sent, token_limit)
-        elif model_name == "gpt":
-            text, tokens, timeout, error = call_gpt(context_sent, token_limit)
-        elif model_name == "gemini":
-            text, tokens, timeout, error = call_gemini(context_sent, token_limit)
-        elif model_name == "grok":
-            text, tokens, timeout, error = call_grok(context_sent, token_limit)
-        else:
-            text, tokens, timeout, error = "[model necunoscut]", 0, False, "Unknown"
-        
-        # Detectează halucinații
-        hallucination_flags = detect_hallucinations(text, model_name, order, position)
-        
-        # === RUNDĂ LLM ===
-        llm_round = {
-            "round_number": len(rounds) + 1,
-            "type": "assistant",
-            "model": model_name,
-            "content": text,
-            "tokens": tokens,
-            "timeout": timeout,
-            "error": error,
-            "context_sent": context_sent,
-            "hallucination_flags": hallucination_flags,
-            "theta_enabled": theta_enabled,
-            "theta_mode": config.THETA_MODE if theta_enabled else None,
-            "timestamp": datetime.now().isoformat()
-        }
-        rounds.append(llm_round)
+    async def produce():
+        try:
+            async with session.lock:
+                await run_round(
+                    session, ACTIVE_MODELS, **round_args,
+                    emit=lambda event, data: queue.put_nowait((event, data))
+                )
+            sessions.enforce_limits()
+        except Exception as e:
+            queue.put_nowait(("error", {"error": str(e)}))
+        finally:
+            queue.put_nowait(None)
+    
+    async def events():
+        if error:
+            yield _sse("error", {"error": error})
+            return
         
-        # Pentru response UI
-        llm_responses.append({
-            "model": model_name,
-            "content": text,
-            "tokens": tokens,
-            "timeout": timeout
-        })
-    
-    # Restore original θ state
-    config.THETA_ENABLED = original_theta_state
-    
-    # Return pentru UI
-    return {
-        "order": order,
-        "responses": llm_responses,
-        "theta_enabled": theta_enabled
-    }
+        # Runda rulează independent de client: dacă acesta se deconectează,
+        # conversația tot rămâne consistentă
+        task = asyncio.create_task(produce())
+        _stream_tasks.add(task)
+        task.add_done_callback(_stream_tasks.discard)
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield _sse(*item)
+        await task
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/export")
-def export():
-    """Exportă conversația."""
-    if not rounds:
+async def export(session_id: str = DEFAULT_SESSION_ID, expand_context: bool = False,
+                 format: str = "json", compression: str = "none", save: bool = False,
+                 waterfall: bool = False):
+    """
+    Exportă conversația unei sesiuni, serializată rundă cu rundă direct în răspuns.
+    
+    Query params:
+        expand_context: rundele LLM primesc și context_sent complet (implicit doar context_ref)
+        format: "json" (document unic) sau "ndjson" (metadate + o rundă pe linie)
+        compression: "none", "gzip" sau "zstd"
+        save: scrie exportul și în config.EXPORT_DIR (altfel nimic nu ajunge pe disc)
+        waterfall: metadatele primesc și "waterfalls", timeline-ul fiecărei ture
+    """
+    session = await _get_session(session_id)
+    if session is None or not session.rounds:
         return {"error": "Nicio conversație"}
+    if format not in EXPORT_FORMATS:
+        return {"error": f"Format necunoscut: {format}"}
+    try:
+        check_compression(compression)
+    except ValueError as e:
+        return {"error": str(e)}
+    rounds = session.rounds
     
     # Adaptăm structura pentru export
-    export_data = {
+    meta = {
         "conversation_id": datetime.now().isoformat(),
+        "session_id": session_id,
         "export_timestamp": datetime.now().isoformat(),
         "total_rounds": len(rounds),
         "solution": "B - Context personalizat per model + θ-Logos",
-        "theta_mode": config.THETA_MODE,
-        "rounds": rounds
+        "theta_mode": config.THETA_MODE
     }
+    if waterfall:
+        meta["waterfalls"] = turn_waterfalls(rounds)
     
-    filename = f"agora_theta_{int(datetime.now().timestamp() * 1000)}.json"
+    iter_export = iter_export_ndjson if format == "ndjson" else iter_export_json
+    chunks = iter_export(meta, rounds, expand_context)
+    filename = export_filename(format, compression)
     
-    import json
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False, indent=2)
+    if save:
+        os.makedirs(config.EXPORT_DIR, exist_ok=True)
+        path = os.path.join(config.EXPORT_DIR, filename)
+        await asyncio.to_thread(write_export, path, chunks, compression)
+        return FileResponse(path, media_type=_export_media_type(format, compression), filename=filename)
     
-    return FileResponse(filename, media_type="application/json", filename=filename)
+    # Generator sincron: Starlette îl iterează în threadpool, deci serializarea
+    # și compresia nu blochează event loop-ul
+    return StreamingResponse(
+        encode_stream(chunks, compression),
+        media_type=_export_media_type(format, compression),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _export_media_type(format: str, compression: str) -> str:
+    if compression == "gzip":
+        return "application/gzip"
+    if compression == "zstd":
+        return "application/zstd"
+    return "application/x-ndjson" if format == "ndjson" else "application/json"
 
 @app.get("/diagnostics")
-def diagnostics():
-    """Raport diagnostic."""
-    if not rounds:
+async def diagnostics(session_id: str = DEFAULT_SESSION_ID, verify: bool = False,
+                      if_none_match: Optional[str] = Header(None)):
+    """
+    Raport diagnostic, din agregatele menținute incremental (timp constant).
+    
+    Cu verify=true compară agregatele cu o recalculare completă peste runde.
+    Răspunde cu ETag; If-None-Match cu versiunea curentă primește 304.
+    """
+    session = await _get_session(session_id)
+    if session is None or not session.rounds:
         return {"error": "Nicio conversație"}
     
-    total_llm_rounds = len([r for r in rounds if r["type"] == "assistant"])
-    hallucinations = sum(
-        1 for r in rounds 
-        if r["type"] == "assistant" and any(r.get("hallucination_flags", {}).values())
-    )
+    def build():
+        report = {
+            "solution": "B - Context personalizat per model + θ-Logos",
+            "session_id": session_id,
+            **session.stats.snapshot()
+        }
+        if verify:
+            report["verification"] = verify_stats(session.stats, session.rounds)
+        return report
+    
+    return _conditional(_etag(session), if_none_match, build)
+
+@app.get("/rounds")
+async def list_rounds(session_id: str = DEFAULT_SESSION_ID, since: Optional[str] = None,
+                      limit: Optional[int] = None, expand_context: bool = False,
+                      if_none_match: Optional[str] = Header(None)):
+    """
+    Rundele adăugate după cursorul `since` (toate, fără cursor), cel mult `limit`.
+    
+    Răspunsul conține cursorul următor; reset=true înseamnă că sesiunea a fost
+    resetată (sau recreată) de la cursorul dat și rundele încep de la zero.
+    Răspunde cu ETag; If-None-Match cu versiunea curentă primește 304.
+    """
+    session = await _get_session(session_id)
+    if session is None:
+        return {"error": "Nicio conversație"}
+    start, reset = session.rounds_since(since)
+    if start is None:
+        return {"error": "Cursor invalid"}
+    if limit is not None and limit < 1:
+        return {"error": "limit trebuie să fie pozitiv"}
+    
+    def build():
+        rounds = session.rounds
+        end = len(rounds) if limit is None else min(len(rounds), start + limit)
+        selected = rounds[start:end]
+        if expand_context:
+            selected = [expand_round(r, rounds) for r in selected]
+        return {
+            "session_id": session_id,
+            "cursor": f"{session.epoch}.{end}",
+            "reset": reset,
+            "more": end < len(rounds),
+            "total_rounds": len(rounds),
+            "rounds": selected
+        }
+    
+    return _conditional(_etag(session), if_none_match, build)
+
+@app.get("/diagnostics/context/{round_number}")
+async def diagnostics_context(round_number: int, session_id: str = DEFAULT_SESSION_ID):
+    """Contextul exact trimis modelului într-o rundă LLM (reconstruit din context_ref)."""
+    session = await _get_session(session_id)
+    if session is None:
+        return {"error": "Nicio conversație"}
+    rounds = session.rounds
+    
+    if round_number < 1 or round_number > len(rounds):
+        return {"error": "Rundă inexistentă"}
     
-    # Count θ-Logos rounds
-    theta_rounds = len([r for r in rounds if r.get("theta_enabled", False)])
-    
-    # Statistici per model
-    model_stats = {}
-    for model in ["claude", "gpt", "gemini", "grok"]:
-        model_rounds = [r for r in rounds if r.get("model") == model]
-        if model_rounds:
-            model_stats[model] = {
-                "total_rounds": len(model_rounds),
-                "total_tokens": sum(r.get("tokens", 0) for r in model_rounds),
-                "errors": len([r for r in model_rounds if r.get("error")]),
-                "hallucinations": len([r for r in model_rounds if any(r.get("hallucination_flags", {}).values())]),
-                "theta_rounds": len([r for r in model_rounds if r.get("theta_enabled", False)])
-            }
+    round_data = rounds[round_number - 1]
+    if round_data["type"] != "assistant":
+        return {"error": "Runda nu e a unui LLM"}
     
     return {
-        "solution": "B - Context personalizat per model + θ-Logos",
-        "total_rounds": len(rounds),
-        "user_rounds": len([r for r in rounds if r["type"] == "user"]),
-        "llm_rounds": total_llm_rounds,
-        "theta_rounds": theta_rounds,
-        "hallucinations_detected": hallucinations,
-        "model_stats": model_stats
+        "round_number": round_number,
+        "model": round_data["model"],
+        "context_ref": round_data.get("context_ref"),
+        "context_sent": expand_round(round_data, rounds).get("context_sent")
     }
 
+def _timeline_response(waterfalls: List[Dict], format: str, session_id: str):
+    if format == "text":
+        return PlainTextResponse(render_waterfalls(waterfalls))
+    return {"session_id": session_id, "turns": waterfalls}
+
+@app.get("/diagnostics/timeline")
+async def diagnostics_timeline(session_id: str = DEFAULT_SESSION_ID, last: int = 10, format: str = "json"):
+    """
+    Waterfall-ul ultimelor `last` ture: fazele fiecărui model (context, așteptare
+    în scheduler, TTFB, generare, reîncercări, detecție), în secunde de la
+    începutul turei. format=text întoarce diagrama ASCII.
+    """
+    session = await _get_session(session_id)
+    if session is None or not session.rounds:
+        return {"error": "Nicio conversație"}
+    if format not in ("json", "text"):
+        return {"error": f"Format necunoscut: {format}"}
+    return _timeline_response(turn_waterfalls(session.rounds, last), format, session_id)
+
+@app.get("/diagnostics/timeline/{round_number}")
+async def diagnostics_turn_timeline(round_number: int, session_id: str = DEFAULT_SESSION_ID,
+                                    format: str = "json"):
+    """Waterfall-ul turei care conține runda round_number (user sau LLM)."""
+    session = await _get_session(session_id)
+    if session is None:
+        return {"error": "Nicio conversație"}
+    if format not in ("json", "text"):
+        return {"error": f"Format necunoscut: {format}"}
+    user_index = find_turn(session.rounds, round_number)
+    if user_index is None:
+        return {"error": "Rundă inexistentă"}
+    return _timeline_response([turn_waterfall(session.rounds, user_index)], format, session_id)
+
 @app.post("/reset")
-def reset_conversation():
-    """Reset conversație."""
-    global rounds
-    rounds = []
-    return {"status": "Reset", "timestamp": datetime.now().isoformat()}
+async def reset_conversation(session_id: str = DEFAULT_SESSION_ID):
+    """Reset conversație (doar pentru sesiunea dată)."""
+    session = await _get_session(session_id)
+    if session is not None:
+        # Așteaptă runda în curs, ca să nu se amestece cu conversația nouă
+        async with session.lock:
+            session.reset()
+    return {"status": "Reset", "session_id": session_id, "timestamp": datetime.now().isoformat()}
+
+@app.get("/sessions")
+async def list_sessions():
+    """Sesiunile din memorie (cea mai recent folosită prima) și limitele store-ului."""
+    return {
+        "store": sessions.info(),
+        "round_log": round_log.info() if round_log else None,
+        "sessions": sessions.list()
+    }
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Șterge o sesiune din memorie."""
+    session = await _get_session(session_id)
+    if session is None:
+        return {"error": "Sesiune inexistentă"}
+    async with session.lock:
+        sessions.delete(session_id)
+    return {"status": "Deleted", "session_id": session_id}
+
+@app.get("/scheduler")
+async def scheduler_stats():
+    """Starea cozilor per provider: apeluri în curs/în așteptare, reîncercări, timp de throttling."""
+    return {"providers": schedulers_info(), "limits": config.PROVIDER_LIMITS}
+
+@app.get("/metrics")
+async def metrics():
+    """Metrici în format text Prometheus: latențe și erori per provider, durata rundelor, lag-ul event loop-ului."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache")
+async def cache_stats():
+    """Statisticile cache-ului de răspunsuri (hit/miss pe niveluri, ocupare, evicții)."""
+    cache = get_response_cache()
+    # Cu cache-ul dezactivat, discul nu e atins (statistici zero până la prima folosire)
+    if config.RESPONSE_CACHE_ENABLED:
+        await cache.ensure_disk_index()
+    return {"enabled_by_default": config.RESPONSE_CACHE_ENABLED, **cache.stats()}
+
+@app.delete("/cache")
+async def clear_cache():
+    """Golește cache-ul de răspunsuri (memorie și disc)."""
+    cache = get_response_cache()
+    # Fișierele de pe disc sunt șterse după index
+    await cache.ensure_disk_index()
+    await asyncio.to_thread(cache.clear)
+    return {"status": "Cleared", "timestamp": datetime.now().isoformat()}
 
 if __name__ == "__main__":
     import uvicorn
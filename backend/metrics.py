@@ -0,0 +1,247 @@
+# metrics.py - Metrici în format text Prometheus pentru /metrics (fără dependențe)
+"""
+Contoare, gauge-uri și histograme cu etichete, randate în formatul de expunere
+Prometheus (text/plain; version=0.0.4).
+
+Toate actualizările se fac din thread-ul event loop-ului (inclusiv fragmentele
+Gemini, livrate prin call_soon_threadsafe), deci nu e nevoie de lock.
+"""
+
+import asyncio
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scheduler import schedulers_info
+
+# Latențe provider: de la zeci de ms (cache, TTFB) la timeout-ul de 30s
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+ROUND_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+TOKENS_PER_SECOND_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 300, 500)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        _REGISTRY.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Pentru contoare ținute în altă parte (ex. scheduler), citite la scrape."""
+        self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        # Numărătoare per bucket; cumularea se face la randare
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][index] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                le = ("le", _format_value(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(state['sum'], 6))}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+_REGISTRY: List[_Metric] = []
+_COLLECTORS: List[Callable[[], None]] = []
+
+
+def register_collector(collect: Callable[[], None]):
+    """collect() e apelată la fiecare scrape, înainte de randare (valori citite din alte module)."""
+    _COLLECTORS.append(collect)
+
+
+def render_metrics() -> str:
+    for collect in _COLLECTORS:
+        collect()
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# === METRICI AGORA ===
+
+PROVIDER_TTFB = Histogram(
+    "agora_provider_ttfb_seconds",
+    "Time to first byte per provider request (streaming: first text fragment; otherwise the full response)",
+    ("provider", "mode"))
+PROVIDER_REQUEST = Histogram(
+    "agora_provider_request_seconds",
+    "Total duration of one provider request attempt",
+    ("provider", "outcome"))
+PROVIDER_TOKENS_PER_SECOND = Histogram(
+    "agora_provider_output_tokens_per_second",
+    "Output tokens per second of generation (after the first byte when streaming)",
+    ("provider",), TOKENS_PER_SECOND_BUCKETS)
+PROVIDER_OUTPUT_TOKENS = Counter(
+    "agora_provider_output_tokens_total", "Output tokens reported by providers", ("provider",))
+PROVIDER_USAGE_TOKENS = Counter(
+    "agora_provider_usage_tokens_total",
+    "Prompt-side and reasoning tokens per call (input, cache_read, cache_write, reasoning)",
+    ("provider", "type"))
+PROVIDER_ESTIMATED_USAGE = Counter(
+    "agora_provider_estimated_usage_total", "Calls whose usage was estimated locally (no provider report)", ("provider",))
+PROVIDER_COST = Counter(
+    "agora_provider_cost_usd_total", "Estimated spend from MODEL_PRICING", ("provider",))
+MODEL_RESULTS = Counter(
+    "agora_model_results_total",
+    "Model turns by result (ok, error, timeout, skipped, cached)",
+    ("provider", "result"))
+EMPTY_RESPONSES = Counter(
+    "agora_provider_empty_responses_total", "Responses without usable text (each one is retried once)", ("provider",))
+SAFETY_BLOCKS = Counter(
+    "agora_provider_safety_blocks_total", "Responses blocked by provider safety filters", ("provider",))
+PROVIDER_CALLS = Counter(
+    "agora_provider_calls_total", "Provider request attempts started by the scheduler", ("provider",))
+PROVIDER_RETRIES = Counter(
+    "agora_provider_retries_total", "Scheduler retries after transient errors (429, 5xx, connection)", ("provider",))
+PROVIDER_FAILURES = Counter(
+    "agora_provider_failures_total", "Provider requests that failed after all retries", ("provider",))
+PROVIDER_THROTTLED = Counter(
+    "agora_provider_throttled_seconds_total", "Time spent waiting for RPM/TPM buckets", ("provider",))
+PROVIDER_IN_FLIGHT = Gauge(
+    "agora_provider_in_flight", "Provider requests currently running", ("provider",))
+PROVIDER_QUEUED = Gauge(
+    "agora_provider_queued", "Provider requests waiting for a concurrency slot", ("provider",))
+ROUND_DURATION = Histogram(
+    "agora_round_duration_seconds", "Duration of a full round (all models)", ("round_mode",), ROUND_BUCKETS)
+EVENT_LOOP_LAG = Histogram(
+    "agora_event_loop_lag_seconds", "Event loop scheduling delay", (), LOOP_LAG_BUCKETS)
+EVENT_LOOP_LAG_LAST = Gauge(
+    "agora_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+
+def observe_provider_request(provider: str, seconds: float, ttfb: Optional[float], streamed: bool, ok: bool):
+    """Un request către provider (o încercare); ttfb doar pentru încercările reușite."""
+    PROVIDER_REQUEST.observe(seconds, provider=provider, outcome="ok" if ok else "error")
+    if ttfb is not None:
+        PROVIDER_TTFB.observe(ttfb, provider=provider, mode="stream" if streamed else "full")
+
+
+def observe_model_result(provider: str, tokens: int, timeout: bool, error: Optional[str],
+                         cached: bool, skipped: bool, usage: Dict, usage_fields: Optional[Dict] = None,
+                         cost: Optional[float] = None):
+    """Rezultatul final al unui model într-o rundă (după toate reîncercările)."""
+    if cached:
+        result = "cached"
+    elif skipped:
+        result = "skipped"
+    elif timeout:
+        result = "timeout"
+    elif error:
+        result = "error"
+    else:
+        result = "ok"
+    MODEL_RESULTS.inc(provider=provider, result=result)
+    if result != "ok":
+        return
+
+    PROVIDER_OUTPUT_TOKENS.inc(tokens, provider=provider)
+    if usage_fields:
+        for kind in ("input", "cache_read", "cache_write", "reasoning"):
+            PROVIDER_USAGE_TOKENS.inc(usage_fields.get(f"{kind}_tokens", 0), provider=provider, type=kind)
+        if usage_fields.get("usage_source") != "provider":
+            PROVIDER_ESTIMATED_USAGE.inc(provider=provider)
+    if cost:
+        PROVIDER_COST.inc(cost, provider=provider)
+    generation = usage.get("generation_seconds")
+    if tokens and generation:
+        PROVIDER_TOKENS_PER_SECOND.observe(tokens / generation, provider=provider)
+
+
+def _collect_schedulers():
+    """Contoarele și cozile sunt ținute de scheduler; aici doar le citim."""
+    for provider, info in schedulers_info().items():
+        PROVIDER_CALLS.set_total(info["calls"], provider=provider)
+        PROVIDER_RETRIES.set_total(info["retries"], provider=provider)
+        PROVIDER_FAILURES.set_total(info["failures"], provider=provider)
+        PROVIDER_THROTTLED.set_total(info["throttled_seconds"], provider=provider)
+        PROVIDER_IN_FLIGHT.set(info["in_flight"], provider=provider)
+        PROVIDER_QUEUED.set(info["queued"], provider=provider)
+
+
+register_collector(_collect_schedulers)
+
+
+async def monitor_event_loop(interval: float):
+    """Măsoară cât întârzie loop-ul un sleep(interval); rulează cât trăiește serverul."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - started - interval, 0.0)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
@@ -0,0 +1,440 @@
+# mock_providers.py - Provideri LLM locali (Anthropic, OpenAI, Gemini, x.ai) pentru teste și load test
+"""
+Un server care vorbește formatele API ale providerilor, cu latență, viteză de
+generare și erori configurabile. Agora rulează contra lui fără API keys reale.
+
+Usage:
+    python mock_providers.py --port 9100 --ttfb-ms 400 --tokens-per-sec 80 --error-rate 0.02
+    AGORA_MOCK_PROVIDERS_URL=http://127.0.0.1:9100 python main.py
+
+Rute:
+    POST /v1/messages                                   Anthropic (stream sau nu)
+    POST /v1/chat/completions                           OpenAI și x.ai (stream sau nu)
+    POST /v1beta/models/{model}:generateContent         Gemini
+    POST /v1beta/models/{model}:streamGenerateContent   Gemini (alt=sse sau array JSON)
+    GET  /_mock/stats                                   contoare per provider
+    GET  /_mock/requests?provider=...                   ultimele payload-uri primite
+    POST /_mock/settings                                schimbă setările la runtime
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from token_estimator import estimate_tokens
+
+DEFAULT_SETTINGS = {
+    "ttfb_ms": 300.0,           # mediana timpului până la primul token
+    "ttfb_sigma": 0.4,          # dispersia lognormală a TTFB (0 = constant)
+    "tokens_per_sec": 80.0,     # viteza de generare (0 = instant)
+    "output_tokens_min": 40,    # lungimea răspunsului, limitată și de max_tokens
+    "output_tokens_max": 160,
+    "chunk_tokens": 4,          # tokeni per fragment în modul streaming
+    "error_rate": 0.0,          # probabilitatea unei erori HTTP
+    "error_codes": [429, 500, 503],
+    "retry_after": 1.0,         # secunde, trimis cu 429
+    "empty_rate": 0.0,          # probabilitatea unui răspuns cu text gol
+    "block_rate": 0.0,          # Gemini: probabilitatea unui răspuns blocat de safety
+    "seed": None
+}
+
+PROVIDERS = ("anthropic", "openai", "gemini", "xai")
+_WORDS = ("alpha", "beta", "gamma", "delta", "theta", "logos", "agora", "signal", "pattern", "boundary",
+          "context", "round", "model", "response", "structure", "relation", "→", "∃", "⊕", "∈")
+_ERROR_STATUS = {
+    400: "INVALID_ARGUMENT", 408: "DEADLINE_EXCEEDED", 429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL", 502: "UNAVAILABLE", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED", 529: "UNAVAILABLE"
+}
+
+
+class MockState:
+    """Setări, contoare și prefixele deja "cache-uite" ale serverului mock."""
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.rng = random.Random(self.settings["seed"])
+        self.requests = {p: deque(maxlen=200) for p in PROVIDERS}
+        self.stats = {p: {"requests": 0, "streamed": 0, "errors": 0, "empty": 0, "blocked": 0,
+                          "output_tokens": 0} for p in PROVIDERS}
+        self._prefixes = set()
+
+    # === COMPORTAMENT ===
+
+    def ttfb(self) -> float:
+        s = self.settings
+        if s["ttfb_sigma"] <= 0:
+            return s["ttfb_ms"] / 1000
+        return s["ttfb_ms"] * math.exp(self.rng.gauss(0, s["ttfb_sigma"])) / 1000
+
+    def token_delay(self, tokens: int) -> float:
+        rate = self.settings["tokens_per_sec"]
+        return tokens / rate if rate > 0 else 0.0
+
+    def injected_error(self) -> Optional[int]:
+        if self.rng.random() < self.settings["error_rate"]:
+            return self.rng.choice(self.settings["error_codes"])
+        return None
+
+    def output_words(self, max_tokens: int) -> List[str]:
+        """Răspunsul generat: un token ≈ un cuvânt (sau niciunul, pentru empty_rate)."""
+        if self.rng.random() < self.settings["empty_rate"]:
+            return []
+        low, high = self.settings["output_tokens_min"], self.settings["output_tokens_max"]
+        count = max(1, min(max_tokens or high, self.rng.randint(low, high)))
+        return [self.rng.choice(_WORDS) for _ in range(count)]
+
+    def chunks(self, words: List[str]) -> List[str]:
+        size = max(1, int(self.settings["chunk_tokens"]))
+        return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+                for i in range(0, len(words), size)]
+
+    def prefix_cache(self, provider: str, prefixes: List[str]) -> Dict[str, int]:
+        """
+        Simulează prompt caching: cel mai lung prefix deja văzut e "citit",
+        cel mai lung prefix nou e "scris". prefixes = textul cumulat la fiecare
+        breakpoint, de la cel mai scurt la cel mai lung.
+        """
+        read = write = 0
+        for text in prefixes:
+            key = (provider, hashlib.sha256(text.encode("utf-8")).hexdigest())
+            tokens = estimate_tokens(text)
+            if key in self._prefixes:
+                read = tokens
+            else:
+                write = tokens
+                self._prefixes.add(key)
+        return {"read": read, "write": max(write - read, 0) if write else 0}
+
+    def record(self, provider: str, payload: Dict, path: str):
+        self.stats[provider]["requests"] += 1
+        self.requests[provider].append({"ts": time.time(), "path": path, "payload": payload})
+
+
+# === FORMATE PROVIDERI ===
+
+def _anthropic_error(status: int) -> Dict:
+    kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+    return {"type": "error", "error": {"type": kind, "message": f"mock error {status}"}}
+
+
+def _openai_error(status: int) -> Dict:
+    return {"error": {"message": f"mock error {status}", "type": "server_error", "code": str(status)}}
+
+
+def _gemini_error(status: int) -> Dict:
+    return {"error": {"code": status, "message": f"mock error {status}", "status": _ERROR_STATUS.get(status, "UNKNOWN")}}
+
+
+def _error_response(state: MockState, provider: str, status: int, body: Dict) -> JSONResponse:
+    state.stats[provider]["errors"] += 1
+    headers = {"retry-after": str(state.settings["retry_after"])} if status == 429 else {}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def _sse(data: Dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _anthropic_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content or [])
+
+
+def _anthropic_prefixes(payload: Dict) -> List[str]:
+    """Textul cumulat până la fiecare bloc marcat cu cache_control."""
+    prefixes = []
+    text = ""
+    system = payload.get("system")
+    blocks = [system] if isinstance(system, str) else list(system or [])
+    for block in blocks:
+        text += block if isinstance(block, str) else block.get("text", "")
+        if isinstance(block, dict) and block.get("cache_control"):
+            prefixes.append(text)
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        text += f"\n{message.get('role')}:"
+        if isinstance(content, str):
+            text += content
+            continue
+        for block in content:
+            text += block.get("text", "")
+            if block.get("cache_control"):
+                prefixes.append(text)
+    return prefixes
+
+
+def create_app(settings: Optional[Dict] = None) -> FastAPI:
+    """Aplicația mock; settings suprascriu DEFAULT_SETTINGS."""
+    app = FastAPI()
+    state = MockState(settings)
+    app.state.mock = state
+
+    # === ANTHROPIC ===
+
+    @app.post("/v1/messages")
+    async def anthropic_messages(request: Request):
+        payload = await request.json()
+        state.record("anthropic", payload, request.url.path)
+        status = state.injected_error()
+        if status:
+            return _error_response(state, "anthropic", status, _anthropic_error(status))
+
+        words = state.output_words(payload.get("max_tokens"))
+        cache = state.prefix_cache("anthropic", _anthropic_prefixes(payload))
+        input_text = _anthropic_text(payload.get("system")) + "".join(
+            _anthropic_text(m.get("content")) for m in payload.get("messages", []))
+        usage = {
+            "input_tokens": max(estimate_tokens(input_text) - cache["read"] - cache["write"], 0),
+            "output_tokens": len(words),
+            "cache_read_input_tokens": cache["read"],
+            "cache_creation_input_tokens": cache["write"]
+        }
+        message = {
+            "id": f"msg_mock_{state.stats['anthropic']['requests']}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "mock"),
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": usage
+        }
+        state.stats["anthropic"]["output_tokens"] += len(words)
+        if not words:
+            state.stats["anthropic"]["empty"] += 1
+
+        if not payload.get("stream"):
+            await asyncio.sleep(state.ttfb() + state.token_delay(len(words)))
+            message["content"] = [{"type": "text", "text": " ".join(words)}] if words else []
+            message["stop_reason"] = "end_turn"
+            return JSONResponse(message)
+
+        state.stats["anthropic"]["streamed"] += 1
+
+        async def events():
+            await asyncio.sleep(state.ttfb())
+            yield _sse({"type": "message_start", "message": message}, "message_start")
+            yield _sse({"type": "content_block_start", "index": 0,
+                        "content_block": {"type": "text", "text": ""}}, "content_block_start")
+            for chunk in state.chunks(words):
+                await asyncio.sleep(state.token_delay(len(chunk.split())))
+                yield _sse({"type": "content_block_delta", "index": 0,
+                            "delta": {"type": "text_delta", "text": chunk}}, "content_block_delta")
+            yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                        "usage": {"output_tokens": len(words)}}, "message_delta")
+            yield _sse({"type": "message_stop"}, "message_stop")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # === OPENAI / X.AI ===
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        # Același format pentru ambii; modelele grok-* sunt contorizate ca x.ai
+        provider = "xai" if str(payload.get("model", "")).startswith("grok") else "openai"
+        state.record(provider, payload, request.url.path)
+        status = state.injected_error()
+        if status:
+            return _error_response(state, provider, status, _openai_error(status))
+
+        max_tokens = payload.get("max_completion_tokens") or payload.get("max_tokens")
+        words = state.output_words(max_tokens)
+        messages = payload.get("messages", [])
+        # Cache automat: prefixul = toate mesajele în afară de ultimul
+        prefix = "".join(f"\n{m.get('role')}:{m.get('content')}" for m in messages[:-1])
+        cache = state.prefix_cache(provider, [prefix] if estimate_tokens(prefix) >= 1024 else [])
+        prompt_tokens = estimate_tokens("".join(str(m.get("content", "")) for m in messages))
+        cache["read"] = min(cache["read"], prompt_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_tokens + len(words),
+            "prompt_tokens_details": {"cached_tokens": cache["read"]}
+        }
+        completion_id = f"chatcmpl-mock-{state.stats[provider]['requests']}"
+        created = int(time.time())
+        model = payload.get("model", "mock")
+        state.stats[provider]["output_tokens"] += len(words)
+        if not words:
+            state.stats[provider]["empty"] += 1
+
+        if not payload.get("stream"):
+            await asyncio.sleep(state.ttfb() + state.token_delay(len(words)))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        state.stats[provider]["streamed"] += 1
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> Dict:
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        async def events():
+            await asyncio.sleep(state.ttfb())
+            yield _sse(chunk({"role": "assistant", "content": ""}))
+            for text in state.chunks(words):
+                await asyncio.sleep(state.token_delay(len(text.split())))
+                yield _sse(chunk({"content": text}))
+            yield _sse(chunk({}, "stop"))
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                yield _sse({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                            "model": model, "choices": [], "usage": usage})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # === GEMINI ===
+
+    def gemini_response(words: List[str], payload: Dict, cache: Dict, blocked: bool,
+                        output_tokens: Optional[int] = None) -> Dict:
+        # La streaming, usageMetadata din fiecare chunk e cumulativ (ca la API-ul real)
+        output_tokens = len(words) if output_tokens is None else output_tokens
+        prompt_tokens = estimate_tokens(json.dumps(payload.get("contents", []), ensure_ascii=False))
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+            "cachedContentTokenCount": cache["read"]
+        }
+        if blocked:
+            return {"promptFeedback": {"blockReason": "SAFETY"}, "usageMetadata": usage}
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": " ".join(words)}] if words else [], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "usageMetadata": usage
+        }
+
+    @app.post("/v1beta/models/{model_action:path}")
+    async def gemini_generate(model_action: str, request: Request):
+        payload = await request.json()
+        state.record("gemini", payload, request.url.path)
+        status = state.injected_error()
+        if status:
+            return _error_response(state, "gemini", status, _gemini_error(status))
+
+        max_tokens = (payload.get("generationConfig") or {}).get("maxOutputTokens")
+        blocked = state.rng.random() < state.settings["block_rate"]
+        words = [] if blocked else state.output_words(max_tokens)
+        contents = json.dumps(payload.get("contents", [])[:-1], ensure_ascii=False)
+        cache = state.prefix_cache("gemini", [contents] if estimate_tokens(contents) >= 1024 else [])
+        state.stats["gemini"]["output_tokens"] += len(words)
+        if blocked:
+            state.stats["gemini"]["blocked"] += 1
+        elif not words:
+            state.stats["gemini"]["empty"] += 1
+
+        if not model_action.endswith(":streamGenerateContent"):
+            await asyncio.sleep(state.ttfb() + state.token_delay(len(words)))
+            return JSONResponse(gemini_response(words, payload, cache, blocked))
+
+        state.stats["gemini"]["streamed"] += 1
+        sse = request.query_params.get("alt") == "sse"
+
+        async def events():
+            await asyncio.sleep(state.ttfb())
+            parts, streamed = [], 0
+            for chunk in state.chunks(words):
+                streamed += len(chunk.split())
+                parts.append(gemini_response(chunk.split(), payload, cache, blocked, streamed))
+            parts = parts or [gemini_response([], payload, cache, blocked)]
+            if not sse:
+                yield "["
+            for i, part in enumerate(parts):
+                if i:
+                    await asyncio.sleep(state.token_delay(state.settings["chunk_tokens"]))
+                if sse:
+                    yield _sse(part)
+                else:
+                    yield ("," if i else "") + json.dumps(part, ensure_ascii=False)
+            if not sse:
+                yield "]"
+
+        media_type = "text/event-stream" if sse else "application/json"
+        return StreamingResponse(events(), media_type=media_type)
+
+    # === CONTROL ===
+
+    @app.get("/_mock/stats")
+    async def mock_stats():
+        return {"settings": state.settings, "providers": state.stats}
+
+    @app.get("/_mock/requests")
+    async def mock_requests(provider: str = "anthropic", limit: int = 20):
+        if provider not in state.requests:
+            return {"error": f"Provider necunoscut: {provider}"}
+        return {"provider": provider, "requests": list(state.requests[provider])[-limit:]}
+
+    @app.post("/_mock/settings")
+    async def mock_settings(settings: dict):
+        unknown = [key for key in settings if key not in DEFAULT_SETTINGS]
+        if unknown:
+            return {"error": f"Setări necunoscute: {unknown}"}
+        state.settings.update(settings)
+        if "seed" in settings:
+            state.rng.seed(settings["seed"])
+        return {"settings": state.settings}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provideri LLM mock pentru Agora")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ttfb-ms", type=float, default=DEFAULT_SETTINGS["ttfb_ms"])
+    parser.add_argument("--ttfb-sigma", type=float, default=DEFAULT_SETTINGS["ttfb_sigma"])
+    parser.add_argument("--tokens-per-sec", type=float, default=DEFAULT_SETTINGS["tokens_per_sec"])
+    parser.add_argument("--output-tokens", default=None, help='Interval "min,max" pentru lungimea răspunsului')
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_SETTINGS["error_rate"])
+    parser.add_argument("--error-codes", default="429,500,503", help="Coduri HTTP injectate, separate prin virgulă")
+    parser.add_argument("--empty-rate", type=float, default=DEFAULT_SETTINGS["empty_rate"])
+    parser.add_argument("--block-rate", type=float, default=DEFAULT_SETTINGS["block_rate"])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = {
+        "ttfb_ms": args.ttfb_ms,
+        "ttfb_sigma": args.ttfb_sigma,
+        "tokens_per_sec": args.tokens_per_sec,
+        "error_rate": args.error_rate,
+        "error_codes": [int(code) for code in args.error_codes.split(",") if code.strip()],
+        "empty_rate": args.empty_rate,
+        "block_rate": args.block_rate,
+        "seed": args.seed
+    }
+    if args.output_tokens:
+        low, high = (int(v) for v in args.output_tokens.split(","))
+        settings["output_tokens_min"], settings["output_tokens_max"] = low, high
+
+    import uvicorn
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# providers.py - Registrul providerilor: ce funcție răspunde pentru fiecare model din config.MODELS
+"""
+Fiecare intrare din config.MODELS are un "provider" (implicit după numele
+modelului):
+
+    anthropic          - SDK-ul anthropic (doar intrarea "claude")
+    openai             - SDK-ul openai (doar intrarea "gpt")
+    gemini             - SDK-ul google.generativeai (doar intrarea "gemini")
+    openai_compatible  - orice endpoint /chat/completions prin pool-ul HTTP
+                         comun (x.ai, vLLM, Ollama, llama.cpp, LM Studio)
+    "modul:funcție"    - plugin: funcție async cu semnătura
+                         fn(model_name, messages, max_tokens, theta_enabled, on_delta, usage)
+                         care întoarce (text, tokens, timeout, error)
+
+SDK-urile sunt importate doar pentru modelele active (activate_providers la
+pornire), nu la importul modulului.
+"""
+
+import importlib
+import time
+from typing import Callable, Dict, List, Optional
+
+import config
+import llm_clients
+
+# Providerul implicit al intrărilor existente în config.MODELS
+DEFAULT_PROVIDERS = {
+    "claude": "anthropic",
+    "gpt": "openai",
+    "gemini": "gemini",
+    "grok": "openai_compatible"
+}
+
+# Providerii cu SDK: clientul e unul singur, construit din cheia și intrarea lor fixă
+_SDK_PROVIDERS = {
+    "anthropic": ("claude", "CLAUDE_API_KEY", llm_clients.init_claude, llm_clients.call_claude),
+    "openai": ("gpt", "OPENAI_API_KEY", llm_clients.init_openai, llm_clients.call_gpt),
+    "gemini": ("gemini", "GEMINI_API_KEY", llm_clients.init_gemini, llm_clients.call_gemini),
+}
+
+_plugins: Dict[str, Callable] = {}
+
+
+def provider_kind(model_name: str) -> str:
+    return config.MODELS[model_name].get("provider") or DEFAULT_PROVIDERS.get(model_name, "openai_compatible")
+
+
+def _valid_key(api_key: Optional[str]) -> bool:
+    return bool(api_key) and len(api_key) > 10
+
+
+def _load_plugin(kind: str) -> Callable:
+    """Importă "modul:funcție" (o singură dată)."""
+    fn = _plugins.get(kind)
+    if fn is None:
+        module_name, _, attr = kind.partition(":")
+        if not module_name or not attr:
+            raise ValueError(f'Provider necunoscut "{kind}" (așteptat anthropic, openai, gemini, '
+                             f'openai_compatible sau "modul:funcție")')
+        fn = _plugins[kind] = getattr(importlib.import_module(module_name), attr)
+    return fn
+
+
+def is_configured(model_name: str) -> bool:
+    """Modelul poate fi folosit: nu e dezactivat și are cheie validă (sau endpoint propriu)."""
+    model_config = config.MODELS.get(model_name)
+    if model_config is None or model_config.get("enabled") is False:
+        return False
+    kind = provider_kind(model_name)
+    if kind in _SDK_PROVIDERS:
+        entry, key_name, _, _ = _SDK_PROVIDERS[kind]
+        if model_name != entry:
+            print(f'⚠️  {model_name}: providerul "{kind}" e disponibil doar pentru intrarea "{entry}"')
+            return False
+        return _valid_key(getattr(config, key_name))
+    if kind == "openai_compatible":
+        # Endpoint-urile locale pot rula fără cheie
+        if model_config.get("base_url"):
+            return True
+        return _valid_key(llm_clients.openai_compatible_api_key(model_name))
+    # Pluginurile își verifică singure configurația
+    return True
+
+
+def activate_providers(models: List[str]) -> List[str]:
+    """
+    Importă și inițializează providerii modelelor active. Modelele al căror
+    SDK / plugin nu se poate încărca sunt scoase din listă.
+    """
+    active = []
+    for model_name in models:
+        kind = provider_kind(model_name)
+        started = time.perf_counter()
+        try:
+            if kind in _SDK_PROVIDERS:
+                _SDK_PROVIDERS[kind][2]()
+            elif kind != "openai_compatible":
+                _load_plugin(kind)
+        except Exception as e:
+            print(f"❌ {model_name} ({kind}): {type(e).__name__}: {e}")
+            continue
+        print(f"   {model_name}: {kind} încărcat în {(time.perf_counter() - started) * 1000:.0f}ms")
+        active.append(model_name)
+    return active
+
+
+async def call_model(model_name: str, messages: List[Dict], max_tokens: int, theta_enabled: Optional[bool] = None,
+                     on_delta: Optional[Callable[[str], None]] = None, usage: Optional[Dict] = None):
+    """Apelează modelul prin providerul lui; întoarce (text, tokens, timeout, error)."""
+    if model_name not in config.MODELS:
+        return "[model necunoscut]", 0, False, "Unknown"
+    kind = provider_kind(model_name)
+    if kind in _SDK_PROVIDERS:
+        return await _SDK_PROVIDERS[kind][3](messages, max_tokens, theta_enabled, on_delta, usage)
+    if kind == "openai_compatible":
+        return await llm_clients.call_openai_compatible(model_name, messages, max_tokens, theta_enabled,
+                                                        on_delta, usage)
+    fn = _load_plugin(kind)
+    return await fn(model_name, messages, max_tokens, theta_enabled, on_delta, usage)
@@ -0,0 +1,181 @@
+# response_cache.py - Cache de răspunsuri LLM adresat prin conținutul request-ului
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config
+
+
+def request_key(fingerprint: Dict) -> str:
+    """SHA-256 al request-ului complet, serializat canonic."""
+    canonical = json.dumps(fingerprint, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache pe două niveluri pentru răspunsuri reușite.
+
+    Memorie: LRU cu max_entries intrări. Disc (opțional): un fișier JSON per
+    cheie în disk_dir, evacuat după mărimea totală, cel mai vechi acces primul.
+    Operațiile pe disc rulează în thread-uri, ca să nu blocheze event loop-ul;
+    indexul discului e construit la prima folosire a nivelului disc, nu la creare.
+    """
+
+    def __init__(self, max_entries: int = None, disk_dir: Optional[str] = None, disk_max_bytes: int = None):
+        self.max_entries = max_entries if max_entries is not None else config.RESPONSE_CACHE_MEMORY_ENTRIES
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes if disk_max_bytes is not None else config.RESPONSE_CACHE_DISK_MAX_MB * 1024 * 1024
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        # Index disc: cheie -> mărime, în ordinea ultimului acces
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self._index_loaded = False
+        self._index_lock = asyncio.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.evictions = 0
+
+    # === MEMORIE ===
+
+    def _remember(self, key: str, value: Dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Răspunsul salvat pentru cheie sau None."""
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+
+        if self.disk_dir:
+            await self.ensure_disk_index()
+            value = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: Dict):
+        """Salvează un răspuns (în memorie și, dacă e configurat, pe disc)."""
+        self.puts += 1
+        self._remember(key, value)
+        if self.disk_dir:
+            await self.ensure_disk_index()
+            await asyncio.to_thread(self._disk_put, key, value)
+
+    # === DISC ===
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    async def ensure_disk_index(self):
+        """Construiește indexul discului (o singură dată, într-un thread)."""
+        if self._index_loaded or not self.disk_dir:
+            return
+        async with self._index_lock:
+            if not self._index_loaded:
+                await asyncio.to_thread(self._load_disk_index)
+                self._index_loaded = True
+
+    def _load_disk_index(self):
+        """Reconstruiește indexul din fișierele existente, după ultimul acces."""
+        entries = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _disk_get(self, key: str) -> Optional[Dict]:
+        with self._disk_lock:
+            if key not in self._disk_index:
+                return None
+            self._disk_index.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # ultimul acces, pentru evicție după restart
+            return value
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _disk_put(self, key: str, value: Dict):
+        path = self._path(key)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._disk_lock:
+            self._disk_bytes += len(data) - self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(data)
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+                old_key, size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Golește ambele niveluri."""
+        self._memory.clear()
+        with self._disk_lock:
+            for key in list(self._disk_index):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._disk_index.clear()
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.max_entries,
+            "disk_entries": len(self._disk_index),
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.disk_max_bytes if self.disk_dir else 0,
+            "disk_index_loaded": self._index_loaded,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "puts": self.puts,
+            "evictions": self.evictions
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Cache-ul procesului, creat la prima folosire din config."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(disk_dir=config.RESPONSE_CACHE_DIR)
+    return _response_cache
@@ -0,0 +1,273 @@
+# round_engine.py - O rundă: user + fiecare LLM (secvențial Solution B sau blind, în paralel)
+
+import asyncio
+import time
+from datetime import datetime
+from typing import List, Dict, Optional, Callable
+
+import config
+from context_builder import ContextBudgetError, scan_hallucinations, hallucination_flags
+from session_store import Session
+from llm_clients import request_fingerprint
+from providers import call_model
+from response_cache import get_response_cache, request_key
+from metrics import ROUND_DURATION, observe_model_result
+from cost_ledger import usage_record, usage_cost
+
+# emit(event, data) - primește evenimentele rundei pe măsură ce apar
+EventCallback = Callable[[str, Dict], None]
+
+# Modurile de rundă acceptate (vezi run_round)
+ROUND_MODES = ("sequential", "blind")
+
+# Intrarea înregistrată pentru modelele rămase fără timp în rundă
+SKIPPED_DEADLINE = "skipped (deadline)"
+# Intrarea înregistrată când mesajul curent singur nu încape în bugetul de context
+SKIPPED_CONTEXT_BUDGET = "skipped (context budget)"
+
+
+async def run_round(session: Session, active_models: List[str],
+                    content: str, token_limit: int, theta_enabled: bool,
+                    emit: Optional[EventCallback] = None, use_cache: Optional[bool] = None,
+                    deadline: Optional[float] = None, round_mode: str = None) -> Dict:
+    """
+    Rulează o rundă completă și adaugă rundele user/assistant în sesiune.
+    Apelantul ține session.lock pe durata rundei.
+
+    Cu use_cache (implicit config.RESPONSE_CACHE_ENABLED), un request identic
+    cu unul deja reușit e servit din cache, fără apel la provider.
+    
+    deadline (secunde) e termenul întregii runde: fiecare model primește timpul
+    rămas, iar modelele care nu mai încap sunt înregistrate ca runde
+    "skipped (deadline)" (fără conținut în contextul turelor următoare).
+    Un model pentru care mesajul curent singur depășește bugetul de context
+    nu e apelat; runda lui e "skipped (context budget)".
+
+    round_mode (implicit config.ROUND_MODE_DEFAULT):
+        "sequential" - Solution B: fiecare model vede răspunsurile de dinainte
+        "blind"      - toate modelele răspund în paralel, fără să se vadă între
+                       ele în această rundă; răspunsurile intră în istoric
+                       pentru runda următoare
+
+    Fiecare rundă LLM primește "timeline": momentele fazelor (construirea
+    contextului, cache, fiecare încercare către provider cu scheduled/sent/
+    first_byte/last_byte, detecția de halucinații), în secunde de la începutul
+    turei. timeline.py le transformă în waterfall per tură.
+
+    Evenimente trimise prin emit (dacă e setat), în ordine:
+        round_start  - runda user a fost adăugată
+        order        - ordinea dată de zar
+        model_start  - un model începe să răspundă
+        delta        - fragment de text de la model (streaming)
+        model_done   - runda modelului a fost adăugată (tokens, error, flags)
+        round_end    - același payload ca răspunsul /message
+
+    Returns:
+        {"order": [...], "responses": [...], "round_mode": str, "theta_enabled": bool,
+         "deadline_exceeded": bool}
+    """
+    rounds = session.rounds
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline_at = started + deadline if deadline else None
+    # Timeline-ul fiecărui model: secunde de la începutul turei (time.monotonic)
+    turn_start = time.monotonic()
+    if use_cache is None:
+        use_cache = config.RESPONSE_CACHE_ENABLED
+    if round_mode is None:
+        round_mode = config.ROUND_MODE_DEFAULT
+
+    def _emit(event: str, data: Dict):
+        if emit is not None:
+            emit(event, data)
+
+    def offset(moment: Optional[float] = None) -> float:
+        return round((time.monotonic() if moment is None else moment) - turn_start, 4)
+
+    # === RUNDĂ USER ===
+    user_round = {
+        "round_number": len(rounds) + 1,
+        "type": "user",
+        "content": content,
+        "round_mode": round_mode,
+        "theta_enabled": theta_enabled,
+        "timestamp": datetime.now().isoformat()
+    }
+    session.append_round(user_round)
+    _emit("round_start", {
+        "round_number": user_round["round_number"],
+        "content": content,
+        "theta_enabled": theta_enabled
+    })
+
+    # === DICE ROLL pentru ordinea LLM-urilor ===
+    order = session.dice_roller.roll(active_models)
+    _emit("order", {"order": order, "round_mode": round_mode})
+
+    # === FIECARE LLM = O RUNDĂ SEPARATĂ ===
+    llm_responses = []
+    deadline_exceeded = False
+
+    async def answer(model_name: str, position: int) -> Dict:
+        """Apelează un model și întoarce runda lui LLM (încă neadăugată în sesiune)."""
+        nonlocal deadline_exceeded
+        timeline = {"start": offset()}
+        _emit("model_start", {"model": model_name, "position": position})
+
+        # Fragmentele de text ajung la UI doar când cineva ascultă
+        on_delta = None
+        if emit is not None:
+            def on_delta(text: str):
+                emit("delta", {"model": model_name, "text": text})
+
+        # Context PERSONALIZAT pentru fiecare model, în bugetul lui de tokeni
+        phase_start = offset()
+        try:
+            context_sent, context_ref = session.context_store.window(model_name)
+        except ContextBudgetError as e:
+            # Nu trimitem niciodată un context fără întrebarea curentă
+            print(f"⚠️  {e}")
+            context_sent, context_ref = None, None
+        timeline["context"] = [phase_start, offset()]
+
+        # Cache: doar răspunsurile reușite, după hash-ul request-ului complet
+        cache_key = None
+        cached = None
+        remaining = deadline_at - loop.time() if deadline_at is not None else None
+        if use_cache and context_sent is not None and (remaining is None or remaining > 0):
+            phase_start = offset()
+            cache_key = request_key(request_fingerprint(model_name, context_sent, token_limit, theta_enabled))
+            cached = await get_response_cache().get(cache_key)
+            timeline["cache"] = [phase_start, offset()]
+        
+        # Usage raportat de provider (input, output, cache, raționament) și timpii încercărilor
+        usage = {}
+        skipped = False
+        
+        # Apelează modelul (cu timpul rămas din termenul rundei)
+        if context_sent is None:
+            skipped = True
+            text, tokens, timeout, error = f"[{SKIPPED_CONTEXT_BUDGET}]", 0, False, SKIPPED_CONTEXT_BUDGET
+        elif cached is not None:
+            text, tokens, timeout, error = cached["content"], cached["tokens"], False, None
+            if on_delta is not None:
+                on_delta(text)
+        elif remaining is not None and remaining <= 0:
+            skipped = True
+        else:
+            try:
+                text, tokens, timeout, error = await asyncio.wait_for(
+                    call_model(model_name, context_sent, token_limit, theta_enabled, on_delta, usage),
+                    timeout=remaining
+                )
+            except asyncio.TimeoutError:
+                skipped = True
+        
+        if skipped and context_sent is not None:
+            deadline_exceeded = True
+            text, tokens, timeout, error = f"[{SKIPPED_DEADLINE}]", 0, True, SKIPPED_DEADLINE
+        
+        # Usage unificat: raportat de provider sau estimat local; rundele din
+        # cache, sărite sau cu eroare nu sunt facturate
+        usage_fields = usage_record(usage, context_sent or [], text, cached is None and not skipped and error is None)
+        if usage_fields["usage_source"]:
+            tokens = usage_fields["output_tokens"]
+        cost = usage_cost(model_name, usage_fields) if usage_fields["usage_source"] else None
+        
+        if cache_key is not None and cached is None and error is None:
+            await get_response_cache().put(cache_key, {"content": text, "tokens": tokens})
+        observe_model_result(model_name, tokens, timeout, error, cached is not None, skipped, usage, usage_fields, cost)
+        # Încercările către provider (inclusiv reîncercările), relativ la începutul turei
+        timeline["attempts"] = [
+            {**attempt, **{key: offset(attempt[key]) for key in ("scheduled", "sent", "first_byte", "last_byte")
+                           if attempt.get(key) is not None}}
+            for attempt in usage.pop("attempts", [])
+        ]
+
+        # Detectează halucinații. În modul blind niciun alt model nu a răspuns
+        # înaintea lui, deci toate celelalte contează ca "viitoare".
+        phase_start = offset()
+        if round_mode == "blind":
+            detect_order = [model_name] + [m for m in order if m != model_name]
+            hallucination_matches = scan_hallucinations(text, model_name, detect_order, 0)
+        else:
+            hallucination_matches = scan_hallucinations(text, model_name, order, position)
+        timeline["detect"] = [phase_start, offset()]
+        timeline["end"] = offset()
+
+        # === RUNDĂ LLM ===
+        return {
+            "type": "assistant",
+            "model": model_name,
+            "content": text,
+            "tokens": tokens,
+            "timeout": timeout,
+            "error": error,
+            "cached": cached is not None,
+            "skipped": skipped,
+            "input_tokens": usage_fields["input_tokens"],
+            "cache_read_tokens": usage_fields["cache_read_tokens"],
+            "cache_write_tokens": usage_fields["cache_write_tokens"],
+            "reasoning_tokens": usage_fields["reasoning_tokens"],
+            "usage_source": usage_fields["usage_source"],
+            "cost_usd": cost,
+            # Doar referința: context_sent se reconstruiește la export/diagnostic
+            "context_ref": context_ref,
+            "hallucination_flags": hallucination_flags(hallucination_matches),
+            # Mențiunile care au declanșat flag-urile (poziții în content.lower())
+            "hallucination_matches": hallucination_matches,
+            "round_mode": round_mode,
+            "position": position,
+            "timeline": timeline,
+            "theta_enabled": theta_enabled,
+            "theta_mode": config.THETA_MODE if theta_enabled else None,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def record(llm_round: Dict):
+        """Adaugă runda LLM în sesiune și o anunță."""
+        llm_round = {"round_number": len(rounds) + 1, **llm_round}
+        session.append_round(llm_round)
+        _emit("model_done", {
+            "model": llm_round["model"],
+            "round_number": llm_round["round_number"],
+            "content": llm_round["content"],
+            "tokens": llm_round["tokens"],
+            "timeout": llm_round["timeout"],
+            "error": llm_round["error"],
+            "cached": llm_round["cached"],
+            "skipped": llm_round["skipped"],
+            "hallucination_flags": llm_round["hallucination_flags"]
+        })
+
+        # Pentru response UI
+        llm_responses.append({
+            "model": llm_round["model"],
+            "content": llm_round["content"],
+            "tokens": llm_round["tokens"],
+            "timeout": llm_round["timeout"],
+            "skipped": llm_round["skipped"]
+        })
+
+    if round_mode == "blind":
+        # Toate modelele răspund simultan la același context (doar runda user
+        # e nouă); rundele sunt adăugate apoi în ordinea zarului
+        for llm_round in await asyncio.gather(*(answer(m, p) for p, m in enumerate(order))):
+            record(llm_round)
+    else:
+        for position, model_name in enumerate(order):
+            record(await answer(model_name, position))
+
+    # Return pentru UI
+    result = {
+        "order": order,
+        "responses": llm_responses,
+        "round_mode": round_mode,
+        "theta_enabled": theta_enabled,
+        "deadline_exceeded": deadline_exceeded,
+        # Pentru GET /rounds?since=...
+        "cursor": session.cursor
+    }
+    ROUND_DURATION.observe(loop.time() - started, round_mode=round_mode)
+    _emit("round_end", result)
+    return result
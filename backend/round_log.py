@@ -0,0 +1,243 @@
+# round_log.py - Jurnal append-only (JSONL) al rundelor, pentru recuperare după crash
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class RoundLog:
+    """
+    Jurnal append-only cu group commit.
+
+    append()/reset()/delete() doar pun evenimentul în coadă (O(1) pe calea
+    /message). Un task de fundal scrie periodic tot ce s-a adunat, cu un singur
+    write + fsync per lot, într-un thread ca să nu blocheze event loop-ul.
+
+    Format (o linie JSON per eveniment):
+        {"ts": 1700000000.0, "session_id": "...", "event": "round", "round": {...}}
+        {"ts": ..., "session_id": "...", "event": "reset"}
+        {"ts": ..., "session_id": "...", "event": "delete"}
+    """
+
+    def __init__(self, path: str = None, flush_interval: float = None):
+        self.path = path or config.ROUND_LOG_PATH
+        self.flush_interval = flush_interval if flush_interval is not None else config.ROUND_LOG_FLUSH_INTERVAL
+        self._pending: List[Dict] = []
+        self._file = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closing = False
+        # O singură scriere odată: load_session citește fișierul doar după ce
+        # loturile în curs au ajuns pe disc
+        self._write_lock = asyncio.Lock()
+        self.written = 0
+        self.fsyncs = 0
+
+    # === EVENIMENTE ===
+
+    def append(self, session_id: str, round_data: Dict):
+        self._enqueue({"ts": time.time(), "session_id": session_id, "event": "round", "round": round_data})
+
+    def reset(self, session_id: str):
+        self._enqueue({"ts": time.time(), "session_id": session_id, "event": "reset"})
+
+    def delete(self, session_id: str):
+        self._enqueue({"ts": time.time(), "session_id": session_id, "event": "delete"})
+
+    def _enqueue(self, entry: Dict):
+        self._pending.append(entry)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # === SCRIERE ===
+
+    async def start(self):
+        """Deschide fișierul și pornește task-ul de scriere (la lifespan startup)."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._writer_task = asyncio.create_task(self._writer())
+
+    async def close(self):
+        """Scrie tot ce a rămas în coadă și închide fișierul (la shutdown)."""
+        if self._writer_task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._writer_task
+        self._writer_task = None
+        self._file.close()
+        self._file = None
+
+    async def flush(self) -> bool:
+        """Scrie și fsync-uiește imediat evenimentele din coadă (False dacă scrierea a eșuat)."""
+        async with self._write_lock:
+            return await self._flush_locked()
+
+    async def _flush_locked(self) -> bool:
+        if not self._pending or self._file is None:
+            return True
+        batch, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except OSError as e:
+            # Păstrăm evenimentele pentru următoarea încercare
+            logger.warning("Scrierea a %d evenimente în %s a eșuat: %s", len(batch), self.path, e)
+            self._pending = batch + self._pending
+            return False
+        return True
+
+    async def _writer(self):
+        failures = 0
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._closing:
+                # Fereastra de group commit: adună toate rundele sosite între timp
+                await asyncio.sleep(self.flush_interval)
+            if await self.flush():
+                failures = 0
+            else:
+                failures += 1
+                if self._closing and failures > config.ROUND_LOG_CLOSE_RETRIES:
+                    # Shutdown-ul nu așteaptă la nesfârșit un disc care nu mai răspunde
+                    logger.error("Închid %s fără %d evenimente nescrise după %d încercări",
+                                 self.path, len(self._pending), failures)
+                    self._pending = []
+                else:
+                    # Backoff, apoi reîncercăm și fără evenimente noi
+                    await asyncio.sleep(min(config.ROUND_LOG_RETRY_DELAY * 2 ** (failures - 1),
+                                            config.ROUND_LOG_RETRY_MAX_DELAY))
+                    self._wakeup.set()
+            if self._closing and not self._pending:
+                return
+
+    def _write_batch(self, batch: List[Dict]):
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.written += len(batch)
+        self.fsyncs += 1
+
+    # === RECUPERARE ===
+
+    @staticmethod
+    def _apply(sessions: "OrderedDict[str, Tuple[List[Dict], float]]", entry: Dict):
+        """Aplică un eveniment peste sesiunile reconstruite."""
+        session_id = entry["session_id"]
+        event = entry["event"]
+        if event == "delete":
+            sessions.pop(session_id, None)
+            return
+
+        rounds = sessions[session_id][0] if session_id in sessions else []
+        if event == "reset":
+            rounds = []
+        elif event == "round":
+            rounds.append(entry["round"])
+        sessions[session_id] = (rounds, entry["ts"])
+        sessions.move_to_end(session_id)
+
+    @staticmethod
+    def replay(path: str = None, session_id: Optional[str] = None) -> "OrderedDict[str, Tuple[List[Dict], float]]":
+        """
+        Citește jurnalul și reconstruiește rundele fiecărei sesiuni (sau doar
+        ale session_id).
+
+        O ultimă linie trunchiată (crash în timpul scrierii) e ignorată.
+
+        Returns:
+            session_id -> (runde, timestamp ultim eveniment), de la sesiunea
+            cel mai puțin recent activă la cea mai recentă
+        """
+        path = path or config.ROUND_LOG_PATH
+        sessions: "OrderedDict[str, Tuple[List[Dict], float]]" = OrderedDict()
+        if not os.path.exists(path):
+            return sessions
+
+        # Filtru ieftin pe text înainte de json.loads (format json.dumps implicit)
+        marker = f'"session_id": {json.dumps(session_id, ensure_ascii=False)}' if session_id is not None else None
+        skipped = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or (marker is not None and marker not in line):
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                if session_id is not None and entry["session_id"] != session_id:
+                    continue
+                RoundLog._apply(sessions, entry)
+
+        if skipped:
+            logger.warning("%d linii corupte ignorate în %s", skipped, path)
+        return sessions
+
+    @staticmethod
+    def compact(sessions: "OrderedDict[str, Tuple[List[Dict], float]]", path: str = None) -> int:
+        """
+        Rescrie jurnalul doar cu rundele sesiunilor din replay() (fără sesiunile
+        șterse și fără istoricul dinaintea unui reset). Se apelează la pornire,
+        înainte de start(); fișierul nou înlocuiește atomic pe cel vechi.
+
+        Returns:
+            Numărul de evenimente scrise
+        """
+        path = path or config.ROUND_LOG_PATH
+        temp_path = path + ".compact"
+        written = 0
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for session_id, (rounds, ts) in sessions.items():
+                if not rounds:
+                    # Sesiune resetată, fără runde noi: resetul o păstrează goală
+                    f.write(json.dumps({"ts": ts, "session_id": session_id, "event": "reset"},
+                                       ensure_ascii=False) + "\n")
+                    written += 1
+                for round_data in rounds:
+                    f.write(json.dumps({"ts": ts, "session_id": session_id, "event": "round",
+                                        "round": round_data}, ensure_ascii=False) + "\n")
+                    written += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        return written
+
+    async def load_session(self, session_id: str) -> Optional[Tuple[List[Dict], float]]:
+        """
+        Rundele unei singure sesiuni (ex. evacuată din memorie), inclusiv
+        evenimentele încă nescrise din coadă.
+
+        Returns:
+            (runde, timestamp ultim eveniment) sau None dacă sesiunea nu e în jurnal
+        """
+        async with self._write_lock:
+            await self._flush_locked()
+            sessions = await asyncio.to_thread(self.replay, self.path, session_id)
+            # Fără fișier deschis (jurnal nepornit), evenimentele rămân în coadă
+            for entry in self._pending:
+                if entry["session_id"] == session_id:
+                    self._apply(sessions, entry)
+        return sessions.get(session_id)
+
+    def info(self) -> Dict:
+        return {
+            "path": self.path,
+            "pending": len(self._pending),
+            "written": self.written,
+            "fsyncs": self.fsyncs
+        }
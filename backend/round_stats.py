@@ -0,0 +1,181 @@
+# round_stats.py - Statistici /diagnostics actualizate incremental, rundă cu rundă
+
+from typing import List, Dict
+
+from cost_ledger import new_ledger, add_to_ledger
+
+HALLUCINATION_FLAGS = (
+    "invents_future_responses",
+    "self_citation",
+    "consecutive_responses",
+    "quotes_others"
+)
+
+
+def _new_model_stats() -> Dict:
+    return {
+        "total_rounds": 0,
+        "total_tokens": 0,
+        "errors": 0,
+        "timeouts": 0,
+        "skipped": 0,
+        "hallucinations": 0,
+        "hallucinations_by_flag": {flag: 0 for flag in HALLUCINATION_FLAGS},
+        "theta_rounds": 0,
+        "usage": new_ledger()
+    }
+
+
+class RoundStats:
+    """
+    Agregatele raportului diagnostic, menținute la fiecare rundă adăugată.
+
+    add() e O(1) per rundă, snapshot() e O(numărul de modele): /diagnostics nu
+    mai reparcurge conversația. compute_stats() face același calcul de la zero,
+    pentru verificare.
+    """
+
+    def __init__(self):
+        self.total_rounds = 0
+        self.user_rounds = 0
+        self.llm_rounds = 0
+        self.theta_rounds = 0
+        self.hallucinations = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+        self.hallucinations_by_flag = {flag: 0 for flag in HALLUCINATION_FLAGS}
+        self.usage = new_ledger()
+        self.models: Dict[str, Dict] = {}
+
+    def add(self, round_data: Dict):
+        """Include o rundă nouă în agregate."""
+        self.total_rounds += 1
+        if round_data.get("theta_enabled", False):
+            self.theta_rounds += 1
+
+        if round_data["type"] == "user":
+            self.user_rounds += 1
+            return
+
+        if round_data["type"] != "assistant":
+            return
+
+        self.llm_rounds += 1
+        model_stats = self.models.get(round_data["model"])
+        if model_stats is None:
+            model_stats = self.models[round_data["model"]] = _new_model_stats()
+
+        model_stats["total_rounds"] += 1
+        model_stats["total_tokens"] += round_data.get("tokens", 0)
+        add_to_ledger(self.usage, round_data)
+        add_to_ledger(model_stats["usage"], round_data)
+        if round_data.get("theta_enabled", False):
+            model_stats["theta_rounds"] += 1
+        if round_data.get("error"):
+            self.errors += 1
+            model_stats["errors"] += 1
+        if round_data.get("timeout"):
+            self.timeouts += 1
+            model_stats["timeouts"] += 1
+        if round_data.get("skipped"):
+            self.skipped += 1
+            model_stats["skipped"] += 1
+
+        flags = round_data.get("hallucination_flags", {})
+        if any(flags.values()):
+            self.hallucinations += 1
+            model_stats["hallucinations"] += 1
+        for flag, value in flags.items():
+            if value:
+                self.hallucinations_by_flag[flag] = self.hallucinations_by_flag.get(flag, 0) + 1
+                by_flag = model_stats["hallucinations_by_flag"]
+                by_flag[flag] = by_flag.get(flag, 0) + 1
+
+    def snapshot(self) -> Dict:
+        """Statisticile curente, în formatul /diagnostics."""
+        return {
+            "total_rounds": self.total_rounds,
+            "user_rounds": self.user_rounds,
+            "llm_rounds": self.llm_rounds,
+            "theta_rounds": self.theta_rounds,
+            "hallucinations_detected": self.hallucinations,
+            "hallucinations_by_flag": dict(self.hallucinations_by_flag),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "usage": dict(self.usage),
+            "model_stats": {
+                model: {**stats, "hallucinations_by_flag": dict(stats["hallucinations_by_flag"]),
+                        "usage": dict(stats["usage"])}
+                for model, stats in self.models.items()
+            }
+        }
+
+
+def compute_stats(rounds: List[Dict]) -> Dict:
+    """
+    Aceleași statistici ca RoundStats.snapshot(), calculate de la zero prin
+    scanarea tuturor rundelor (referința pentru verificarea agregatelor).
+    """
+    llm_rounds = [r for r in rounds if r["type"] == "assistant"]
+
+    def by_flag(selected: List[Dict]) -> Dict:
+        counts = {flag: 0 for flag in HALLUCINATION_FLAGS}
+        for r in selected:
+            for flag, value in r.get("hallucination_flags", {}).items():
+                if value:
+                    counts[flag] = counts.get(flag, 0) + 1
+        return counts
+
+    def ledger(selected: List[Dict]) -> Dict:
+        totals = new_ledger()
+        for r in selected:
+            add_to_ledger(totals, r)
+        return totals
+
+    model_stats = {}
+    for model in dict.fromkeys(r["model"] for r in llm_rounds):
+        model_rounds = [r for r in llm_rounds if r["model"] == model]
+        model_stats[model] = {
+            "total_rounds": len(model_rounds),
+            "total_tokens": sum(r.get("tokens", 0) for r in model_rounds),
+            "errors": len([r for r in model_rounds if r.get("error")]),
+            "timeouts": len([r for r in model_rounds if r.get("timeout")]),
+            "skipped": len([r for r in model_rounds if r.get("skipped")]),
+            "hallucinations": len([r for r in model_rounds if any(r.get("hallucination_flags", {}).values())]),
+            "hallucinations_by_flag": by_flag(model_rounds),
+            "theta_rounds": len([r for r in model_rounds if r.get("theta_enabled", False)]),
+            "usage": ledger(model_rounds)
+        }
+
+    return {
+        "total_rounds": len(rounds),
+        "user_rounds": len([r for r in rounds if r["type"] == "user"]),
+        "llm_rounds": len(llm_rounds),
+        "theta_rounds": len([r for r in rounds if r.get("theta_enabled", False)]),
+        "hallucinations_detected": len([r for r in llm_rounds if any(r.get("hallucination_flags", {}).values())]),
+        "hallucinations_by_flag": by_flag(llm_rounds),
+        "errors": len([r for r in llm_rounds if r.get("error")]),
+        "timeouts": len([r for r in llm_rounds if r.get("timeout")]),
+        "skipped": len([r for r in llm_rounds if r.get("skipped")]),
+        "usage": ledger(llm_rounds),
+        "model_stats": model_stats
+    }
+
+
+def verify_stats(stats: RoundStats, rounds: List[Dict]) -> Dict:
+    """
+    Compară agregatele incrementale cu recalcularea completă.
+
+    Returns:
+        {"consistent": bool, "mismatches": {cheie: {"incremental", "recomputed"}}}
+    """
+    incremental = stats.snapshot()
+    recomputed = compute_stats(rounds)
+    mismatches = {
+        key: {"incremental": incremental.get(key), "recomputed": recomputed[key]}
+        for key in recomputed
+        if incremental.get(key) != recomputed[key]
+    }
+    return {"consistent": not mismatches, "mismatches": mismatches}
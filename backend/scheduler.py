@@ -0,0 +1,258 @@
+# scheduler.py - Limite per provider: concurență, RPM/TPM și retry cu backoff
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+import config
+
+T = TypeVar("T")
+
+# 529 = Anthropic "overloaded"
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RetryableHTTPError(Exception):
+    """Status HTTP tranzitoriu de la un provider apelat direct (ex. Grok)."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Secundele din Retry-After / retry-after-ms (număr sau dată HTTP)."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """Status-ul HTTP al unei erori SDK (anthropic/openai: status_code, google: code)."""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+# Timeout-urile clientului: SDK-uri (APITimeoutError), requests (Gemini REST), google.api_core
+_TIMEOUT_NAMES = ("APITimeoutError", "ReadTimeout", "ConnectTimeout", "Timeout", "DeadlineExceeded")
+
+
+def is_timeout(exc: Exception) -> bool:
+    """Request-ul a depășit timeout-ul modelului (nu un 408/504 trimis de server)."""
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return True
+    return type(exc).__name__ in _TIMEOUT_NAMES
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Rate limit, erori 5xx și probleme de conexiune; nu erori de request (4xx).
+
+    Timeout-urile clientului sunt reîncercate doar cu RETRY_ON_TIMEOUT: fiecare
+    încercare poate dura cât timeout-ul modelului, deci reîncercările ar
+    înmulți durata unei runde secvențiale.
+    """
+    if isinstance(exc, RetryableHTTPError):
+        return True
+    if is_timeout(exc):
+        return config.RETRY_ON_TIMEOUT
+    if isinstance(exc, (httpx.TransportError, ConnectionError)):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Erorile de conexiune din SDK-uri (APIConnectionError) nu au status;
+    # Gemini pe transport REST aruncă erorile din requests (ConnectionError)
+    return type(exc).__name__ in ("APIConnectionError", "ConnectionError", "ChunkedEncodingError")
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Retry-After cerut de provider, dacă eroarea îl transmite."""
+    if isinstance(exc, RetryableHTTPError):
+        return exc.retry_after
+    response = getattr(exc, "response", None)
+    return parse_retry_after(getattr(response, "headers", None))
+
+
+class TokenBucket:
+    """
+    Token bucket: capacitate = limita pe minut, reumplere continuă.
+
+    Cererile așteaptă în ordinea sosirii (lock), deci un request mare nu e
+    depășit la nesfârșit de cele mici.
+    """
+
+    def __init__(self, per_minute: Optional[float]):
+        self.capacity = float(per_minute) if per_minute else None
+        self.rate = self.capacity / 60.0 if self.capacity else None
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Consumă amount (limitat la capacitate); întoarce secundele așteptate."""
+        if self.capacity is None:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= amount
+        return waited
+
+
+class ProviderScheduler:
+    """
+    Coada unui provider: cel mult max_concurrency apeluri simultane, în limitele
+    RPM/TPM, cu reîncercări pentru erorile tranzitorii.
+
+    Backoff exponențial cu full jitter (uniform între 0 și base * 2^încercare,
+    plafonat la max_delay); un Retry-After de la provider are prioritate.
+    """
+
+    def __init__(self, name: str, max_concurrency: Optional[int] = None, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None, max_retries: int = None, base_delay: float = None,
+                 max_delay: float = None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries if max_retries is not None else config.RETRY_MAX_RETRIES
+        self.base_delay = base_delay if base_delay is not None else config.RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else config.RETRY_MAX_DELAY
+        self.in_flight = 0
+        self.queued = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+
+    def backoff(self, attempt: int, exc: Exception) -> float:
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(retry_after, config.RETRY_AFTER_MAX)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 0,
+                  retry_allowed: Optional[Callable[[], bool]] = None) -> T:
+        """
+        Rulează call() în limitele providerului, reîncercând erorile tranzitorii.
+
+        Args:
+            call: Creează și rulează request-ul (apelată din nou la fiecare încercare)
+            estimated_tokens: Tokeni input + output estimați, pentru bucket-ul TPM
+            retry_allowed: Dacă întoarce False (ex. textul a ajuns deja la UI),
+                           eroarea e propagată fără reîncercare
+
+        Raises:
+            Ultima excepție, dacă nu e tranzitorie sau reîncercările s-au epuizat
+        """
+        attempt = 0
+        while True:
+            self.queued += 1
+            try:
+                if self._semaphore is not None:
+                    await self._semaphore.acquire()
+            finally:
+                self.queued -= 1
+
+            try:
+                self.throttled_seconds += await self.requests.acquire(1)
+                self.throttled_seconds += await self.tokens.acquire(estimated_tokens)
+                self.in_flight += 1
+                self.calls += 1
+                try:
+                    return await call()
+                finally:
+                    self.in_flight -= 1
+            except Exception as e:
+                can_retry = (
+                    attempt < self.max_retries
+                    and is_retryable(e)
+                    and (retry_allowed is None or retry_allowed())
+                )
+                if not can_retry:
+                    self.failures += 1
+                    raise
+                delay = self.backoff(attempt, e)
+                print(f"[{self.name}] {type(e).__name__}: {e} - retry {attempt + 1}/{self.max_retries} în {delay:.1f}s")
+            finally:
+                if self._semaphore is not None:
+                    self._semaphore.release()
+
+            # Așteptarea se face fără slot ocupat, ca alte request-uri să poată rula
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def info(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_seconds": round(self.throttled_seconds, 3)
+        }
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """Schedulerul providerului, creat la prima folosire din config.PROVIDER_LIMITS."""
+    scheduler = _schedulers.get(provider)
+    if scheduler is None:
+        limits = config.PROVIDER_LIMITS.get(provider, config.PROVIDER_LIMITS.get("default", {}))
+        scheduler = _schedulers[provider] = ProviderScheduler(
+            provider,
+            max_concurrency=limits.get("max_concurrency"),
+            rpm=limits.get("rpm"),
+            tpm=limits.get("tpm")
+        )
+    return scheduler
+
+
+def schedulers_info() -> Dict[str, Dict]:
+    return {name: s.info() for name, s in _schedulers.items()}
@@ -0,0 +1,273 @@
+# session_store.py - Conversații separate per sesiune, cu evicție LRU/TTL
+
+import asyncio
+import re
+import secrets
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple
+
+import config
+from dice_roller import DiceRoller
+from context_builder import ContextStore
+from round_stats import RoundStats
+
+DEFAULT_SESSION_ID = "default"
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Overhead aproximativ per rundă (dict, timestamp, flags, context_ref) în bytes
+_ROUND_OVERHEAD_BYTES = 1024
+
+
+def is_valid_session_id(session_id: str) -> bool:
+    """ID-uri scurte, fără caractere speciale (apar în URL-uri și fișiere)."""
+    return bool(session_id) and bool(_SESSION_ID_PATTERN.match(session_id))
+
+
+def estimate_round_bytes(round_data: Dict) -> int:
+    """
+    Estimare ieftină a memoriei ocupate de o rundă.
+
+    Conținutul apare în rundă și în mesajele ContextStore (o variantă "sine"
+    și una "Previous response from ..."), de aici factorul 3.
+    """
+    return _ROUND_OVERHEAD_BYTES + 3 * len(round_data.get("content", "").encode("utf-8"))
+
+
+class Session:
+    """O conversație: rundele ei, contextul per model și propriul zar."""
+
+    def __init__(self, session_id: str, round_log=None):
+        self.session_id = session_id
+        # RoundLog opțional: fiecare rundă adăugată e scrisă și în jurnal
+        self.round_log = round_log
+        self.dice_roller = DiceRoller()
+        # O singură rundă odată per sesiune: modelele trebuie să vadă rundele în ordine
+        self.lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self._init_rounds()
+
+    def _init_rounds(self):
+        self.rounds: List[Dict] = []
+        self.context_store = ContextStore(self.rounds)
+        # Agregatele pentru /diagnostics, actualizate la fiecare rundă
+        self.stats = RoundStats()
+        self.approx_bytes = 0
+        # Generația conversației, nouă la fiecare reset (și la fiecare sesiune
+        # creată sau restaurată): un cursor vechi nu indică în conversația nouă
+        self.epoch = secrets.token_hex(4)
+
+    def append_round(self, round_data: Dict, persist: bool = True):
+        """Adaugă o rundă (și în contextele per model, și în jurnal)."""
+        self.context_store.append(round_data)
+        self.stats.add(round_data)
+        self.approx_bytes += estimate_round_bytes(round_data)
+        self.last_access = time.time()
+        if persist and self.round_log is not None:
+            self.round_log.append(self.session_id, round_data)
+
+    def reset(self, persist: bool = True):
+        """Golește conversația; ultima ordine a zarului e păstrată."""
+        self._init_rounds()
+        if persist and self.round_log is not None:
+            self.round_log.reset(self.session_id)
+
+    @property
+    def cursor(self) -> str:
+        """Poziția curentă "<epoch>.<runde>": cursor pentru /rounds și ETag."""
+        return f"{self.epoch}.{len(self.rounds)}"
+
+    def rounds_since(self, cursor: Optional[str]) -> Tuple[Optional[int], bool]:
+        """
+        Indexul primei runde noi față de cursor.
+
+        Returns:
+            (index, reset) - reset=True dacă cursorul e din altă generație a
+            conversației (clientul o reia de la zero); index None = cursor invalid
+        """
+        if not cursor:
+            return 0, False
+        epoch, _, count = cursor.rpartition(".")
+        try:
+            count = int(count)
+        except ValueError:
+            return None, False
+        if epoch and epoch != self.epoch:
+            return 0, True
+        if count < 0 or count > len(self.rounds):
+            return None, False
+        return count, False
+
+    @property
+    def busy(self) -> bool:
+        """True cât timp rulează o rundă (sesiunea nu poate fi evacuată)."""
+        return self.lock.locked()
+
+    def info(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "total_rounds": len(self.rounds),
+            "approx_bytes": self.approx_bytes,
+            "created_at": self.created_at,
+            "last_access": self.last_access,
+            "busy": self.busy
+        }
+
+
+class SessionStore:
+    """
+    Sesiunile din memorie, în ordine LRU.
+
+    Limite (din config): număr maxim de sesiuni, TTL de inactivitate și memorie
+    totală estimată. Sesiunile cu o rundă în curs nu sunt evacuate.
+    """
+
+    def __init__(self, max_sessions: int = None, ttl_seconds: float = None, max_bytes: int = None,
+                 round_log=None):
+        self.max_sessions = max_sessions if max_sessions is not None else config.SESSION_MAX_COUNT
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.SESSION_TTL_SECONDS
+        self.max_bytes = max_bytes if max_bytes is not None else config.SESSION_MAX_MEMORY_MB * 1024 * 1024
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.evicted = 0
+        # Evacuarea scoate sesiunea doar din memorie; jurnalul o păstrează și
+        # load() o reîncarcă din el la următoarea folosire
+        self.round_log = round_log
+        self._evicted_ids: Set[str] = set()
+
+    def get(self, session_id: str, create: bool = True) -> Optional[Session]:
+        """Sesiunea cerută (creată la nevoie), marcată ca cea mai recent folosită."""
+        self.evict_expired()
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            session = Session(session_id, self.round_log)
+            self._sessions[session_id] = session
+            self.enforce_limits()
+        else:
+            self._sessions.move_to_end(session_id)
+            session.last_access = time.time()
+
+        return session
+
+    async def load(self, session_id: str, create: bool = True) -> Optional[Session]:
+        """
+        Ca get(), dar o sesiune evacuată din memorie e reîncărcată din jurnal
+        (cu toate rundele ei), nu recreată goală.
+        """
+        session = self.get(session_id, create=False)
+        if session is None and session_id in self._evicted_ids and self.round_log is not None:
+            logged = await self.round_log.load_session(session_id)
+            # Între timp, alt request poate să o fi reîncărcat deja
+            session = self.get(session_id, create=False)
+            if session is None and logged:
+                session = self._rehydrate(session_id, *logged)
+                session.last_access = time.time()
+                print(f"[Sessions] Reîncărcat {session_id} din jurnal ({len(session.rounds)} runde)")
+                self.enforce_limits()
+            self._evicted_ids.discard(session_id)
+        if session is None and create:
+            session = self.get(session_id, create=True)
+        return session
+
+    def _rehydrate(self, session_id: str, rounds: List[Dict], last_event_ts: float) -> Session:
+        """Reconstruiește o sesiune din rundele ei din jurnal și o pune în memorie."""
+        session = Session(session_id, self.round_log)
+        for round_data in rounds:
+            session.append_round(round_data, persist=False)
+        session.last_access = last_event_ts
+
+        # Zarul evită să repete ordinea ultimei ture înregistrate
+        last_order = []
+        for round_data in reversed(rounds):
+            if round_data["type"] == "user":
+                break
+            last_order.insert(0, round_data["model"])
+        session.dice_roller.last_order = last_order or None
+
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _evict(self, session_id: str):
+        del self._sessions[session_id]
+        self.evicted += 1
+        if self.round_log is not None:
+            self._evicted_ids.add(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        self._evicted_ids.discard(session_id)
+        deleted = self._sessions.pop(session_id, None) is not None
+        if deleted and self.round_log is not None:
+            self.round_log.delete(session_id)
+        return deleted
+
+    def restore(self, logged_sessions: Dict) -> int:
+        """
+        Reîncarcă sesiunile din RoundLog.replay(), de la cea mai veche la cea
+        mai recentă, aplicând aceleași limite LRU/TTL ca în funcționare normală.
+
+        Returns:
+            Numărul de sesiuni rămase în memorie
+        """
+        for session_id, (rounds, last_event_ts) in logged_sessions.items():
+            self._rehydrate(session_id, rounds, last_event_ts)
+            self.enforce_limits()
+
+        self.evict_expired()
+        return len(self._sessions)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(s.approx_bytes for s in self._sessions.values())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def evict_expired(self):
+        """Scoate sesiunile inactive mai mult de ttl_seconds."""
+        if not self.ttl_seconds:
+            return
+
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            sid for sid, s in self._sessions.items()
+            if s.last_access < cutoff and not s.busy
+        ]
+        for sid in expired:
+            self._evict(sid)
+
+    def enforce_limits(self):
+        """Evacuează sesiunile cel mai puțin recent folosite peste limite."""
+        total_bytes = self.total_bytes
+
+        for sid in list(self._sessions.keys()):
+            over_count = len(self._sessions) > self.max_sessions
+            over_memory = total_bytes > self.max_bytes
+            if not (over_count or over_memory):
+                break
+
+            session = self._sessions[sid]
+            if session.busy:
+                continue
+
+            self._evict(sid)
+            total_bytes -= session.approx_bytes
+            print(f"[Sessions] Evacuat {sid} ({session.approx_bytes} bytes, {len(session.rounds)} runde)")
+
+    def info(self) -> Dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "approx_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted": self.evicted,
+            "evicted_in_log": len(self._evicted_ids)
+        }
+
+    def list(self) -> List[Dict]:
+        """Sesiunile, de la cea mai recent folosită."""
+        return [s.info() for s in reversed(self._sessions.values())]
@@ -0,0 +1,5 @@
+# Modulele backend-ului sunt importate plat (rulare din backend/)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import json
+import os
+
+from analyzer import analyze_corpus
+
+
+def _write_export(path, replies: int):
+    lines = [{"export": "agora"}, {"round_number": 1, "type": "user", "content": "întrebare"}]
+    for number in range(replies):
+        lines.append({"round_number": number + 2, "type": "assistant", "model": "claude",
+                      "content": "răspuns", "tokens": 10, "position": 0, "hallucination_flags": {}})
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def test_unchanged_files_are_not_rehashed(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    first, second = str(exports / "agora_1.ndjson"), str(exports / "agora_2.ndjson")
+    _write_export(first, 1)
+    _write_export(second, 2)
+    cache_path = str(tmp_path / "cache.json")
+
+    report = analyze_corpus([str(exports)], workers=1, cache_path=cache_path)
+    assert report["analyzed_files"] == 2 and report["llm_rounds"] == 3
+
+    # Conținut nou cu aceeași dimensiune și același mtime: hash-ul din index e refolosit
+    stat = os.stat(first)
+    with open(first, "r", encoding="utf-8") as f:
+        content = f.read()
+    with open(first, "w", encoding="utf-8") as f:
+        f.write(content.replace("răspuns", "RĂSPUNS"))
+    assert os.stat(first).st_size == stat.st_size
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    report = analyze_corpus([str(exports)], workers=1, cache_path=cache_path)
+    assert report["cached_files"] == 2 and report["analyzed_files"] == 0
+
+    # Fișier modificat (alt mtime): recitit, rehash-uit și reanalizat
+    _write_export(first, 3)
+    report = analyze_corpus([str(exports)], workers=1, cache_path=cache_path)
+    assert report["analyzed_files"] == 1 and report["cached_files"] == 1
+    assert report["llm_rounds"] == 5
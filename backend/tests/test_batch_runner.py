@@ -0,0 +1,39 @@
+import pytest
+
+import config
+from batch_runner import validate_prompts
+
+DEFAULTS = {"theta_enabled": False, "token_limit": 300, "deadline": None, "round_mode": "sequential"}
+
+
+def _prompt(prompt_id: str, **options) -> dict:
+    return {"id": prompt_id, "turns": ["întrebare"], **options}
+
+
+def test_every_invalid_prompt_is_reported_before_any_job():
+    prompts = [
+        _prompt("ok"),
+        _prompt("mode", round_mode="parallel"),
+        _prompt("limit", token_limit="mare"),
+        _prompt("deadline", deadline_seconds=0),
+    ]
+    with pytest.raises(ValueError) as error:
+        validate_prompts(prompts, DEFAULTS)
+    message = str(error.value)
+    assert "prompt mode: round_mode" in message
+    assert "prompt limit: token_limit" in message
+    assert "prompt deadline: deadline_seconds" in message
+    assert "prompt ok" not in message
+
+
+def test_prompt_options_get_the_message_limits():
+    prompts = validate_prompts([
+        _prompt("default"),
+        _prompt("big", token_limit=10**6, round_mode="blind"),
+        _prompt("theta", theta_enabled=True, token_limit=60),
+    ], DEFAULTS)
+    options = {p["id"]: p["round_options"] for p in prompts}
+    assert options["default"] == {"token_limit": 300, "theta_enabled": False, "deadline": None,
+                                  "round_mode": "sequential"}
+    assert options["big"]["token_limit"] == config.TOKEN_LIMIT_MAX and options["big"]["round_mode"] == "blind"
+    assert options["theta"]["token_limit"] == config.THETA_TOKEN_LIMIT
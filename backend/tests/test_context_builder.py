@@ -0,0 +1,92 @@
+import pytest
+
+import config
+from context_builder import ContextBudgetError, ContextStore, build_context_from_rounds, resolve_context_ref
+
+
+def _rounds(turns: int):
+    rounds = []
+    for turn in range(turns):
+        rounds.append({"round_number": len(rounds) + 1, "type": "user", "content": f"întrebare {turn} " * 40})
+        for model in ("claude", "gpt"):
+            rounds.append({"round_number": len(rounds) + 1, "type": "assistant", "model": model,
+                           "content": f"răspuns {model} {turn} " * 40, "error": None, "skipped": False})
+    return rounds
+
+
+def test_store_from_existing_rounds_matches_appended_store(monkeypatch):
+    monkeypatch.setitem(config.MODELS["claude"], "context_budget_tokens", 800)
+    rounds = _rounds(12)
+
+    prebuilt = ContextStore(list(rounds))
+    appended = ContextStore()
+    for round_data in rounds:
+        appended.append(round_data)
+
+    for model in ("claude", "gpt"):
+        assert prebuilt.get(model) == build_context_from_rounds(rounds, model)
+        assert prebuilt.window(model) == appended.window(model)
+
+    # Rundele adăugate după construcție intră în fereastră ca la un store gol
+    extra = {"round_number": len(rounds) + 1, "type": "user", "content": "încă una"}
+    prebuilt.append(extra)
+    appended.append(extra)
+    context, ref = prebuilt.window("claude")
+    assert (context, ref) == appended.window("claude")
+    assert resolve_context_ref(prebuilt.rounds, ref) == context
+
+
+def _store(rounds):
+    store = ContextStore()
+    for round_data in rounds:
+        store.append(round_data)
+    return store
+
+
+def test_trim_keeps_the_current_user_round(monkeypatch):
+    monkeypatch.setitem(config.MODELS["claude"], "context_budget_tokens", 200)
+    rounds = [
+        {"type": "user", "content": "hi"},
+        {"type": "assistant", "model": "claude", "content": "x" * 100},
+        {"type": "assistant", "model": "gpt", "content": "y" * 300},
+        # Încape singur în buget, dar peste ținta de tăiere
+        {"type": "user", "content": "q" * 600},
+    ]
+    store = _store(rounds)
+
+    context, ref = store.window("claude")
+    assert context[-1] == {"role": "user", "content": "q" * 600}
+    assert ref["first_round"] <= ref["last_round"] == 4
+    assert resolve_context_ref(rounds, ref) == context
+
+
+def test_current_user_round_over_budget_fails_the_turn(monkeypatch):
+    monkeypatch.setitem(config.MODELS["claude"], "context_budget_tokens", 200)
+    store = _store([
+        {"type": "user", "content": "hi"},
+        {"type": "assistant", "model": "claude", "content": "x" * 100},
+        {"type": "user", "content": "big " * 400},
+    ])
+
+    with pytest.raises(ContextBudgetError) as error:
+        store.window("claude")
+    assert error.value.budget == 200 and error.value.tokens > 200
+    # Fără buget, modelul primește tot contextul
+    assert store.window("gpt")[0] == store.get("gpt")
+
+
+def test_window_matches_full_rebuild_every_turn(monkeypatch):
+    for model in ("claude", "gpt"):
+        monkeypatch.setitem(config.MODELS[model], "context_budget_tokens", None)
+    rounds = _rounds(6)
+    # Runde care nu intră în context: eroare păstrată, rundă sărită
+    rounds[4]["error"] = "Timeout"
+    rounds[7]["skipped"] = True
+    store = ContextStore()
+
+    for round_data in rounds:
+        store.append(round_data)
+        for model in ("claude", "gpt", "gemini"):
+            context, ref = store.window(model)
+            assert context == build_context_from_rounds(store.rounds, model)
+            assert resolve_context_ref(store.rounds, ref) == context
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+import httpx
+from anthropic import AsyncAnthropic
+
+import config
+import llm_clients
+from context_builder import ContextStore
+
+
+class _RecordingGeminiModel:
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        self.calls.append(request_options)
+        raise TimeoutError("Read timed out")
+
+
+def test_gemini_request_uses_the_model_timeout(monkeypatch):
+    model = _RecordingGeminiModel()
+    monkeypatch.setattr(llm_clients, "_gemini_model", model)
+    monkeypatch.setitem(config.MODELS["gemini"], "timeout", 7)
+
+    text, tokens, timeout, error = asyncio.run(
+        llm_clients.call_gemini([{"role": "user", "content": "salut"}], 50, False))
+
+    assert model.calls == [{"retry": None, "timeout": 7}]
+    assert error and tokens == 0
+
+
+def _claude_with_mock_transport(monkeypatch) -> List[Dict]:
+    """Clientul Claude trimite request-urile unui transport httpx care le înregistrează."""
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": f"msg_{len(payloads)}", "type": "message", "role": "assistant", "model": "mock",
+            "content": [{"type": "text", "text": f"răspuns claude {len(payloads)} " * 30}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 60}
+        })
+
+    client = AsyncAnthropic(api_key="test-key", base_url="http://mock", max_retries=0,
+                            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_clients, "_claude_client", client)
+    return payloads
+
+
+def _prefix(payload: Dict) -> Tuple[str, List[Tuple[str, str]]]:
+    """System + mesajele până la ultimul breakpoint, fără marcajele cache_control."""
+    def text(content):
+        return content if isinstance(content, str) else "".join(block["text"] for block in content)
+    return text(payload["system"]), [(m["role"], text(m["content"])) for m in payload["messages"]]
+
+
+def _cache_hit(previous: Dict, current: Dict) -> bool:
+    """Prefixul scris de previous e reluat byte cu byte la începutul lui current."""
+    previous_system, previous_messages = _prefix(previous)
+    system, messages = _prefix(current)
+    return (system == previous_system
+            and json.dumps(messages[:len(previous_messages)]) == json.dumps(previous_messages))
+
+
+def test_claude_cache_breakpoints_and_stable_prefix(monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_CACHE_ENABLED", True)
+    monkeypatch.setitem(config.MODELS["claude"], "context_budget_tokens", 1500)
+    payloads = _claude_with_mock_transport(monkeypatch)
+    store = ContextStore()
+    first_rounds = []
+
+    async def turns(count: int):
+        for turn in range(count):
+            store.append({"type": "user", "content": f"întrebare {turn} " * 40})
+            store.append({"type": "assistant", "model": "gpt", "content": f"răspuns gpt {turn} " * 40})
+            context, ref = store.window("claude")
+            first_rounds.append(ref["first_round"])
+            text, _, _, error = await llm_clients.call_claude(context, 100, True)
+            assert error is None
+            store.append({"type": "assistant", "model": "claude", "content": text})
+
+    asyncio.run(turns(12))
+
+    for payload in payloads:
+        # Breakpoint pe promptul system și pe ultimul mesaj, nicăieri altundeva
+        assert [block.get("cache_control") for block in payload["system"]] == [{"type": "ephemeral"}]
+        *history, last = payload["messages"]
+        assert all(isinstance(message["content"], str) for message in history)
+        assert [block.get("cache_control") for block in last["content"]] == [{"type": "ephemeral"}]
+
+    trims = [turn for turn in range(1, len(payloads)) if first_rounds[turn] != first_rounds[turn - 1]]
+    assert trims, "bugetul ar trebui să mute fereastra cel puțin o dată"
+    for turn in range(1, len(payloads)):
+        # Doar tura în care fereastra se mută pierde cache-ul; următoarea îl reia
+        assert _cache_hit(payloads[turn - 1], payloads[turn]) == (turn not in trims)
@@ -0,0 +1,21 @@
+import asyncio
+import os
+
+from response_cache import ResponseCache
+
+
+def test_disk_index_is_built_lazily_off_the_event_loop(tmp_path, monkeypatch):
+    disk_dir = str(tmp_path / "cache")
+    asyncio.run(ResponseCache(disk_dir=disk_dir).put("ab" * 32, {"content": "salut", "tokens": 2}))
+
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda *args, **kwargs: walks.append(args) or real_walk(*args, **kwargs))
+
+    cache = ResponseCache(disk_dir=disk_dir)
+    assert walks == [] and cache.stats()["disk_index_loaded"] is False
+
+    assert asyncio.run(cache.get("ab" * 32)) == {"content": "salut", "tokens": 2}
+    assert len(walks) == 1
+    stats = cache.stats()
+    assert stats["disk_index_loaded"] and stats["disk_entries"] == 1 and stats["disk_hits"] == 1
@@ -0,0 +1,80 @@
+import asyncio
+import itertools
+
+import pytest
+
+import config
+import round_engine
+from round_engine import SKIPPED_DEADLINE, run_round
+from session_store import Session
+
+MODELS = ["claude", "gpt", "gemini"]
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    """Provider mock: răspunde instant (sau după delays[model] secunde) și reține contextele primite."""
+    calls = []
+    delays = {}
+    replies = itertools.count(1)
+
+    async def call_model(model_name, messages, max_tokens, theta_enabled=None, on_delta=None, usage=None):
+        calls.append((model_name, list(messages)))
+        await asyncio.sleep(delays.get(model_name, 0))
+        return f"răspuns {model_name} #{next(replies)}", 5, False, None
+
+    monkeypatch.setattr(round_engine, "call_model", call_model)
+    for model in MODELS:
+        monkeypatch.setitem(config.MODELS[model], "context_budget_tokens", None)
+    return calls, delays
+
+
+def _run(session, content, **kwargs):
+    return asyncio.run(run_round(session, MODELS, content, 100, False, use_cache=False, **kwargs))
+
+
+def test_slow_provider_is_skipped_at_the_round_deadline(provider_calls):
+    calls, delays = provider_calls
+    delays["gpt"] = 5.0
+    session = Session("s1")
+
+    result = _run(session, "întrebare", deadline=0.3)
+
+    assert result["deadline_exceeded"] is True
+    by_model = {r["model"]: r for r in session.rounds if r["type"] == "assistant"}
+    assert by_model["gpt"]["skipped"] and by_model["gpt"]["error"] == SKIPPED_DEADLINE
+    assert by_model["gpt"]["content"] == f"[{SKIPPED_DEADLINE}]"
+    # Modelele de după gpt nu mai au timp deloc; cele de dinainte au răspuns
+    position = result["order"].index("gpt")
+    for model, llm_round in by_model.items():
+        assert llm_round["skipped"] == (result["order"].index(model) >= position)
+    # Runda sărită nu intră în contextul turelor următoare
+    assert all(f"[{SKIPPED_DEADLINE}]" not in m["content"] for m in session.context_store.get("claude"))
+
+
+def test_round_without_deadline_waits_for_every_model(provider_calls):
+    session = Session("s1")
+    result = _run(session, "întrebare", deadline=None)
+    assert result["deadline_exceeded"] is False
+    assert not any(r.get("skipped") for r in session.rounds)
+
+
+def test_blind_round_hides_same_round_replies(provider_calls):
+    calls, _ = provider_calls
+    session = Session("s1")
+
+    for turn in range(2):
+        calls.clear()
+        _run(session, f"întrebare {turn}", round_mode="blind")
+        replies = [r["content"] for r in session.rounds[-len(MODELS):]]
+        assert len(calls) == len(MODELS)
+        for model_name, messages in calls:
+            seen = "\n".join(m["content"] for m in messages)
+            assert messages[-1] == {"role": "user", "content": f"întrebare {turn}"}
+            assert not any(reply in seen for reply in replies)
+
+    # Runda următoare vede răspunsurile rundei blind anterioare
+    previous = [r["content"] for r in session.rounds[1:1 + len(MODELS)]]
+    for model_name, messages in calls:
+        seen = "\n".join(m["content"] for m in messages)
+        assert all(reply in seen for reply in previous)
@@ -0,0 +1,79 @@
+import asyncio
+
+import config
+from round_log import RoundLog
+
+
+def _failing_log(path, failures):
+    """RoundLog al cărui disc refuză primele `failures` scrieri."""
+    log = RoundLog(path, flush_interval=0)
+    write_batch = log._write_batch
+    calls = []
+
+    def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) <= failures:
+            raise OSError("disc plin")
+        write_batch(batch)
+
+    log._write_batch = flaky
+    return log, calls
+
+
+def test_close_gives_up_after_bounded_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ROUND_LOG_RETRY_DELAY", 0.0)
+    monkeypatch.setattr(config, "ROUND_LOG_CLOSE_RETRIES", 2)
+    log, calls = _failing_log(str(tmp_path / "rounds.jsonl"), failures=10**6)
+
+    async def scenario():
+        await log.start()
+        log.append("s1", {"round_number": 1, "type": "user", "content": "salut"})
+        await asyncio.wait_for(log.close(), timeout=5)
+
+    asyncio.run(scenario())
+    assert log.info()["pending"] == 0 and log.written == 0
+    assert len(calls) <= 1 + config.ROUND_LOG_CLOSE_RETRIES + 1
+
+
+def test_failed_flush_is_retried_without_new_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ROUND_LOG_RETRY_DELAY", 0.0)
+    path = str(tmp_path / "rounds.jsonl")
+    log, calls = _failing_log(path, failures=2)
+
+    async def scenario():
+        await log.start()
+        log.append("s1", {"round_number": 1, "type": "user", "content": "salut"})
+        # Niciun eveniment nou nu mai trezește writer-ul
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if log.written:
+                break
+        written = log.written
+        await log.close()
+        return written
+
+    assert asyncio.run(scenario()) == 1
+    assert len(calls) == 3
+    rounds, _ = RoundLog.replay(path)["s1"]
+    assert rounds == [{"round_number": 1, "type": "user", "content": "salut"}]
+
+
+def test_compact_keeps_only_live_sessions(tmp_path):
+    path = str(tmp_path / "rounds.jsonl")
+
+    async def scenario():
+        log = RoundLog(path, flush_interval=0)
+        await log.start()
+        for number in range(1, 4):
+            log.append("s1", {"round_number": number, "type": "user", "content": f"mesaj {number}"})
+        log.append("s2", {"round_number": 1, "type": "user", "content": "șters"})
+        log.delete("s2")
+        log.reset("s1")
+        log.append("s1", {"round_number": 1, "type": "user", "content": "după reset"})
+        log.reset("s3")
+        await log.close()
+
+    asyncio.run(scenario())
+    before = RoundLog.replay(path)
+    assert RoundLog.compact(before, path) == 2
+    assert RoundLog.replay(path) == before
@@ -0,0 +1,76 @@
+import asyncio
+
+from round_log import RoundLog
+from round_stats import compute_stats, verify_stats
+from session_store import Session, SessionStore
+
+
+def _llm_round(number: int, model: str, **fields) -> dict:
+    return {"round_number": number, "type": "assistant", "model": model, "content": f"răspuns {number}",
+            "tokens": 10 + number, "timeout": False, "error": None, "skipped": False,
+            "theta_enabled": number % 2 == 0, "input_tokens": 100, "cache_read_tokens": 40,
+            "cache_write_tokens": 0, "reasoning_tokens": 0, "usage_source": "provider", "cost_usd": 0.001,
+            "hallucination_flags": {"quotes_others": number % 3 == 0, "self_citation": False}, **fields}
+
+
+def _conversation() -> list:
+    rounds = []
+    for turn in range(5):
+        rounds.append({"round_number": len(rounds) + 1, "type": "user", "content": f"întrebare {turn}",
+                       "theta_enabled": turn % 2 == 0})
+        rounds.append(_llm_round(len(rounds) + 1, "claude"))
+        rounds.append(_llm_round(len(rounds) + 1, "gpt", error="Timeout", timeout=True, usage_source=None))
+        rounds.append(_llm_round(len(rounds) + 1, "gemini", skipped=True, error="skipped (deadline)",
+                                 usage_source=None, tokens=0))
+    return rounds
+
+
+def _assert_consistent(session: Session):
+    check = verify_stats(session.stats, session.rounds)
+    assert check["consistent"], check["mismatches"]
+    assert session.stats.snapshot() == compute_stats(session.rounds)
+
+
+def test_stats_agree_with_recompute_after_append_and_reset():
+    session = Session("s1")
+    for round_data in _conversation():
+        session.append_round(round_data)
+        _assert_consistent(session)
+
+    session.reset()
+    _assert_consistent(session)
+    assert session.stats.snapshot()["total_rounds"] == 0
+
+    session.append_round(_conversation()[0])
+    _assert_consistent(session)
+
+
+def test_stats_agree_with_recompute_after_replay():
+    rounds = _conversation()
+    store = SessionStore(max_sessions=10, ttl_seconds=0, max_bytes=10**9)
+    store.restore({"s1": (rounds, 0.0)})
+    session = store.get("s1", create=False)
+    assert len(session.rounds) == len(rounds)
+    _assert_consistent(session)
+
+
+def test_stats_agree_with_recompute_after_log_replay(tmp_path):
+    path = str(tmp_path / "rounds.jsonl")
+
+    async def write_log():
+        log = RoundLog(path, flush_interval=0)
+        await log.start()
+        for round_data in _conversation():
+            log.append("s1", round_data)
+        log.reset("s1")
+        for round_data in _conversation()[:3]:
+            log.append("s1", round_data)
+        await log.close()
+
+    asyncio.run(write_log())
+
+    store = SessionStore(max_sessions=10, ttl_seconds=0, max_bytes=10**9)
+    store.restore(RoundLog.replay(path))
+    session = store.get("s1", create=False)
+    assert len(session.rounds) == 3
+    _assert_consistent(session)
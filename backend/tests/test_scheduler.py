@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+import pytest
+
+import config
+from scheduler import ProviderScheduler
+
+
+def _attempts(exc: Exception) -> int:
+    """De câte ori rulează scheduler-ul un apel care ridică mereu exc."""
+    scheduler = ProviderScheduler("test", max_retries=2, base_delay=0.0)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise exc
+
+    with pytest.raises(type(exc)):
+        asyncio.run(scheduler.run(call))
+    return len(attempts)
+
+
+@pytest.mark.parametrize("exc", [httpx.ReadTimeout("timeout"), asyncio.TimeoutError()])
+def test_timed_out_call_is_attempted_once_by_default(exc):
+    assert _attempts(exc) == 1
+
+
+@pytest.mark.parametrize("exc", [httpx.ReadTimeout("timeout"), asyncio.TimeoutError()])
+def test_timed_out_call_is_retried_when_enabled(exc, monkeypatch):
+    monkeypatch.setattr(config, "RETRY_ON_TIMEOUT", True)
+    assert _attempts(exc) == 3
+
+
+def test_connection_errors_are_still_retried():
+    assert _attempts(httpx.ConnectError("refused")) == 3
@@ -0,0 +1,55 @@
+import asyncio
+
+from round_log import RoundLog
+from session_store import SessionStore
+
+
+def _user_round(number: int) -> dict:
+    return {"round_number": number, "type": "user", "content": f"mesaj {number}"}
+
+
+def test_evicted_session_is_reloaded_from_log(tmp_path):
+    path = str(tmp_path / "rounds.jsonl")
+
+    async def scenario():
+        log = RoundLog(path, flush_interval=0)
+        await log.start()
+        store = SessionStore(max_sessions=1, ttl_seconds=0, max_bytes=10**9, round_log=log)
+
+        s1 = await store.load("s1")
+        for number in range(1, 16):
+            s1.append_round(_user_round(number))
+        # s2 evacuează s1 (o singură sesiune în memorie)
+        (await store.load("s2")).append_round(_user_round(1))
+        assert store.get("s1", create=False) is None
+
+        s1 = await store.load("s1")
+        assert len(s1.rounds) == 15
+        s1.append_round(_user_round(16))
+        await log.close()
+
+    asyncio.run(scenario())
+
+    rounds, _ = RoundLog.replay(path)["s1"]
+    assert [r["round_number"] for r in rounds] == list(range(1, 17))
+    # Nicio sesiune nouă nu scrie un marker de reset
+    with open(path, encoding="utf-8") as f:
+        assert '"event": "reset"' not in f.read()
+
+
+def test_read_without_create_reloads_evicted_session(tmp_path):
+    path = str(tmp_path / "rounds.jsonl")
+
+    async def scenario():
+        log = RoundLog(path, flush_interval=0)
+        await log.start()
+        store = SessionStore(max_sessions=1, ttl_seconds=0, max_bytes=10**9, round_log=log)
+        (await store.load("s1")).append_round(_user_round(1))
+        await store.load("s2")
+        # Evenimentele din coadă, încă nescrise, sunt incluse
+        session = await store.load("s1", create=False)
+        await log.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session is not None and len(session.rounds) == 1
@@ -0,0 +1,161 @@
+# timeline.py - Waterfall per tură din timeline-urile salvate în rundele LLM
+"""
+Fiecare rundă LLM are "timeline" (vezi round_engine.run_round), cu momente în
+secunde de la începutul turei. Aici le transformăm în faze consecutive per
+model și într-o diagramă text.
+
+Faze:
+    context     - construirea contextului (fereastra din ContextStore)
+    cache       - căutarea în cache-ul de răspunsuri
+    wait        - așteptare în scheduler (concurență, RPM/TPM) sau backoff
+    failed      - încercare eșuată / anulată (termenul rundei)
+    ttfb        - de la trimiterea request-ului până la primul byte
+    generation  - de la primul byte până la ultimul (doar cu streaming)
+    detect      - detecția de halucinații
+"""
+
+import math
+from typing import Dict, List, Optional
+
+_PHASE_CHARS = {"context": "c", "cache": "k", "wait": ".", "failed": "x", "ttfb": "=", "generation": "#", "detect": "d"}
+
+# Fazele lungi sunt desenate cel puțin pe o coloană; context/cache/detect doar
+# când chiar ocupă o coloană (altfel ar acoperi fazele importante)
+_ALWAYS_VISIBLE = ("wait", "failed", "ttfb", "generation")
+# Ordinea de desenare: încercările eșuate ultimele, ca backoff-ul care le
+# urmează să nu le acopere
+_PAINT_ORDER = ("wait", "context", "cache", "ttfb", "generation", "detect", "failed")
+
+
+def _phase(name: str, start: Optional[float], end: Optional[float], **extra) -> Optional[Dict]:
+    if start is None or end is None:
+        return None
+    return {"phase": name, "start": start, "end": end, "duration": round(max(end - start, 0.0), 4), **extra}
+
+
+def model_phases(timeline: Dict) -> List[Dict]:
+    """Fazele unui model, în ordine, din timeline-ul rundei lui."""
+    phases = [
+        _phase("context", *timeline.get("context", (None, None))),
+        _phase("cache", *timeline.get("cache", (None, None)))
+    ]
+    previous_end = None
+    for number, attempt in enumerate(timeline.get("attempts", []), 1):
+        sent = attempt.get("sent")
+        wait_start = attempt.get("scheduled")
+        if previous_end is not None and (wait_start is None or previous_end > wait_start):
+            wait_start = previous_end
+        phases.append(_phase("wait", wait_start, sent, attempt=number))
+        if attempt.get("outcome") == "ok":
+            phases.append(_phase("ttfb", sent, attempt.get("first_byte"), attempt=number))
+            if attempt.get("last_byte") != attempt.get("first_byte"):
+                phases.append(_phase("generation", attempt.get("first_byte"), attempt.get("last_byte"), attempt=number))
+        else:
+            phases.append(_phase("failed", sent, attempt.get("last_byte"), attempt=number,
+                                 outcome=attempt.get("outcome"), error=attempt.get("error")))
+        previous_end = attempt.get("last_byte")
+    phases.append(_phase("detect", *timeline.get("detect", (None, None))))
+    return [p for p in phases if p is not None and (p["duration"] > 0 or p["phase"] in ("ttfb", "failed"))]
+
+
+def find_turn(rounds: List[Dict], round_number: int) -> Optional[int]:
+    """Indexul rundei user a turei care conține round_number (sau None)."""
+    index = round_number - 1
+    if index < 0 or index >= len(rounds):
+        return None
+    while index >= 0 and rounds[index]["type"] != "user":
+        index -= 1
+    return index if index >= 0 else None
+
+
+def turn_waterfall(rounds: List[Dict], user_index: int) -> Dict:
+    """Waterfall-ul turei care începe cu rounds[user_index] (runda user)."""
+    user_round = rounds[user_index]
+    models = []
+    for round_data in rounds[user_index + 1:]:
+        if round_data["type"] == "user":
+            break
+        if round_data["type"] != "assistant":
+            continue
+        timeline = round_data.get("timeline") or {}
+        phases = model_phases(timeline)
+        durations = {}
+        for phase in phases:
+            durations[phase["phase"]] = round(durations.get(phase["phase"], 0.0) + phase["duration"], 4)
+        models.append({
+            "model": round_data["model"],
+            "round_number": round_data.get("round_number"),
+            "position": round_data.get("position", len(models)),
+            "start": timeline.get("start"),
+            "end": timeline.get("end"),
+            "attempts": len(timeline.get("attempts", [])),
+            "cached": round_data.get("cached", False),
+            "skipped": round_data.get("skipped", False),
+            "error": round_data.get("error"),
+            "durations": durations,
+            "phases": phases
+        })
+
+    ends = [m["end"] for m in models if m["end"] is not None]
+    return {
+        "round_number": user_round.get("round_number", user_index + 1),
+        "content": user_round.get("content", "")[:80],
+        "round_mode": user_round.get("round_mode", "sequential"),
+        "order": [m["model"] for m in models],
+        "duration": max(ends) if ends else None,
+        "models": models
+    }
+
+
+def turn_waterfalls(rounds: List[Dict], last: Optional[int] = None) -> List[Dict]:
+    """Waterfall-urile tuturor turelor (sau ale ultimelor `last`), în ordine."""
+    user_indexes = [i for i, r in enumerate(rounds) if r["type"] == "user"]
+    if last is not None:
+        user_indexes = user_indexes[-last:] if last > 0 else []
+    return [turn_waterfall(rounds, index) for index in user_indexes]
+
+
+def render_waterfall(waterfall: Dict, width: int = 60) -> str:
+    """Diagrama text a unei ture: o linie per model, scala comună a turei."""
+    total = waterfall["duration"] or 0.0
+    header = (f"Tura {waterfall['round_number']} ({waterfall['round_mode']}, {total:.3f}s): "
+              f"{' > '.join(waterfall['order'])}")
+    lines = [header]
+    if total <= 0:
+        lines.append("   (fără timeline)")
+        return "\n".join(lines)
+
+    name_width = max([len(m["model"]) for m in waterfall["models"]] + [6])
+    lines.append(f"{'':<{name_width}} |0s{'':<{width - 2 - len(f'{total:.2f}s')}}{total:.2f}s|")
+    for model in waterfall["models"]:
+        cells = [" "] * width
+        for phase in sorted(model["phases"], key=lambda p: _PAINT_ORDER.index(p["phase"])):
+            start = int(phase["start"] / total * width)
+            if phase["phase"] in _ALWAYS_VISIBLE:
+                end = max(int(math.ceil(phase["end"] / total * width)), start + 1)
+            else:
+                end = int(round(phase["end"] / total * width))
+            for column in range(max(start, 0), min(end, width)):
+                cells[column] = _PHASE_CHARS[phase["phase"]]
+
+        notes = []
+        if model["cached"]:
+            notes.append("cache")
+        if model["skipped"]:
+            notes.append("skipped")
+        elif model["error"]:
+            notes.append("error")
+        if model["attempts"] > 1:
+            notes.append(f"{model['attempts']} încercări")
+        span = (f"{model['start']:.2f}-{model['end']:.2f}s"
+                if model["start"] is not None and model["end"] is not None else "-")
+        suffix = f" ({', '.join(notes)})" if notes else ""
+        lines.append(f"{model['model']:<{name_width}} |{''.join(cells)}| {span}{suffix}")
+
+    legend = "  ".join(f"{char} {name}" for name, char in _PHASE_CHARS.items())
+    lines.append(f"{'':<{name_width}}  {legend}")
+    return "\n".join(lines)
+
+
+def render_waterfalls(waterfalls: List[Dict], width: int = 60) -> str:
+    return "\n\n".join(render_waterfall(w, width) for w in waterfalls) + "\n"
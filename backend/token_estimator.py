@@ -0,0 +1,26 @@
+# token_estimator.py - Estimare locală a numărului de tokeni, fără apel la provider
+
+from typing import List, Dict
+
+# Tokenizer-ele BPE ale providerilor dau în medie ~4 bytes UTF-8 per token;
+# diacriticele și scripturile non-latine costă mai mult, de aici bytes, nu caractere
+BYTES_PER_TOKEN = 4
+# Rolul și delimitatorii fiecărui mesaj în formatul chat
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Numărul aproximativ de tokeni ai unui text."""
+    if not text:
+        return 0
+    return (len(text.encode("utf-8")) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+def estimate_message_tokens(message: Dict) -> int:
+    """Tokenii unui mesaj {"role", "content"}, inclusiv overhead-ul de format."""
+    return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content", ""))
+
+
+def estimate_messages_tokens(messages: List[Dict]) -> int:
+    """Tokenii unei liste de mesaje (contextul trimis unui model)."""
+    return sum(estimate_message_tokens(m) for m in messages)
@@ -1,7 +1,9 @@
 # validator.py - API Key Validation
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 import config
+from providers import is_configured, provider_kind
+from round_engine import ROUND_MODES
 
 def validate_api_keys() -> List[str]:
     """
@@ -9,27 +11,11 @@ def validate_api_keys() -> List[str]:
     Rulează LA PORNIRE.
     
     Returns:
-        Listă cu numele modelelor care au API keys valide
+        Listă cu numele modelelor care au API keys valide (sau endpoint propriu)
     """
-    active_models = []
-    
-    # Claude
-    if config.CLAUDE_API_KEY and len(config.CLAUDE_API_KEY) > 10:
-        active_models.append("claude")
-    
-    # GPT
-    if config.OPENAI_API_KEY and len(config.OPENAI_API_KEY) > 10:
-        active_models.append("gpt")
-    
-    # Gemini
-    if config.GEMINI_API_KEY and len(config.GEMINI_API_KEY) > 10:
-        active_models.append("gemini")
-    
-    # Grok
-    if config.GROK_API_KEY and len(config.GROK_API_KEY) > 10:
-        active_models.append("grok")
-    
-    return active_models
+    # Claude, GPT, Gemini: cheia lor din config; OpenAI-compatible (Grok, endpoint-uri
+    # locale) și pluginuri: vezi providers.is_configured
+    return [model for model in config.MODELS if is_configured(model)]
 
 def print_active_models(active_models: List[str]):
     """Afișează modelele active la pornire."""
@@ -40,5 +26,49 @@ def print_active_models(active_models: List[str]):
     
     print(f"\n✅ Modele active ({len(active_models)}):")
     for model in active_models:
-        print(f"   - {model}")
-    print()
\ No newline at end of file
+        print(f"   - {model} ({provider_kind(model)})")
+    print()
+
+def validate_round_options(options: Dict, defaults: Optional[Dict] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Verifică opțiunile unei runde: request-ul /message sau un prompt din batch_runner.
+    
+    Args:
+        options: token_limit, theta_enabled, deadline_seconds, round_mode (toate opționale)
+        defaults: Valorile folosite când lipsesc din options (implicit cele din config)
+        
+    Returns:
+        ({"token_limit", "theta_enabled", "deadline", "round_mode"}, None)
+        sau (None, eroare)
+    """
+    defaults = defaults or {}
+    
+    # Token limit: numeric, adus în [TOKEN_LIMIT_MIN, TOKEN_LIMIT_MAX]
+    token_limit = options.get("token_limit", defaults.get("token_limit", config.TOKEN_LIMIT_DEFAULT))
+    if isinstance(token_limit, bool) or not isinstance(token_limit, (int, float)):
+        return None, f"token_limit invalid: {token_limit!r}"
+    token_limit = max(config.TOKEN_LIMIT_MIN, min(config.TOKEN_LIMIT_MAX, int(token_limit)))
+    
+    theta_enabled = options.get("theta_enabled", defaults.get("theta_enabled", False))
+    if not isinstance(theta_enabled, bool):
+        return None, f"theta_enabled invalid: {theta_enabled!r}"
+    # Use θ token limit if in θ mode
+    if theta_enabled:
+        token_limit = config.THETA_TOKEN_LIMIT
+    
+    # Termenul total al rundei, în secunde (None = doar timeout-urile per model)
+    deadline = options.get("deadline_seconds", defaults.get("deadline", config.ROUND_DEADLINE_SECONDS))
+    if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))
+                                 or deadline <= 0):
+        return None, "deadline_seconds invalid"
+    
+    round_mode = options.get("round_mode", defaults.get("round_mode", config.ROUND_MODE_DEFAULT))
+    if round_mode not in ROUND_MODES:
+        return None, f"round_mode necunoscut: {round_mode}"
+    
+    return {
+        "token_limit": token_limit,
+        "theta_enabled": theta_enabled,
+        "deadline": deadline,
+        "round_mode": round_mode
+    }, None
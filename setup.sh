@@ -41,8 +41,8 @@ pip install fastapi==0.104.1
 pip install uvicorn==0.24.0
 pip install anthropic==0.39.0
 pip install openai==1.54.0
-pip install google-generativeai==0.3.2
-pip install httpx==0.27.0
+pip install google-generativeai==0.8.6
+pip install "httpx[http2]==0.27.0"
 
 echo ""
 echo "✅ Setup complet!"